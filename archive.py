@@ -0,0 +1,284 @@
+import mmap
+import struct
+from array import array
+from utils import PIECE_NAMES, getMove, location_to_index, index_to_location
+from bitboard import NUM_SQUARES, square, square_to_index
+from move import encode_move, encode_drop, move_from_instruction, move_to_string, is_drop, drop_name, is_promote, \
+    move_origin, move_dest
+from exceptions import FileParseException
+
+# An archive file is laid out as:
+#   ARCHIVE_HEADER   magic, format version, number of games and the offset of the index table
+#   games            one GAME_HEADER followed by the encoded moves, for every game
+#   index table      number of games little endian uint64 offsets, the start of every game
+ARCHIVE_MAGIC = b'BXSG'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('<4sHHIQ')
+INDEX_ENTRY = struct.Struct('<Q')
+ARCHIVE_SUFFIX = '.bxsg'
+
+# A game header holds the initial position in a fixed size: MAX_PIECES (piece code, square) pairs in the order of
+# the setup, the UPPER and lower hands as HAND_SLOTS piece codes each, and the number of moves.
+# Unused slots hold the code 0.
+MAX_PIECES = 12
+HAND_SLOTS = 12
+GAME_HEADER = struct.Struct('<{}s{}s{}sH'.format(2 * MAX_PIECES, HAND_SLOTS, HAND_SLOTS))
+
+# A piece code is the piece type index + 1 in bits 0-2, plus UPPER_CODE and PROMOTED_CODE.
+UPPER_CODE = 0x8
+PROMOTED_CODE = 0x10
+
+# A drop is stored in one byte below DROP_CODES: piece type index * 25 + destination square.
+# A board move is stored in two big endian bytes, MOVE_BASE + promote * 625 + origin * 25 + destination,
+# so its first byte is always DROP_CODES or more.
+DROP_CODES = len(PIECE_NAMES) * NUM_SQUARES
+MOVE_BASE = DROP_CODES << 8
+# DECODED_DROPS[code] and DECODED_MOVES[word - MOVE_BASE] are the packed moves of every byte code.
+DECODED_DROPS = tuple(encode_drop(name, dest) for name in PIECE_NAMES for dest in range(NUM_SQUARES))
+DECODED_MOVES = tuple(encode_move(origin, dest, promote) for promote in (False, True)
+                      for origin in range(NUM_SQUARES) for dest in range(NUM_SQUARES))
+
+
+def piece_code(name):
+    """
+    Util method to convert a piece name of an input file, like 'p', 'N' or '+g', to its piece code.
+
+    Raises:
+        FileParseException: If the name is not a piece.
+    """
+    base = name[-1:].lower()
+    if base not in PIECE_NAMES or name[:-1] not in ('', '+'):
+        raise FileParseException("Unknown piece: {}".format(name))
+    code = PIECE_NAMES.index(base) + 1
+    if name[-1].isupper():
+        code |= UPPER_CODE
+    if name[0] == '+':
+        code |= PROMOTED_CODE
+    return code
+
+
+def piece_name(code):
+    """
+    Util method to convert a piece code back to its piece name.
+    """
+    name = PIECE_NAMES[(code & 0x7) - 1]
+    if code & UPPER_CODE:
+        name = name.upper()
+    if code & PROMOTED_CODE:
+        name = '+' + name
+    return name
+
+
+def encode_packed(move):
+    """
+    Util method to convert a packed move to its one or two byte archive code.
+
+    Args:
+        move (int): The packed move, see move.py.
+
+    Returns:
+        bytes: The encoded move.
+    """
+    if is_drop(move):
+        return bytes((PIECE_NAMES.index(drop_name(move)) * NUM_SQUARES + move_dest(move),))
+    word = MOVE_BASE + is_promote(move) * NUM_SQUARES * NUM_SQUARES + move_origin(move) * NUM_SQUARES + move_dest(move)
+    return word.to_bytes(2, 'big')
+
+
+def encode_command(command):
+    """
+    Util method to convert a command of an input file, like "move a1 a2", to its archive code.
+
+    Raises:
+        FileParseException: If the command cannot be stored, like a move to a square off the board.
+    """
+    try:
+        return encode_packed(move_from_instruction(getMove(command)))
+    except Exception:
+        raise FileParseException("The command cannot be stored in an archive: {}".format(command))
+
+
+def decode_moves(data):
+    """
+    Util method to decode the moves of a game.
+
+    Args:
+        data (bytes): The encoded moves.
+
+    Yields:
+        int: Every packed move.
+    """
+    i, end = 0, len(data)
+    while i < end:
+        code = data[i]
+        if code < DROP_CODES:
+            yield DECODED_DROPS[code]
+            i += 1
+        else:
+            yield DECODED_MOVES[(code << 8 | data[i + 1]) - MOVE_BASE]
+            i += 2
+
+
+def encodeGame(file_input):
+    """
+    Util method to encode a game: its fixed size header followed by its moves.
+
+    Args:
+        file_input (dict): initialPieces, upperCaptures, lowerCaptures and moves of the game, as read by gamefile.py.
+
+    Returns:
+        bytes: The encoded game.
+
+    Raises:
+        FileParseException: If the setup does not fit in the header or a command cannot be stored.
+    """
+    pieces = file_input['initialPieces']
+    hands = (file_input['upperCaptures'], file_input['lowerCaptures'])
+    if len(pieces) > MAX_PIECES or any(len(hand) > HAND_SLOTS for hand in hands):
+        raise FileParseException("The setup has too many pieces to be stored in an archive.")
+    placement = bytearray(2 * MAX_PIECES)
+    for i, piece in enumerate(pieces):
+        try:
+            sq = square(location_to_index(piece['position']))
+        except Exception:
+            raise FileParseException("Invalid square: {}".format(piece['position']))
+        placement[2 * i:2 * i + 2] = piece_code(piece['piece']), sq
+    upper, lower = (bytes(piece_code(name) for name in hand) for hand in hands)
+    moves = [encode_command(command) for command in file_input['moves']]
+    if len(moves) > 0xffff:
+        raise FileParseException("The game has too many moves to be stored in an archive.")
+    return GAME_HEADER.pack(bytes(placement), upper, lower, len(moves)) + b''.join(moves)
+
+
+def writeArchive(path, games):
+    """
+    Util method to write games to an archive file. Games are encoded one at a time, so any number can be written.
+
+    Args:
+        path (str): Path of the archive file.
+        games (iterable): file_input dicts of every game, as read by gamefile.py.
+
+    Returns:
+        int: Number of games written.
+
+    Raises:
+        FileParseException: If a game cannot be stored.
+    """
+    offsets = array('Q')
+    with open(path, 'wb') as f:
+        f.write(bytes(ARCHIVE_HEADER.size))
+        for file_input in games:
+            offsets.append(f.tell())
+            f.write(encodeGame(file_input))
+        index_offset = f.tell()
+        f.write(b''.join(INDEX_ENTRY.pack(offset) for offset in offsets))
+        f.seek(0)
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, len(offsets), index_offset))
+    return len(offsets)
+
+
+class GameRecord:
+    """
+    Class holding one game of an archive. The setup is decoded from the game header, the moves are decoded as
+    they are iterated.
+
+    Attributes:
+        path (str): Archive path and game number, like "games.bxsg:12".
+        num_moves (int): Number of moves of the game.
+    """
+    __slots__ = ('path', 'num_moves', '_header', '_moves')
+
+    def __init__(self, path, header, moves):
+        self.path = path
+        self._header = header
+        self._moves = moves
+        self.num_moves = header[3]
+
+    def setup(self):
+        """
+        Method decodes the initial position of the game.
+
+        Returns:
+            dict: initialPieces, upperCaptures and lowerCaptures, ready to build a Game or a Board with.
+        """
+        placement, upper, lower, _ = self._header
+        pieces = [dict(piece=piece_name(placement[i]), position=index_to_location(square_to_index(placement[i + 1])))
+                  for i in range(0, len(placement), 2) if placement[i]]
+        return dict(initialPieces=pieces, upperCaptures=[piece_name(code) for code in upper if code],
+                    lowerCaptures=[piece_name(code) for code in lower if code])
+
+    def moves(self):
+        """
+        Method iterates over the packed moves of the game, see move.py. They are played with Game.executePackedMove.
+        """
+        return decode_moves(self._moves)
+
+    def fileInput(self):
+        """
+        Method decodes the game into the file_input dict read by gamefile.py, the moves as command strings.
+        """
+        file_input = self.setup()
+        file_input['moves'] = [move_to_string(move) for move in self.moves()]
+        return file_input
+
+
+class GameArchive:
+    """
+    Class reading an archive file through mmap. Game n is found with one lookup in the index table,
+    without reading the games before it.
+
+    Attributes:
+        path (str): Path of the archive file.
+    """
+    def __init__(self, path):
+        """
+        Open the archive and check its header.
+
+        Args:
+            path (str): Path of the archive file.
+
+        Raises:
+            FileParseException: If the file is not an archive or its version is not supported.
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < ARCHIVE_HEADER.size:
+            self.close()
+            raise FileParseException("{} is not a game archive.".format(path))
+        magic, version, _, self._count, self._index = ARCHIVE_HEADER.unpack_from(self._map)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self.close()
+            raise FileParseException("{} is not a version {} game archive.".format(path, ARCHIVE_VERSION))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, n):
+        """
+        Method reads game n of the archive.
+
+        Raises:
+            IndexError: If there is no game n.
+        """
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError("game {} is out of range".format(n))
+        start = INDEX_ENTRY.unpack_from(self._map, self._index + n * INDEX_ENTRY.size)[0]
+        header = GAME_HEADER.unpack_from(self._map, start)
+        moves = start + GAME_HEADER.size
+        end = self._index if n == self._count - 1 else INDEX_ENTRY.unpack_from(self._map, self._index + (n + 1) * INDEX_ENTRY.size)[0]
+        return GameRecord("{}:{}".format(self.path, n), header, self._map[moves:end])
+
+    def __iter__(self):
+        return (self[n] for n in range(self._count))
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
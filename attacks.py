@@ -0,0 +1,187 @@
+from utils import BOARD_SIZE
+from bitboard import NUM_SQUARES, SQUARE_BIT, FULL_MASK, PLAYERS, square_to_index
+
+# Every (column, row) step of a one square mover, by piece name. Steps are written for the lower player,
+# the UPPER player uses the same steps mirrored along the rows.
+DRIVE_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+SHIELD_STEPS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1))
+RELAY_STEPS = ((-1, -1), (-1, 1), (0, 1), (1, -1), (1, 1))
+PREVIEW_STEPS = ((0, 1),)
+
+# Slider directions. Moving along a direction always changes the square number by the same delta,
+# so the nearest blocker is the lowest set bit for positive deltas and the highest set bit for negative ones.
+NOTES_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+GOVERNANCE_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+SLIDER_DIRECTIONS = {'n': NOTES_DIRECTIONS, 'g': GOVERNANCE_DIRECTIONS}
+
+# SQUARE_INDEX[sq] is the (column, row) index tuple of square sq.
+SQUARE_INDEX = tuple(square_to_index(sq) for sq in range(NUM_SQUARES))
+
+
+def _stepMask(sq, steps, forward):
+    """
+    Builds the bitmask of squares reached from sq with one of steps, rows flipped by forward.
+    """
+    col, row = SQUARE_INDEX[sq]
+    mask = 0
+    for i, j in steps:
+        c, r = col + i, row + j * forward
+        if 0 <= c < BOARD_SIZE and 0 <= r < BOARD_SIZE:
+            mask |= SQUARE_BIT[c * BOARD_SIZE + r]
+    return mask
+
+
+def _rayMask(sq, direction):
+    """
+    Builds the bitmask of every square from sq (excluded) to the edge of the board along direction.
+    """
+    col, row = SQUARE_INDEX[sq]
+    mask = 0
+    col, row = col + direction[0], row + direction[1]
+    while 0 <= col < BOARD_SIZE and 0 <= row < BOARD_SIZE:
+        mask |= SQUARE_BIT[col * BOARD_SIZE + row]
+        col, row = col + direction[0], row + direction[1]
+    return mask
+
+
+def _buildStepTables():
+    """
+    Builds the attack masks of every one square mover for every player, promotion state and square.
+
+    Returns:
+        dict: A mapping from (piece name, player, isPromote) to a tuple of 25 bitmasks.
+    """
+    tables = {}
+    for player in PLAYERS:
+        forward = 1 if player == 'lower' else -1
+        shield = tuple(_stepMask(sq, SHIELD_STEPS, forward) for sq in range(NUM_SQUARES))
+        drive = tuple(_stepMask(sq, DRIVE_STEPS, forward) for sq in range(NUM_SQUARES))
+        tables[('d', player, False)] = drive
+        tables[('s', player, False)] = shield
+        tables[('r', player, False)] = tuple(_stepMask(sq, RELAY_STEPS, forward) for sq in range(NUM_SQUARES))
+        tables[('p', player, False)] = tuple(_stepMask(sq, PREVIEW_STEPS, forward) for sq in range(NUM_SQUARES))
+        # Promoted relay and preview move like the shield.
+        tables[('r', player, True)] = shield
+        tables[('p', player, True)] = shield
+        # Sliders only use the step table for the drive moves they gain when promoted.
+        for name in SLIDER_DIRECTIONS:
+            tables[(name, player, False)] = (0,) * NUM_SQUARES
+            tables[(name, player, True)] = drive
+    return tables
+
+
+# STEP_ATTACKS[(name, player, isPromote)][sq] is the attack bitmask of a one square mover on square sq.
+STEP_ATTACKS = _buildStepTables()
+# RAY_MASKS[direction][sq] is the bitmask of the open ray from square sq towards the edge of the board.
+RAY_MASKS = {direction: tuple(_rayMask(sq, direction) for sq in range(NUM_SQUARES))
+             for direction in NOTES_DIRECTIONS + GOVERNANCE_DIRECTIONS}
+# The rays of each slider paired with whether the blocker nearest to the square is the lowest set bit.
+SLIDER_RAYS = {name: tuple((RAY_MASKS[direction], direction[0] * BOARD_SIZE + direction[1] > 0)
+                           for direction in directions)
+               for name, directions in SLIDER_DIRECTIONS.items()}
+# QUEEN_RAYS[sq] is the union of every open ray from square sq, the squares a slider could see sq from.
+QUEEN_RAYS = tuple(sum(RAY_MASKS[direction][sq] for direction in RAY_MASKS) for sq in range(NUM_SQUARES))
+# BETWEEN[a][b] is the bitmask of the squares strictly between a and b when they share a ray, 0 otherwise.
+BETWEEN = tuple(tuple(sum(RAY_MASKS[direction][a] & ~RAY_MASKS[direction][b] & ~SQUARE_BIT[b]
+                          for direction in RAY_MASKS if RAY_MASKS[direction][a] & SQUARE_BIT[b])
+                      for b in range(NUM_SQUARES))
+                for a in range(NUM_SQUARES))
+# SUPPORT_SQUARE[player][sq] is the square right behind sq from player's point of view, None on the back row.
+SUPPORT_SQUARE = {
+    'lower': tuple(sq - 1 if sq % BOARD_SIZE != 0 else None for sq in range(NUM_SQUARES)),
+    'UPPER': tuple(sq + 1 if sq % BOARD_SIZE != BOARD_SIZE - 1 else None for sq in range(NUM_SQUARES)),
+}
+# PROMOTION_ZONE[player] is the bitmask of player's promotion row.
+PROMOTION_ZONE = {
+    'lower': sum(SQUARE_BIT[col * BOARD_SIZE + BOARD_SIZE - 1] for col in range(BOARD_SIZE)),
+    'UPPER': sum(SQUARE_BIT[col * BOARD_SIZE] for col in range(BOARD_SIZE)),
+}
+# COLUMN_MASK[col] is the bitmask of every square of a column.
+COLUMN_MASK = tuple(((1 << BOARD_SIZE) - 1) << col * BOARD_SIZE for col in range(BOARD_SIZE))
+# MASK_INDICES caches the index tuples of attack masks, since only a few hundred different masks exist.
+MASK_INDICES = {}
+
+
+def slider_attacks(name, sq, occupied):
+    """
+    Util method to get the attack bitmask of a notes or governance on square sq.
+    Each ray is cut right after its nearest blocker with a single lookup of the blocker's own ray.
+
+    Args:
+        name (str): Piece name, either 'n' or 'g'.
+        sq (int): Square number of the piece.
+        occupied (int): bitmask of pieces that block the rays.
+
+    Returns:
+        int: bitmask of every square the slider reaches, blockers included.
+    """
+    attacks = 0
+    for rays, ascending in SLIDER_RAYS[name]:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            if ascending:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= rays[blocker]
+        attacks |= ray
+    return attacks
+
+
+def mask_to_moves(mask):
+    """
+    Util method to convert an attack bitmask to a move tuple of index tuples, cached per mask.
+
+    Args:
+        mask (int): bitmask of squares.
+
+    Returns:
+        tuple: index tuples of every set bit.
+    """
+    moves = MASK_INDICES.get(mask)
+    if moves is None:
+        moves = []
+        rest = mask
+        while rest:
+            low = rest & -rest
+            moves.append(SQUARE_INDEX[low.bit_length() - 1])
+            rest ^= low
+        moves = tuple(moves)
+        MASK_INDICES[mask] = moves
+    return moves
+
+
+def piece_attacks(name, player, is_promote, sq, occupied):
+    """
+    Util method to get the attack bitmask of any piece type standing on square sq.
+
+    Args:
+        name (str): Piece name, like 'n'.
+        player (str): Player the piece belongs to.
+        is_promote (bool): True if the piece is promoted.
+        sq (int): Square number of the piece.
+        occupied (int): bitmask of pieces that block notes and governance rays.
+
+    Returns:
+        int: bitmask of every square the piece reaches.
+    """
+    if name in SLIDER_DIRECTIONS:
+        return slider_attacks(name, sq, occupied) | STEP_ATTACKS[(name, player, is_promote)][sq]
+    return STEP_ATTACKS[(name, player, is_promote)][sq]
+
+
+def supported_squares(player, mask):
+    """
+    Util method to get the squares player's pieces on mask would support, the squares right in front of them.
+
+    Args:
+        player (str): The player owning the pieces.
+        mask (int): bitmask of squares.
+
+    Returns:
+        int: bitmask of the squares whose support square is in mask.
+    """
+    if player == 'lower':
+        return (mask << 1) & ~PROMOTION_ZONE['UPPER'] & FULL_MASK
+    return (mask >> 1) & ~PROMOTION_ZONE['lower']
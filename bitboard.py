@@ -0,0 +1,202 @@
+from utils import BOARD_SIZE, PIECE_NAMES, PLAYERS
+from zobrist import NUM_SQUARES, PIECE_KEYS
+
+FULL_MASK = (1 << NUM_SQUARES) - 1
+# PIECE_MASK_KEYS are the (player, piece name) keys of BitboardPosition.pieces, shared by every position.
+PIECE_MASK_KEYS = tuple((player, name) for player in PLAYERS for name in PIECE_NAMES)
+# SQUARE_BIT[sq] is the single bit mask of square sq.
+SQUARE_BIT = tuple(1 << sq for sq in range(NUM_SQUARES))
+
+
+def square(index):
+    """
+    Util method to convert an index tuple to its square number.
+    Squares are numbered column by column, so that square = col * 5 + row, matching the board's [col][row] layout.
+
+    Args:
+        index (tuple): index tuple of the form (column, row)
+
+    Returns:
+        int: square number in range 0-24.
+    """
+    return index[0] * BOARD_SIZE + index[1]
+
+
+def square_to_index(sq):
+    """
+    Util method to convert a square number back to its index tuple.
+
+    Args:
+        sq (int): square number in range 0-24.
+
+    Returns:
+        tuple: index tuple of the form (column, row)
+    """
+    return divmod(sq, BOARD_SIZE)
+
+
+def mask_from_indices(indices):
+    """
+    Util method to build a bitmask from an iterable of index tuples.
+
+    Args:
+        indices (iterable): index tuples of the form (column, row)
+
+    Returns:
+        int: bitmask with the bit of every index set.
+    """
+    mask = 0
+    for index in indices:
+        mask |= SQUARE_BIT[index[0] * BOARD_SIZE + index[1]]
+    return mask
+
+
+def squares_of(mask):
+    """
+    Util method to iterate over the square numbers set in a bitmask, lowest square first.
+
+    Args:
+        mask (int): bitmask of squares.
+
+    Yields:
+        int: square number of every set bit.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def indices_from_mask(mask):
+    """
+    Util method to convert a bitmask into a list of index tuples.
+
+    Args:
+        mask (int): bitmask of squares.
+
+    Returns:
+        list: index tuples of every set bit.
+    """
+    return [divmod(sq, BOARD_SIZE) for sq in squares_of(mask)]
+
+
+class BitboardPosition:
+    """
+    BitboardPosition holds the piece placement of a board as 25 bit integers, one bit per square.
+    The masks are updated incrementally on every placement change, so occupancy queries are single integer operations.
+
+    Attributes:
+        occupied (int): bitmask of every occupied square.
+        sides (Mapping[str -> int]): A mapping from player to the bitmask of its pieces.
+        pieces (Mapping[(str, str) -> int]): A mapping from (player, piece name) to the bitmask of those pieces.
+        promoted (int): bitmask of squares holding a promoted piece.
+        squares (list): 25 entries, the Piece object on each square or None.
+        key (int): Zobrist key of the piece placement, see zobrist.py.
+        dirty (int): bitmask of squares changed since the board last refreshed its attack maps.
+    """
+    def __init__(self):
+        self.key = 0
+        self.dirty = FULL_MASK
+        self.occupied = 0
+        self.sides = {player: 0 for player in PLAYERS}
+        self.pieces = dict.fromkeys(PIECE_MASK_KEYS, 0)
+        self.promoted = 0
+        self.squares = [None] * NUM_SQUARES
+
+    def addPiece(self, piece, sq):
+        """
+        Method to place a piece on an empty square.
+
+        Args:
+            piece (Piece): Piece to be placed.
+            sq (int): Destination square number.
+        """
+        bit = SQUARE_BIT[sq]
+        self.squares[sq] = piece
+        self.dirty |= bit
+        self.occupied |= bit
+        self.sides[piece.player] |= bit
+        self.pieces[(piece.player, piece.name[-1])] |= bit
+        if piece.isPromote:
+            self.promoted |= bit
+        self.key ^= PIECE_KEYS[(piece.player, piece.name[-1], piece.isPromote)][sq]
+
+    def removePiece(self, sq):
+        """
+        Method to remove the piece on a square.
+
+        Args:
+            sq (int): Square number to be cleared.
+
+        Returns:
+            Piece: The piece that was removed, None if the square was empty.
+        """
+        piece = self.squares[sq]
+        if piece is None:
+            return None
+        bit = SQUARE_BIT[sq]
+        clear = ~bit
+        self.squares[sq] = None
+        self.dirty |= bit
+        self.occupied &= clear
+        self.sides[piece.player] &= clear
+        self.pieces[(piece.player, piece.name[-1])] &= clear
+        self.key ^= PIECE_KEYS[(piece.player, piece.name[-1], self.promoted & bit != 0)][sq]
+        self.promoted &= clear
+        return piece
+
+    def movePiece(self, origin, dest):
+        """
+        Method to move the piece on origin to an empty dest square.
+
+        Args:
+            origin (int): Origin square number.
+            dest (int): Destination square number.
+        """
+        piece = self.squares[origin]
+        move_bits = SQUARE_BIT[origin] | SQUARE_BIT[dest]
+        self.squares[dest] = piece
+        self.squares[origin] = None
+        self.dirty |= move_bits
+        self.occupied ^= move_bits
+        self.sides[piece.player] ^= move_bits
+        self.pieces[(piece.player, piece.name[-1])] ^= move_bits
+        keys = PIECE_KEYS[(piece.player, piece.name[-1], self.promoted & SQUARE_BIT[origin] != 0)]
+        self.key ^= keys[origin] ^ keys[dest]
+        if self.promoted & SQUARE_BIT[origin]:
+            self.promoted ^= move_bits
+
+    def setPromoted(self, sq, is_promote=True):
+        """
+        Method to update the promotion bit of a square.
+
+        Args:
+            sq (int): Square number of the promoted piece.
+            is_promote (bool): New promotion state.
+                (default value True)
+        """
+        was_promote = self.promoted & SQUARE_BIT[sq] != 0
+        if was_promote == is_promote:
+            return
+        piece = self.squares[sq]
+        name = piece.name[-1]
+        self.key ^= PIECE_KEYS[(piece.player, name, False)][sq] ^ PIECE_KEYS[(piece.player, name, True)][sq]
+        self.dirty |= SQUARE_BIT[sq]
+        if is_promote:
+            self.promoted |= SQUARE_BIT[sq]
+        else:
+            self.promoted &= ~SQUARE_BIT[sq]
+
+    def getPiece(self, sq):
+        """
+        Returns:
+            Piece: The piece on square sq, None if the square is empty.
+        """
+        return self.squares[sq]
+
+    def getPieceMask(self, player, name):
+        """
+        Returns:
+            int: bitmask of player's pieces with the given name.
+        """
+        return self.pieces[(player, name)]
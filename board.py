@@ -3,6 +3,11 @@ from utils import *
 from piece import *
 from exceptions import FileParseException
 from player import Player
+from bitboard import BitboardPosition, SQUARE_BIT, FULL_MASK, PIECE_NAMES, square, squares_of, mask_from_indices, indices_from_mask
+from attacks import SQUARE_INDEX, QUEEN_RAYS, BETWEEN, SUPPORT_SQUARE, supported_squares, PROMOTION_ZONE, COLUMN_MASK, piece_attacks, mask_to_moves
+from zobrist import HAND_KEYS, SIDE_KEY, MAX_HAND, hand_key
+from fen import board_to_fen, parse_fen
+from move import UndoRecord, encode_move, encode_drop, move_dest, move_origin, is_drop, is_promote, drop_name
 
 BOARD_SIZE = 5
 
@@ -15,7 +20,11 @@ class Board:
         lower_player (Player): player object representing the lower player.
         upper_player (Player): player object representing the upper player.
         players (dist): A mapping from player name to its object.
-        _board (matrix): A 5x5 matrix of empty strings and Piece objects representing the current board.
+        position (BitboardPosition): Bitboard masks and square contents representing the current board.
+        side_to_move (str): The player whose move it is.
+        hand_key (int): Zobrist key of both players' captured pieces, see zobrist.py.
+        attack_cache (list): 25 entries, the pieceMoveMask of the piece on each square. Only occupied squares are kept up to date.
+        attack_maps (Mapping[str -> int]): A mapping from player to the bitmask of squares its pieces control.
     """
     def __init__(self, game_mode, file_input=None):
         """
@@ -29,13 +38,19 @@ class Board:
         self.lower_player = Player('lower')
         self.upper_player = Player('UPPER')
         self.players = {'lower': self.lower_player, 'UPPER': self.upper_player}
+        self.side_to_move = 'lower'
         if game_mode == 'f':
             self._initFilePieces(file_input)
-            self._board = self._initBoard()
+            self.position = self._initBoard()
         else:
             self.createUpperPieces()
             self.createLowerPieces()
-            self._board = self._initBoard()
+            self.position = self._initBoard()
+        self.hand_key = hand_key('lower', self.lower_player.getCaptured()) ^ hand_key('UPPER', self.upper_player.getCaptured())
+        self.attack_cache = [0] * len(self.position.squares)
+        self.attack_maps = {'lower': 0, 'UPPER': 0}
+        # Squares changed since each player's attack map was last refreshed.
+        self._pending = {'lower': 0, 'UPPER': 0}
         self.initializeSpecialPieces()
 
     def _initBoard(self):
@@ -43,13 +58,12 @@ class Board:
         Method to initialize the board with current player pieces at their locations.
 
         Returns:
-            Matrix: A 5x5 matrix representing the game board.
+            BitboardPosition: The position holding every active piece.
         """
-        board = [['' for i in range(BOARD_SIZE)] for j in range(BOARD_SIZE)]
+        position = BitboardPosition()
         for i in self.lower_player.getPieces() + self.upper_player.getPieces():
-            index = i.getIndex()
-            board[index[0]][index[1]] = i
-        return board
+            position.addPiece(i, square(i.getIndex()))
+        return position
 
     def _initFilePieces(self, file_input):
         """
@@ -60,38 +74,34 @@ class Board:
             file_input (dist): Dictionary representing data from the file.
 
         Raises:
-            FileParseException: Exception thrown if there is some issue with the file leading to corrupted file_input data.
-        """
-        piece_dict = {
-            'd': self.lower_player.getDrive(),
-            'n': Notes('lower', (0, 0)),
-            's': Shield('lower', (0, 0)),
-            'r': Relay('lower', (0, 0)),
-            'g': Governanace('lower', (0, 0)),
-            'p': Preview('lower', (0, 0)),
-            'D': self.upper_player.getDrive(),
-            'N': Notes('UPPER', (0, 0)),
-            'S': Shield('UPPER', (0, 0)),
-            'R': Relay('UPPER', (0, 0)),
-            'G': Governanace('UPPER', (0, 0)),
-            'P': Preview('UPPER', (0, 0)),
-        }
+            FileParseException: Exception thrown if there is some issue with the file leading to corrupted file_input data,
+                or if the position holds more than MAX_HAND pieces of one type.
+        """
         try:
             for i in file_input['initialPieces']:
-                # Accounting for promoted pieces.
-                if len(i['piece']) == 2:
-                    piece_dict[i['piece'][1]].promote()
-                    i['piece'] = i['piece'][1]
-                piece = piece_dict[i['piece']]
-                piece.updateLocation(location_to_index(i['position']))
-                if piece.getPlayerType() == 'lower':
-                    self.lower_player.addPiece(piece)
+                name = i['piece']
+                player = self.lower_player if name[-1].islower() else self.upper_player
+                index = location_to_index(i['position'])
+                if name[-1].lower() == 'd':
+                    piece = player.getDrive()
+                    piece.updateLocation(index)
                 else:
-                    self.upper_player.addPiece(piece)
+                    piece = Board.createPieceFromName(name[-1], player.getType(), index)
+                if piece is None:
+                    raise FileParseException("Unknown piece: {}".format(name))
+                # Accounting for promoted pieces.
+                if len(name) == 2:
+                    piece.promote()
+                player.addPiece(piece)
             self.upper_player.setCaptured(file_input['upperCaptures'])
             self.lower_player.setCaptured(file_input['lowerCaptures'])
         except:
             raise FileParseException("Error while parsing input file.")
+        # The hand keys only go up to MAX_HAND pieces of a type.
+        names = [piece.name[-1].lower() for player in self.players.values() for piece in player.getPieces()]
+        names += [entry[-1].lower() for player in self.players.values() for entry in player.getCaptured()]
+        if any(names.count(name) > MAX_HAND for name in set(names)):
+            raise FileParseException("A position cannot hold more than {} pieces of one type.".format(MAX_HAND))
 
     def initializeSpecialPieces(self):
         """
@@ -99,7 +109,7 @@ class Board:
         """
         all_pieces_location = self.getAllPieceLocations()
         for i in self.lower_player.getPieces() + self.upper_player.getPieces():
-            if isinstance(i, Notes) or isinstance(i, Governanace):
+            if IS_SLIDER[i.type_code]:
                 i.updateMoves(all_pieces_location)
 
     def getLowerPlayer(self):
@@ -160,10 +170,7 @@ class Board:
             origin (str): Origin square of the form like a1
             dest (str): Destination square of the form like a1
         """
-        orig = location_to_index(origin)
-        dest = location_to_index(dest)
-        self._board[dest[0]][dest[1]] = self._board[orig[0]][orig[1]]
-        self._board[orig[0]][orig[1]] = ''
+        self.position.movePiece(square(location_to_index(origin)), square(location_to_index(dest)))
 
     def capture(self, origin, dest):
         """
@@ -174,15 +181,77 @@ class Board:
             origin (str): Origin square of the form like a1
             dest (str): Destination square of the form like a1
         """
-        d = location_to_index(dest)
-        if isinstance(self._board[d[0]][d[1]], Piece):
-            captured = self.getPiece(dest)
+        captured = self.position.removePiece(square(location_to_index(dest)))
+        if captured is not None:
             if captured.getPlayerType().islower():
-                self.upper_player.addCapture(captured.toString()[-1].upper())
+                self.addCapture('UPPER', captured.toString()[-1].upper())
             else:
-                self.lower_player.addCapture(captured.toString()[-1].lower())
+                self.addCapture('lower', captured.toString()[-1].lower())
         self.move(origin, dest)
 
+    def addCapture(self, player, name, slot=None):
+        """
+        Method to add a captured piece to player's hand and update the hand key.
+
+        Args:
+            player (str): String representing the capturing player.
+            name (str): Captured piece name, cased like player.
+            slot (int): Position of the entry in capture order.
+                (default value None, the last one)
+        """
+        hand = self.players[player].captured
+        keys = HAND_KEYS[(player, name[-1].lower())]
+        count = hand.count(name)
+        self.hand_key ^= keys[count] ^ keys[count + 1]
+        hand.add(name, slot)
+
+    def removeCapture(self, player, name, slot=None):
+        """
+        Method to remove a dropped piece from player's hand and update the hand key.
+
+        Args:
+            player (str): String representing the dropping player.
+            name (str): Name of the hand entry, like 'S' or '+n'.
+            slot (int): Position of the entry in capture order.
+                (default value None, the first entry with that name)
+
+        Returns:
+            int: Position the entry had in capture order.
+        """
+        hand = self.players[player].captured
+        keys = HAND_KEYS[(player, name[-1].lower())]
+        count = hand.count(name)
+        self.hand_key ^= keys[count] ^ keys[count - 1]
+        return hand.remove(name, slot)
+
+    def getZobristKey(self):
+        """
+        Method to get the 64 bit Zobrist key of the position, covering piece squares, promotions,
+        side to move and both players' captured pieces. It is kept up to date incrementally.
+
+        Returns:
+            int: The position key.
+        """
+        key = self.position.key ^ self.hand_key
+        if self.side_to_move == 'UPPER':
+            key ^= SIDE_KEY
+        return key
+
+    def computeZobristKey(self):
+        """
+        Method to compute the Zobrist key from scratch, used to verify the incremental key.
+
+        Returns:
+            int: The position key.
+        """
+        position = BitboardPosition()
+        for i in self.lower_player.getPieces() + self.upper_player.getPieces():
+            position.addPiece(i, square(i.getIndex()))
+        key = position.key ^ hand_key('lower', self.lower_player.getCaptured()) ^ hand_key('UPPER', self.upper_player.getCaptured())
+        if self.side_to_move == 'UPPER':
+            key ^= SIDE_KEY
+        return key
+
     def drop(self, piece, index):
         """
         Method to drop a piece to an index. Illegal action checks done by game controller.
@@ -191,7 +260,29 @@ class Board:
             piece (Piece): Piece to be dropped.
             index (tuple): Index tuple representing destination.
         """
-        self._board[index[0]][index[1]] = piece
+        self.position.addPiece(piece, square(index))
+
+    def undoDrop(self, index):
+        """
+        Method to take back a dropped piece that turned out to be an illegal drop.
+
+        Args:
+            index (tuple): Index tuple the piece was dropped on.
+
+        Returns:
+            Piece: The piece that was taken back.
+        """
+        return self.position.removePiece(square(index))
+
+    def promotePiece(self, piece):
+        """
+        Method to promote a piece on the board and record the promotion in the position.
+
+        Args:
+            piece (Piece): Piece to be promoted.
+        """
+        piece.promote()
+        self.position.setPromoted(square(piece.getIndex()), piece.isPromote)
 
     def removePiece(self, piece, player):
         """
@@ -217,15 +308,11 @@ class Board:
             None: If no piece is at the location.
             Piece: If a piece exists at the location.
         """
-        col, row = location_to_index(location)
-        piece_at_location = self._board[col][row]
-        if isinstance(piece_at_location, Piece):
-            return piece_at_location
-        return None
+        return self.position.getPiece(square(location_to_index(location)))
 
     def getAllPieceLocations(self, remove_drive=None):
         """
-        Method returns a list of all piece locations.
+        Method returns a bitmask of all piece locations.
         Method is used to detect blockages for notes and governance pieces.
 
         Args:
@@ -233,51 +320,38 @@ class Board:
                 (default value None)
 
         Returns:
-            list: List of all piece locations, except remove_drive
+            int: bitmask of all piece locations, except remove_drive
         """
-        locations = list()
-        for i in self.lower_player.getPieces() + self.upper_player.getPieces():
-            if i == remove_drive:
-                continue
-            locations.append(i.getIndex())
-        return locations
+        if remove_drive is None:
+            return self.position.occupied
+        return self.position.occupied & ~SQUARE_BIT[square(remove_drive.getIndex())]
 
     def getActivePieceLocations(self, player):
         """
-        Method returns a list containing a location of all of player's pieces.
+        Method returns a bitmask containing the location of all of player's pieces.
 
         Args:
             player (str): String representing the player.
 
         Returns:
-            list: List with locations of all of player's pieces.
+            int: bitmask with locations of all of player's pieces.
         """
-        blocked_location = set()
-        for i in self.players[player].getPieces():
-            blocked_location.add(i.getIndex())
-        return list(blocked_location)
+        return self.position.sides[player]
 
     def getAllMoves(self, player):
         """
-        Method gets a list of possible squares player's pieces currently control.
-        This list is used for detecting illegal moves for drive, since it cannot move into check.
+        Method gets a bitmask of the squares player's pieces currently control.
+        This mask is used for detecting illegal moves for drive, since it cannot move into check,
+        so notes and governance rays go through the other player's drive.
 
         Args:
             player (str): String representing the player.
 
         Returns:
-            list: List containing every square player (index tuple) currently controls.
+            int: bitmask containing every square player currently controls.
         """
-        moves = set()
         opponent_player = 'UPPER' if player == 'lower' else 'lower'
-        for i in self.players[player].getPieces():
-            if isinstance(i, Notes) or isinstance(i, Governanace):
-                i.updateMoves(self.getAllPieceLocations(self.players[opponent_player].getDrive()))
-            else:
-                i.updateMoves()
-            self.updateSupportPieceMoves(i)
-            moves.update(i.getMoves())
-        return list(moves)
+        return self.attackedSquares(player, self.position.occupied & ~self.position.pieces[(opponent_player, 'd')])
 
     def getPlayerDrive(self, player):
         """
@@ -304,16 +378,42 @@ class Board:
             list: Of moves (index tuples) that can result in a capture.
         """
         capture_moves = set()
-        for i in self.players[player].getPieces():
-            if isinstance(i, Drive):
-                continue
-            i.updateMoves()
-            self.updateSupportPieceMoves(i)
-            for j in i.getMoves():
-                if j == piece_location:
-                    capture_moves.add("move {} {}".format(index_to_location(i.getIndex()), index_to_location(j)))
+        target = SQUARE_BIT[square(piece_location)]
+        self.refreshAttacks(player)
+        for sq in squares_of(self.position.sides[player] & ~self.position.pieces[(player, 'd')]):
+            if self.attack_cache[sq] & target:
+                capture_moves.add("move {} {}".format(index_to_location(SQUARE_INDEX[sq]), index_to_location(piece_location)))
         return capture_moves
 
+    def getDriveEscapeMask(self, defend_king):
+        """
+        Method to get the squares a drive in check can move to, the ones the other player does not control.
+        Squares behind the drive on a checking ray count as controlled, and support moves are included.
+
+        Args:
+            defend_king (Drive): Drive object currently under check.
+
+        Returns:
+            int: bitmask of the squares that move the drive out of check.
+        """
+        player = defend_king.getPlayerType()
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        sq = square(defend_king.getIndex())
+        return self.pieceMoveMask(sq) & ~self.position.sides[player] & ~self.getAllMoves(opponent)
+
+    def getDriveEscapeMoves(self, defend_king):
+        """
+        Method to get the moves of a drive in check onto squares the other player does not control, see getDriveEscapeMask.
+
+        Args:
+            defend_king (Drive): Drive object currently under check.
+
+        Returns:
+            list: of full move strings of the form ("move a2 a3"), which move the drive out of check.
+        """
+        return ["move {} {}".format(index_to_location(defend_king.getIndex()), index_to_location(SQUARE_INDEX[dest]))
+                for dest in squares_of(self.getDriveEscapeMask(defend_king))]
+
     def getBlockMoves(self, attack_piece, defend_king):
         """
         Method to get a list of moves to block a check by moving a piece in the way or dropping a piece in the way.
@@ -322,7 +422,8 @@ class Board:
         1. Block the check with a drop move.
         2. Block the check by moving an active piece.
 
-        isBetween is a util method that return true if some test value is in between the two other arguments.
+        The path is every square between the attacking piece and the drive on the ray they share,
+        so checks coming from notes or governance support moves can be blocked too.
 
         Args:
             attack_piece (Piece): Piece currently attacking the opponent's drive.
@@ -333,96 +434,497 @@ class Board:
         """
         # Setup: Getting the path between the king and attacking piece #
         block_moves = list()
-        path_between_pieces = list()
-        drive_location = defend_king.getIndex()
-        attack_location = attack_piece.getIndex()
-        if isinstance(attack_piece, Notes):
-            for i in attack_piece.getMoves():
-                if i[0] == drive_location[0] and isBetween(i[1], attack_location[1], drive_location[1]):
-                    path_between_pieces.append(i)
-                if i[1] == drive_location[1] and isBetween(i[0], attack_location[0], drive_location[0]):
-                    path_between_pieces.append(i)
-        elif isinstance(attack_piece, Governanace):
-            for i in attack_piece.getMoves():
-                if isBetween(i[0], attack_location[0], drive_location[0]) and isBetween(i[1], attack_location[1], drive_location[1]):
-                    path_between_pieces.append(i)
-        else:
-            return []
+        path_mask = BETWEEN[square(attack_piece.getIndex())][square(defend_king.getIndex())]
+        path_between_pieces = indices_from_mask(path_mask)
 
         # 1. Drop Moves #
 
+        held = self.players[defend_king.getPlayerType()].getCaptured().types()
         for index in path_between_pieces:
-            for piece_name in self.players[defend_king.getPlayerType()].getCaptured():
-                block_moves.append("drop {} {}".format(piece_name.lower(), index_to_location(index)))
+            for piece_name in held:
+                block_moves.append("drop {} {}".format(piece_name, index_to_location(index)))
 
         # 2. Block by moving a piece #
 
-        for piece in self.players[defend_king.getPlayerType()].getPieces():
-            if isinstance(piece, Drive):
-                continue
-            for move in piece.getMoves():
-                if move in path_between_pieces:
-                    block_moves.append("move {} {}".format(index_to_location(piece.getIndex()), index_to_location(move)))
+        player = defend_king.getPlayerType()
+        self.refreshAttacks(player)
+        for sq in squares_of(self.position.sides[player] & ~self.position.pieces[(player, 'd')]):
+            for move in squares_of(self.attack_cache[sq] & path_mask):
+                block_moves.append("move {} {}".format(index_to_location(SQUARE_INDEX[sq]), index_to_location(SQUARE_INDEX[move])))
 
         return block_moves
 
-    def getNotesGovernanceMoves(self, player, piece=None):
+    def getNotesGovernanceMoves(self, player):
         """
         Method to return the current moves of player's notes and governance pieces.
         Used to detect pins and discovered attacks.
         Args:
             player (str): Player string representing the player under examine.
-            piece (Piece): A piece object representing a piece that on tis current move captures the notes or governance.
-                (default value None)
 
         Returns:
             list: containing all squares (index tuples) controlled by player's notes and governance
         """
         moves = []
+        occupied = self.position.occupied
         for i in self.players[player].getPieces():
-            if isinstance(i, Notes) or isinstance(i, Governanace):
-                # To account for captures.
-                if piece and i.getIndex() == piece.getIndex():
-                    continue
-                i.updateMoves(self.getAllPieceLocations())
+            if IS_SLIDER[i.type_code]:
+                i.updateMoves(occupied)
                 self.updateSupportPieceMoves(i)
                 moves.extend(i.getMoves())
         return moves
 
     def updateSupportPieceMoves(self, piece, dropped_piece=None):
         """
-        Method updates a passed in piece's moves.
+        Method adds to a passed in piece's moves the moves of the same team piece right behind it,
+        as if that support piece was standing on piece's square.
+        The support moves are read from the attack tables, so no piece is relocated to compute them.
 
         Args:
             piece (Piece): The piece whose moves are to be updated.
+            dropped_piece (Piece): A piece being dropped onto piece's square, used as the support piece.
+                (default value None)
         """
-        # Three cases since Notes and Governance need to account for blocks
         support_location = piece.getIndex()
         backwards = -1 if piece.getPlayerType() == 'lower' else 1
         support_location = (support_location[0], support_location[1] + backwards)
         if checkBounds(support_location[0]) and checkBounds(support_location[1]):
-            support_piece = self._board[support_location[0]][support_location[1]]
+            occupied = self.position.occupied
+            own_pieces = self.position.sides[piece.getPlayerType()]
             if dropped_piece:
-                support_location = piece.getIndex()
-                dropped_piece.updateLocation(support_location)
+                dropped_piece.updateLocation(piece.getIndex())
                 support_piece = dropped_piece
-            if isinstance(support_piece, Piece) and support_piece.getPlayerType() == piece.getPlayerType():
-                support_piece_orig_index = support_piece.getIndex()
-                support_piece.updateLocation(piece.getIndex())
-                if isinstance(support_piece, Notes) or isinstance(support_piece, Governanace):
-                    support_piece.updateMoves(self.getAllPieceLocations())
-                #  Drive needs to account for checks.
-                elif isinstance(support_piece, Drive):
-                    support_piece.updateMoves(list(),
-                                      self.getActivePieceLocations(piece.getPlayerType()))
-                else:
-                    support_piece.updateMoves()
-                support_move_list = support_piece.getMoves()
-                piece.updateSupportMoves(support_move_list)
-                if not dropped_piece:
-                    support_piece.updateLocation(support_piece_orig_index)
+            else:
+                support_piece = self.position.getPiece(square(support_location))
+                # The support piece is looked at from piece's square, so its own square is vacated.
+                vacated = ~SQUARE_BIT[square(support_location)]
+                occupied &= vacated
+                own_pieces &= vacated
+            if support_piece is not None and support_piece.getPlayerType() == piece.getPlayerType():
+                support_moves = piece_attacks(support_piece.name[-1], support_piece.player, support_piece.isPromote,
+                                              square(piece.getIndex()), occupied)
+                #  Drive cannot move onto its own pieces.
+                if support_piece.type_code == DRIVE:
+                    support_moves &= ~own_pieces
+                piece.updateSupportMoves(support_moves)
+
+    def make_move(self, move):
+        """
+        Method to make a packed move (see move.py) for the side to move, without any legality checks.
+        Everything needed to take the move back is kept in the returned undo record.
+
+        Args:
+            move (int): Packed move or drop.
+
+        Returns:
+            UndoRecord: Record to pass to unmake_move.
+        """
+        position = self.position
+        dest = move_dest(move)
+        player = self.players[self.side_to_move]
+        if is_drop(move):
+            name = drop_name(move)
+            name = name if player.type == 'lower' else name.upper()
+            # Hands from a file may hold the promoted name of a piece.
+            hand_entry = player.captured.entry(name)
+            hand_slot = self.removeCapture(player.type, hand_entry)
+            piece = Board.createPieceFromName(name, player.type, SQUARE_INDEX[dest])
+            player.pieces.append(piece)
+            position.addPiece(piece, dest)
+            undo = UndoRecord(move, piece, hand_slot=hand_slot, hand_entry=hand_entry)
+        else:
+            origin = move_origin(move)
+            piece = position.squares[origin]
+            captured = position.removePiece(dest)
+            undo = UndoRecord(move, piece, captured)
+            if captured is not None:
+                opponent = self.players[captured.player]
+                undo.captured_slot = opponent.pieces.index(captured)
+                del opponent.pieces[undo.captured_slot]
+                undo.hand_slot = len(player.captured)
+                self.addCapture(player.type, captured.name[-1] if player.type == 'lower' else captured.name[-1].upper())
+            position.movePiece(origin, dest)
+            piece.updateLocation(SQUARE_INDEX[dest])
+            if is_promote(move) and not piece.isPromote and piece.promote():
+                position.setPromoted(dest)
+                undo.promoted = True
+        self.side_to_move = 'UPPER' if self.side_to_move == 'lower' else 'lower'
+        return undo
+
+    def unmake_move(self, undo):
+        """
+        Method to take back the move recorded in undo. Moves must be taken back in the reverse order they were made.
+
+        Args:
+            undo (UndoRecord): Record returned by make_move.
+        """
+        self.side_to_move = 'UPPER' if self.side_to_move == 'lower' else 'lower'
+        position = self.position
+        player = self.players[self.side_to_move]
+        move = undo.move
+        dest = move_dest(move)
+        piece = undo.piece
+        if is_drop(move):
+            position.removePiece(dest)
+            player.pieces.pop()
+            # Putting the entry back where it was keeps the capture order.
+            self.addCapture(player.type, undo.hand_entry, undo.hand_slot)
+        else:
+            origin = move_origin(move)
+            if undo.promoted:
+                piece.demote()
+                position.setPromoted(dest, False)
+            position.movePiece(dest, origin)
+            piece.updateLocation(SQUARE_INDEX[origin])
+            captured = undo.captured
+            if captured is not None:
+                self.removeCapture(player.type, player.captured[undo.hand_slot], undo.hand_slot)
+                self.players[captured.player].pieces.insert(undo.captured_slot, captured)
+                position.addPiece(captured, dest)
+
+    def pieceMoveMask(self, sq, occupied=None):
+        """
+        Method to get the bitmask of squares the piece on sq reaches, support moves included.
+        Same team pieces are not removed from the mask, so it also gives the squares the piece defends.
+
+        Args:
+            sq (int): Square number of the piece.
+            occupied (int): bitmask of pieces that block notes and governance rays.
+                (default value None, the current board)
+
+        Returns:
+            int: bitmask of the piece's moves.
+        """
+        position = self.position
+        if occupied is None:
+            occupied = position.occupied
+        piece = position.squares[sq]
+        player = piece.player
+        moves = piece_attacks(piece.name[-1], player, piece.isPromote, sq, occupied)
+        support_sq = SUPPORT_SQUARE[player][sq]
+        if support_sq is not None:
+            support_piece = position.squares[support_sq]
+            if support_piece is not None and support_piece.player == player:
+                vacated = ~SQUARE_BIT[support_sq]
+                # A drive used as support cannot move onto its own pieces, but it still defends them.
+                moves |= piece_attacks(support_piece.name[-1], player, support_piece.isPromote, sq, occupied & vacated)
+        return moves
+
+    def attackedSquares(self, player, occupied=None):
+        """
+        Method to get the bitmask of every square player's pieces currently control.
+        The attack map is brought up to date first, and with a different occupied mask only
+        the pieces whose rays cross a changed square are recomputed.
+
+        Args:
+            player (str): String representing the player.
+            occupied (int): bitmask of pieces that block notes and governance rays.
+                (default value None, the current board)
+
+        Returns:
+            int: bitmask of the squares controlled by player.
+        """
+        attacks = self.refreshAttacks(player)
+        if occupied is None or occupied == self.position.occupied:
+            return attacks
+        recompute = self._rayPieces(player) & self._raysThrough(self.position.occupied ^ occupied)
+        if not recompute:
+            return attacks
+        cache = self.attack_cache
+        attacks = 0
+        side = self.position.sides[player]
+        while side:
+            low = side & -side
+            sq = low.bit_length() - 1
+            attacks |= self.pieceMoveMask(sq, occupied) if recompute & low else cache[sq]
+            side ^= low
+        return attacks
+
+    def refreshAttacks(self, player):
+        """
+        Method to bring player's entries of attack_cache and its attack map up to date with the squares
+        changed since its last refresh. A piece is recomputed when its square or its support square changed,
+        or when it uses notes or governance rays and a changed square is on one of its rays.
+
+        Args:
+            player (str): String representing the player.
+
+        Returns:
+            int: bitmask of the squares controlled by player.
+        """
+        position = self.position
+        if position.dirty:
+            for side in self._pending:
+                self._pending[side] |= position.dirty
+            position.dirty = 0
+        changed = self._pending[player]
+        if not changed:
+            return self.attack_maps[player]
+        self._pending[player] = 0
+        side = position.sides[player]
+        stale = (changed | supported_squares(player, changed) | self._rayPieces(player) & self._raysThrough(changed)) & side
+        cache = self.attack_cache
+        attacks = 0
+        while side:
+            low = side & -side
+            sq = low.bit_length() - 1
+            if stale & low:
+                cache[sq] = self.pieceMoveMask(sq)
+            attacks |= cache[sq]
+            side ^= low
+        self.attack_maps[player] = attacks
+        return attacks
+
+    def _rayPieces(self, player):
+        """
+        Returns:
+            int: bitmask of player's pieces whose moves depend on the pieces around them, that is
+                notes and governance pieces and the pieces they support.
+        """
+        pieces = self.position.pieces
+        sliders = pieces[(player, 'n')] | pieces[(player, 'g')]
+        return sliders | supported_squares(player, sliders) & self.position.sides[player]
 
+    @staticmethod
+    def _raysThrough(mask):
+        """
+        Returns:
+            int: bitmask of every square sharing a ray with a square of mask.
+        """
+        rays = 0
+        while mask:
+            low = mask & -mask
+            rays |= QUEEN_RAYS[low.bit_length() - 1]
+            mask ^= low
+        return rays
 
+    def getCheckers(self, player):
+        """
+        Method to get the pieces giving check to player's drive, read from the attack maps.
+
+        Args:
+            player (str): String representing the player whose drive is examined.
+
+        Returns:
+            list: Pieces of the other player controlling the square of player's drive.
+        """
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        drive = self.position.pieces[(player, 'd')]
+        if not drive & self.attackedSquares(opponent):
+            return []
+        return [self.position.squares[sq] for sq in squares_of(self.position.sides[opponent]) if self.attack_cache[sq] & drive]
+
+    def getCheckSupport(self, attack_piece, defend_king):
+        """
+        Method to get the piece whose support moves let attack_piece reach defend_king.
+        Capturing that piece also ends the check.
+
+        Args:
+            attack_piece (Piece): Piece currently attacking defend_king.
+            defend_king (Drive): Drive object currently under check.
+
+        Returns:
+            Piece: The support piece, None if attack_piece reaches the drive by its own moves.
+        """
+        sq = square(attack_piece.getIndex())
+        own_moves = piece_attacks(attack_piece.name[-1], attack_piece.player, attack_piece.isPromote, sq, self.position.occupied)
+        if own_moves & SQUARE_BIT[square(defend_king.getIndex())]:
+            return None
+        return self.position.squares[SUPPORT_SQUARE[attack_piece.player][sq]]
+
+    def isInCheck(self, player):
+        """
+        Returns:
+            bool: True if player's drive is on a square controlled by the other player.
+        """
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        return self.position.pieces[(player, 'd')] & self.attackedSquares(opponent) != 0
+
+    def generate_legal_moves(self, player=None):
+        """
+        Method to generate every legal move and drop of player as packed ints (see move.py).
+
+        A move is legal when it follows the piece's moves, support moves included, does not land on
+        a same team piece and does not leave player's drive on a controlled square.
+        Promotable pieces touching the promotion zone get both a promoting and a non promoting move,
+        except the preview which must promote.
+        Drops go to empty squares. A preview cannot be dropped on the promotion row, in a column with
+        another of player's previews, or into an immediate checkmate.
+
+        Args:
+            player (str): The player to generate moves for.
+                (default value None, the side to move)
+
+        Returns:
+            list: packed legal moves.
+        """
+        return self._legalMoves(player or self.side_to_move, True)
+
+    def generate_noisy_moves(self, player=None):
+        """
+        Method to generate the legal moves of player that change the material or threaten the drive: captures,
+        promotions (without the non promoting variant of a quiet move) and drops that attack the other drive directly.
+        It skips the legality checks of every other move, which makes it much cheaper than generate_legal_moves.
+
+        Args:
+            player (str): The player to generate moves for.
+                (default value None, the side to move)
+
+        Returns:
+            list: packed legal moves.
+        """
+        return self._legalMoves(player or self.side_to_move, True, True)
+
+    def _legalMoves(self, player, check_preview_mates, noisy=False):
+        """
+        Generates the legal moves of player, see generate_legal_moves, or only the noisy ones, see generate_noisy_moves.
+        The preview drop mate rule needs the opponent's legal moves, which are generated without it.
+        """
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        position = self.position
+        occupied = position.occupied
+        own = position.sides[player]
+        drive = position.pieces[(player, 'd')]
+        in_check = drive & self.attackedSquares(opponent)
+        # Only pieces on a ray of the drive can uncover a check when they move.
+        exposed = QUEEN_RAYS[drive.bit_length() - 1] if drive else 0
+        zone = PROMOTION_ZONE[player]
+        enemies = position.sides[opponent]
+        # In check, a move or drop can only help by capturing a checker or the piece supporting it, or by blocking a ray.
+        evasions = self._evasionSquares(player) if in_check else FULL_MASK
+        side_to_move = self.side_to_move
+        self.side_to_move = player
+        moves = []
+        for origin in squares_of(own):
+            piece = position.squares[origin]
+            type_code = piece.type_code
+            targets = self.pieceMoveMask(origin, occupied) & ~own
+            if type_code == DRIVE:
+                if noisy:
+                    targets &= enemies
+                # The drive does not block the squares behind it from the other player.
+                targets &= ~self.attackedSquares(opponent, occupied & ~drive)
+                for dest in squares_of(targets):
+                    moves.append(encode_move(origin, dest))
+                continue
+            targets &= evasions
+            can_promote = not piece.isPromote and CAN_PROMOTE[type_code]
+            if noisy:
+                promoting = 0
+                if can_promote:
+                    promoting = targets if SQUARE_BIT[origin] & zone else targets & zone
+                targets &= enemies | promoting
+            needs_check = in_check or SQUARE_BIT[origin] & exposed
+            for dest in squares_of(targets):
+                move = encode_move(origin, dest)
+                if needs_check and not self._leavesDriveSafe(move, player, opponent):
+                    continue
+                if can_promote and (SQUARE_BIT[origin] | SQUARE_BIT[dest]) & zone:
+                    moves.append(move | encode_move(0, 0, True))
+                    if type_code == PREVIEW:
+                        continue
+                if not noisy or SQUARE_BIT[dest] & enemies:
+                    moves.append(move)
+
+        empty = ~occupied & evasions
+        enemy_drive = position.pieces[(opponent, 'd')]
+        for name in self.players[player].captured.types():
+            targets = empty
+            if name == 'p':
+                targets &= ~zone
+                for sq in squares_of(position.pieces[(player, 'p')]):
+                    targets &= ~COLUMN_MASK[sq // BOARD_SIZE]
+            for dest in squares_of(targets):
+                if noisy and not piece_attacks(name, player, False, dest, occupied) & enemy_drive:
+                    continue
+                move = encode_drop(name, dest)
+                if in_check and not self._leavesDriveSafe(move, player, opponent):
+                    continue
+                if name == 'p' and check_preview_mates and self._isCheckmate(move, opponent):
+                    continue
+                moves.append(move)
+        self.side_to_move = side_to_move
+        return moves
+
+    def _evasionSquares(self, player):
+        """
+        Method to get the squares a move of player must land on to end a check: the square of every checker and of
+        the piece supporting it, and the squares between it and the drive. Every move ending the check lands there,
+        but not every move landing there ends it.
+
+        Args:
+            player (str): String representing the player in check.
+
+        Returns:
+            int: bitmask of the squares.
+        """
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        position = self.position
+        drive = position.pieces[(player, 'd')]
+        drive_sq = drive.bit_length() - 1
+        enemies = position.sides[opponent]
+        squares = 0
+        for sq in squares_of(enemies):
+            if self.attack_cache[sq] & drive:
+                squares |= SQUARE_BIT[sq] | BETWEEN[sq][drive_sq]
+                support_sq = SUPPORT_SQUARE[opponent][sq]
+                if support_sq is not None:
+                    squares |= SQUARE_BIT[support_sq] & enemies
+        return squares
+
+    def _leavesDriveSafe(self, move, player, opponent):
+        """
+        Returns:
+            bool: True if player's drive is not controlled by opponent after move.
+        """
+        undo = self.make_move(move)
+        safe = not self.position.pieces[(player, 'd')] & self.attackedSquares(opponent)
+        self.unmake_move(undo)
+        return safe
+
+    def _isCheckmate(self, move, opponent):
+        """
+        Returns:
+            bool: True if move leaves opponent in check without any legal move.
+        """
+        undo = self.make_move(move)
+        mate = self.isInCheck(opponent) and not self._legalMoves(opponent, False)
+        self.unmake_move(undo)
+        return mate
+
+    def to_fen(self, num_turns=0):
+        """
+        Method writes the position on one line: placement, promotions, side to move, both captured lists and the
+        turn counter, see fen.py. It only reads the square contents, so it is cheap enough for keys and logs.
+
+        Args:
+            num_turns (int): The number of turns played, see Game.num_turns.
+                (default value 0)
+
+        Returns:
+            str: The position, like "NGRSD/4P/5/p4/dsrgn l - 0".
+        """
+        return board_to_fen(self.position, self.upper_player.getCaptured(), self.lower_player.getCaptured(),
+                            self.side_to_move, num_turns)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Method builds a board from a position written by to_fen().
+
+        Args:
+            fen (str): The position.
+
+        Returns:
+            (Board, int): The board and the number of turns played.
+
+        Raises:
+            FileParseException: If fen is not a valid position, see fen.parse_fen.
+        """
+        placement, upper_captured, lower_captured, side_to_move, num_turns = parse_fen(fen)
+        pieces = [dict(piece=name, position=index_to_location(SQUARE_INDEX[sq])) for sq, name in placement]
+        board = cls('f', dict(initialPieces=pieces, upperCaptures=upper_captured, lowerCaptures=lower_captured))
+        board.side_to_move = side_to_move
+        return board, num_turns
 
     def __repr__(self):
         return self._stringifyBoard()
@@ -432,14 +934,15 @@ class Board:
         Utility function for printing the board
         """
         s = ''
-        for row in range(len(self._board) - 1, -1, -1):
+        for row in range(BOARD_SIZE - 1, -1, -1):
 
             s += '' + str(row + 1) + ' |'
-            for col in range(0, len(self._board[row])):
-                if isinstance(self._board[col][row], Piece):
-                    temp = self._board[col][row].toString()
+            for col in range(0, BOARD_SIZE):
+                piece = self.position.getPiece(square((col, row)))
+                if piece is not None:
+                    temp = piece.toString()
                 else:
-                    temp = self._board[col][row]
+                    temp = ''
                 s += self._stringifySquare(temp)
 
             s += os.linesep
@@ -476,15 +979,8 @@ class Board:
         Returns:
             Piece: Newly created piece.
         """
-        piece_type = name.lower()
-        if piece_type == 'p':
-            return Preview(player_type, index)
-        if piece_type == 'g':
-            return Governanace(player_type, index)
-        if piece_type == 's':
-            return Shield(player_type, index)
-        if piece_type == 'r':
-            return Relay(player_type, index)
-        if piece_type == 'n':
-            return Notes(player_type, index)
-        return None
+        code = TYPE_CODES.get(name.lower())
+        # The drive is never created, every player has exactly one.
+        if code is None or code == DRIVE:
+            return None
+        return PIECE_CLASSES[code](player_type, index)
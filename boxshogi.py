@@ -1,10 +1,28 @@
+import os
+import io
 import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from utils import *
 from game import Game
+from board import Board
+from perft import runPerft
+from engine import Engine
+from move import move_to_string
 from exceptions import *
+from result import OK, ILLEGAL
+from gamefile import readGame, readGames
+from archive import writeArchive
+from server import runServer
+from selfplay import runSelfPlay, load_setups, escape_moves
+from profiling import Profiler
+from mate import runSolveMate, runMateBatch, plies_left
+from tablebase import runBuildTablebase, runProbeTablebase, load_tablebases
 
 
-def game(game_mode='i', file_input=None):
+def game(game_mode='i', file_input=None, engine=None, engine_player=None):
     """
     Method runs the game. It calls executeTurn with implements the current player's turn.
     The method also checks for and handle all win conditions.
@@ -14,6 +32,10 @@ def game(game_mode='i', file_input=None):
         game_mode (str): The game mode, either 'i' for interactive or 'f' fro file.
         file_input (dict): Dictionary that contains piece_locations, upper_captured, lower_captured, and moves from an input file.
             (default is None)
+        engine (Engine): Engine playing engine_player's moves in interactive mode.
+            (default is None)
+        engine_player (str): The player played by the engine, either 'lower' or 'UPPER'.
+            (default is None)
     """
     game = Game(game_mode, file_input)
     if game_mode == 'i':
@@ -21,7 +43,11 @@ def game(game_mode='i', file_input=None):
             try:
                 showBoard(game)
                 printCheck(game.get_check_moves(), game.getCurrentPlayer())
-                command = input(game.current + ">")
+                if engine is not None and game.current == engine_player:
+                    command = engineCommand(game, engine)
+                    print("{}> {}".format(game.current, command))
+                else:
+                    command = input(game.current + ">")
                 print("{} player action: {}".format(game.current, command))
                 if game.isPlayerinCheck():
                     if command not in game.get_check_moves()[1]:
@@ -35,37 +61,196 @@ def game(game_mode='i', file_input=None):
                 quit()
             except GameEnd as e:
                 # GameEnd is thrown when the game ends with a checkmate or a tie
+                showBoard(game)
                 print(e)
+                quit()
             except FileParseException as e:
                 print("\nWhat went wrong: {}".format(str(e)))
                 quit()
     elif game_mode == 'f':
-        last_command = ""
-        for command in file_input['moves']:
-            last_command = command
-            try:
-                instruction = getMove(command)
-                game.executeTurn(instruction)
-            except (MoveException, WrongPlayerException, PositionOutofBoundsException, DropException) as e:
-                print("{} player action: {}".format(game.getCurrentPlayer(), last_command))
-                showBoard(game)
-                print("{} player wins. Illegal move.".format(game.getPreviousPlayer()))
-                # print("\nWhat went wrong: {}".format(str(e)))
-                quit()
-            except GameEnd as e:
-                print("{} player action: {}".format(game.getCurrentPlayer(), command))
-                showBoard(game)
-                print("{}".format(str(e)))
-                quit()
-            except FileParseException as e:
-                print("{}".format(str(e)))
-                quit()
-        print("{} player action: {}".format(game.getPreviousPlayer(), last_command))
-        showBoard(game)
-        printCheck(game.get_check_moves(), game.getCurrentPlayer())
-        print("{}>".format(game.getCurrentPlayer()))
+        playFile(game, file_input['moves'])
         quit()
 
+
+def playFile(game, moves):
+    """
+    Method replays the moves of an input file and prints the file mode transcript: the last action,
+    the final board and how the game ended or whose turn it is.
+
+    Args:
+        game (Game): Game object set up from the input file.
+        moves (iterable): Commands of the input file, like "move a1 a2".
+    """
+    last_command = ""
+    for command in moves:
+        last_command = command
+        result = game.apply(command)
+        if result.status == ILLEGAL:
+            print("{} player action: {}".format(game.getCurrentPlayer(), last_command))
+            showBoard(game)
+            print("{} player wins. Illegal move.".format(game.getPreviousPlayer()))
+            # print("\nWhat went wrong: {}".format(result.message))
+            return
+        if result.status != OK:
+            print("{} player action: {}".format(game.getCurrentPlayer(), command))
+            showBoard(game)
+            print("{}".format(result.message))
+            return
+    print("{} player action: {}".format(game.getPreviousPlayer(), last_command))
+    showBoard(game)
+    printCheck(game.get_check_moves(), game.getCurrentPlayer())
+    print("{}>".format(game.getCurrentPlayer()))
+
+
+def fileTranscript(path):
+    """
+    Method replays an input file in this process and returns what file mode would print.
+
+    Args:
+        path (str): Path of the .in file.
+
+    Returns:
+        str: The transcript, or an error line if the file could not be replayed.
+    """
+    try:
+        return gameTranscript(readGame(path))
+    except Exception as e:
+        return "error: {}: {}\n".format(type(e).__name__, e)
+
+
+def gameTranscript(file_input):
+    """
+    Method replays a parsed game in this process and returns what file mode would print.
+
+    Args:
+        file_input (dict): Setup and moves of the game, see gamefile.py.
+
+    Returns:
+        str: The transcript.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        playFile(Game('f', file_input), file_input['moves'])
+    return output.getvalue()
+
+
+def normalizeTranscript(text):
+    """
+    Method normalizes a transcript the way .github/run_test compares outputs, ignoring case, whitespace and blank lines.
+
+    Returns:
+        list: The non blank lines, lower cased with all whitespace removed.
+    """
+    lines = (''.join(line.split()).lower() for line in text.splitlines())
+    return [line for line in lines if line]
+
+
+def runBatch(directory, jobs=1, compare=False, write=False):
+    """
+    Method replays every .in file of a directory in one process, or in a pool of jobs processes,
+    and streams the transcripts to stdout in file name order.
+
+    Args:
+        directory (str): Directory holding the .in files.
+        jobs (int): Number of worker processes, 1 replays in this process.
+            (default value 1)
+        compare (bool): Compare each transcript with the sibling .out file and print a pass or fail line
+            instead of the transcript.
+            (default value False)
+        write (bool): Write each transcript to a sibling .result file.
+            (default value False)
+
+    Returns:
+        int: Number of transcripts that differ from their .out file, 0 when not comparing.
+    """
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.in'))
+    failed = 0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if jobs > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(jobs))
+            transcripts = pool.map(fileTranscript, paths, chunksize=max(1, len(paths) // (jobs * 4)))
+        else:
+            transcripts = map(fileTranscript, paths)
+        for path, transcript in zip(paths, transcripts):
+            stem = path[:-len('.in')]
+            if write:
+                with open(stem + '.result', 'w') as f:
+                    f.write(transcript)
+            if compare:
+                expected = ''
+                if os.path.exists(stem + '.out'):
+                    with open(stem + '.out') as f:
+                        expected = f.read()
+                if normalizeTranscript(transcript) == normalizeTranscript(expected):
+                    print("pass {}".format(os.path.basename(path)))
+                else:
+                    failed += 1
+                    print("FAIL {}".format(os.path.basename(path)))
+            elif not write:
+                print("==> {} <==".format(os.path.basename(path)))
+                print(transcript)
+    if compare:
+        print("{} passed, {} failed in {:.3f}s".format(len(paths) - failed, failed, time.perf_counter() - start))
+    return failed
+
+
+def runGamesFile(path):
+    """
+    Method replays every game of a multi game file (see gamefile.py) in order, streaming each transcript
+    to stdout as soon as it is done. Games are read one at a time, so the file is never loaded whole.
+
+    Args:
+        path (str): Path of the multi game file.
+    """
+    for file_input in readGames(path):
+        print("==> {} <==".format(file_input['name']))
+        print(gameTranscript(file_input))
+
+
+def packGames(source, path):
+    """
+    Method writes every game of a directory of .in files, or of a multi game file, to a game archive.
+
+    Args:
+        source (str): Directory or multi game file to read.
+        path (str): Path of the archive file.
+    """
+    if os.path.isfile(source):
+        games = readGames(source)
+    else:
+        games = (readGame(os.path.join(source, name)) for name in sorted(os.listdir(source)) if name.endswith('.in'))
+    count = writeArchive(path, games)
+    print("{} games written to {}".format(count, path))
+
+
+def engineCommand(game, engine):
+    """
+    Method asks the engine for the current player's move and returns it as a command.
+    When the player is in check, the engine only picks from the game's available moves out of check,
+    and the command is the one of the escape list.
+
+    Args:
+        game (Game): Game object that contains the current game state.
+        engine (Engine): Engine to search with.
+
+    Returns:
+        str: Command of the form "move a1 a2" or "drop p c3".
+
+    Raises:
+        MoveException: If the engine's player has no move.
+    """
+    if game.isPlayerinCheck():
+        escapes = escape_moves(game)
+        if not escapes:
+            raise MoveException("The engine has no move out of check.")
+        return escapes[engine.search(game.board, list(escapes), plies_left(game)).move]
+    result = engine.search(game.board, plies_left=plies_left(game))
+    if result.move is None:
+        raise MoveException("The engine has no legal move.")
+    return move_to_string(result.move)
+
+
 def showBoard(game):
     """
     Method prints the current board state, and the pieces captured by each player.
@@ -96,13 +281,110 @@ def main():
     Main function to read terminal input
     Calls method parseTestCase() from utils that takes in file path and returns a dictionary of the file data.
     """
-    # game('f', parseTestCase("test_cases/basicCheck.in"))
-    game('i')
-    # if sys.argv[1] == '-f':
-    #     input = parseTestCase(sys.argv[2])
-    #     game('f', input)
-    # if sys.argv[1] == '-i':
-    #     game('i')
+    parser = argparse.ArgumentParser(description="Play a game of BoxShogi.")
+    parser.add_argument('-i', action='store_true', help="interactive mode, the default")
+    parser.add_argument('-f', metavar='FILE', help="file mode, play the moves of an input file")
+    parser.add_argument('--perft', type=int, metavar='DEPTH',
+                        help="count the leaf nodes DEPTH plies deep from the initial position, or from the setup of -f FILE")
+    parser.add_argument('--divide', action='store_true', help="with --perft, print the leaf nodes below every root move")
+    parser.add_argument('--engine', choices=['lower', 'UPPER'], help="let the engine play this player in interactive mode")
+    parser.add_argument('--movetime', type=float, default=1.0, metavar='SECONDS', help="engine time per move (default 1.0)")
+    parser.add_argument('--depth', type=int, default=64, help="engine maximum search depth")
+    parser.add_argument('--nodes', type=int, metavar='N', help="engine node limit per move, or mate solver node limit per position")
+    parser.add_argument('--hash-mb', type=float, default=16, metavar='MB',
+                        help="engine transposition table or mate solver proof table size (default 16)")
+    parser.add_argument('--solve-mate', type=int, metavar='N',
+                        help="search a mate in at most N moves for the side to move after the moves of -f FILE, "
+                             "or of every position of --batch, see mate.py")
+    parser.add_argument('--build-tablebase', metavar='MATERIAL',
+                        help="build the endgame tablebase of the drives and MATERIAL, like 'gp', to --out, see tablebase.py")
+    parser.add_argument('--tablebase', action='append', default=[], metavar='FILE',
+                        help="probe a tablebase file in the engine, or with -f print the outcome of the position after its moves; "
+                             "may be repeated")
+    parser.add_argument('--batch', metavar='DIR', help="replay every .in file of DIR, or every game of a multi game file, in one process")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="with --batch, --selfplay, --solve-mate or --build-tablebase, use N worker processes")
+    parser.add_argument('--compare', action='store_true', help="with --batch, compare each transcript with its .out file")
+    parser.add_argument('--pack', metavar='ARCHIVE', help="with --batch, write the games to a binary game archive instead")
+    parser.add_argument('--write', action='store_true', help="with --batch, write each transcript to a sibling .result file")
+    parser.add_argument('--serve', type=int, metavar='PORT', help="host games over a line protocol on PORT, see server.py")
+    parser.add_argument('--workers', type=int, default=1, metavar='N', help="with --serve, run N event loop processes")
+    parser.add_argument('--idle-timeout', type=float, default=300, metavar='SECONDS',
+                        help="with --serve, end games idle for SECONDS (default 300)")
+    parser.add_argument('--selfplay', type=int, metavar='N', help="play N games between two policies, see selfplay.py")
+    parser.add_argument('--lower', default='random', metavar='POLICY',
+                        help="with --selfplay, policy of lower: random, greedy or search[:DEPTH] (default random)")
+    parser.add_argument('--upper', default='random', metavar='POLICY', help="with --selfplay, policy of UPPER (default random)")
+    parser.add_argument('--swap', action='store_true', help="with --selfplay, swap the policies every other game")
+    parser.add_argument('--seed', type=int, default=0, help="with --selfplay, seed of the games (default 0)")
+    parser.add_argument('--positions', metavar='SOURCE',
+                        help="with --selfplay, start from the setups of the .in files of a directory or of a multi game file")
+    parser.add_argument('--out', metavar='ARCHIVE',
+                        help="with --selfplay, write the games to a game archive, with --build-tablebase, the tablebase file")
+    parser.add_argument('--profile', action='store_true',
+                        help="print the calls and latency of the hot Game and Board methods to stderr, see profiling.py")
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help="write the profile to FILE, as JSON if it ends with .json and in the Prometheus text format otherwise")
+    args = parser.parse_args()
+    # Profiled runs stay in this process, where the methods are timed.
+    profiler = Profiler() if args.profile or args.profile_out else None
+    jobs = 1 if profiler else args.jobs
+    if profiler:
+        profiler.enable()
+    try:
+        if args.serve is not None:
+            runServer(args.serve, workers=args.workers, idle_timeout=args.idle_timeout)
+        elif args.selfplay is not None:
+            setups = load_setups(args.positions) if args.positions else None
+            try:
+                runSelfPlay(args.selfplay, args.lower, args.upper, args.seed, setups, args.swap, jobs, args.out)
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.build_tablebase:
+            try:
+                runBuildTablebase(args.build_tablebase, args.out, jobs)
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.solve_mate is not None:
+            if args.batch:
+                runMateBatch(args.batch, args.solve_mate, args.nodes, args.hash_mb, jobs)
+            elif args.f:
+                try:
+                    runSolveMate(args.f, args.solve_mate, args.nodes, args.hash_mb)
+                except ValueError as e:
+                    parser.error("the moves of {} do not lead to a position: {}".format(args.f, e))
+            else:
+                parser.error("--solve-mate needs -f FILE or --batch SOURCE")
+        elif args.batch and args.pack:
+            packGames(args.batch, args.pack)
+        elif args.batch and os.path.isfile(args.batch):
+            runGamesFile(args.batch)
+        elif args.batch:
+            sys.exit(1 if runBatch(args.batch, jobs, args.compare, args.write) else 0)
+        elif args.perft is not None:
+            if args.perft < 0:
+                parser.error("--perft DEPTH must not be negative")
+            board = Board('f', parseTestCase(args.f)) if args.f else Board('i')
+            runPerft(board, args.perft, args.divide)
+        elif args.f and args.tablebase:
+            try:
+                runProbeTablebase(args.f, load_tablebases(args.tablebase))
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.f:
+            game('f', readGame(args.f))
+        elif args.engine:
+            tablebases = load_tablebases(args.tablebase)
+            game('i', engine=Engine(args.depth, args.movetime, args.nodes, args.hash_mb, tablebases=tablebases),
+                 engine_player=args.engine)
+        else:
+            game('i')
+    finally:
+        if profiler:
+            profiler.disable()
+            print(profiler.report(), file=sys.stderr)
+            if args.profile_out:
+                profiler.write(args.profile_out)
 
 
 if __name__ == "__main__":
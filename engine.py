@@ -0,0 +1,546 @@
+import sys
+import time
+from utils import PIECE_NAMES
+from bitboard import SQUARE_BIT, squares_of
+from attacks import piece_attacks, SUPPORT_SQUARE, PROMOTION_ZONE
+from piece import CAN_PROMOTE, TYPE_CODES
+from move import move_dest, move_origin, is_drop, is_promote, drop_name
+from tt import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+from tablebase import probe_tablebases, WIN, LOSS
+from mate import PLY_KEYS
+
+MATE_SCORE = 100000
+INFINITY = MATE_SCORE + 1
+# Scores past MATE_BOUND are mate scores, counted in plies from the root.
+MATE_BOUND = MATE_SCORE - 1000
+
+# Material value of a piece on the board, by (piece name, isPromote). The drive is never traded, so it is worth nothing.
+PIECE_VALUES = {
+    ('d', False): 0,
+    ('p', False): 100, ('p', True): 500,
+    ('r', False): 400, ('r', True): 500,
+    ('s', False): 500,
+    ('g', False): 600, ('g', True): 900,
+    ('n', False): 700, ('n', True): 1000,
+}
+# A captured piece can be dropped anywhere, so it is worth a little more in hand than its unpromoted value.
+HAND_VALUES = {'d': 0, 'p': 120, 'r': 450, 's': 550, 'g': 650, 'n': 750}
+# HAND_VALUE_LIST[i] is the hand value of PIECE_NAMES[i], in the order of Hand.counts.
+HAND_VALUE_LIST = tuple(HAND_VALUES[name] for name in PIECE_NAMES)
+
+# EXCHANGE_VALUES[(piece name, isPromote)] is what losing the piece to a capture costs: its value on the board,
+# plus the value of the piece in the capturer's hand.
+EXCHANGE_VALUES = {(name, is_promote): value + HAND_VALUES[name] for (name, is_promote), value in PIECE_VALUES.items()}
+# PROMOTION_GAIN[name] is the value a piece of that type gains by promoting, 0 if it cannot promote.
+PROMOTION_GAIN = {name: PIECE_VALUES[(name, True)] - PIECE_VALUES[(name, False)] if (name, True) in PIECE_VALUES else 0
+                  for name in PIECE_NAMES}
+# Value used to pick the least valuable attacker of a square, the drive recaptures last.
+ATTACKER_VALUES = {key: MATE_SCORE if key[0] == 'd' else value for key, value in PIECE_VALUES.items()}
+
+# Quiescence search stops after this many plies below the nominal depth.
+MAX_QUIESCENCE_PLIES = 8
+# Checking drops are searched in the first plies of the quiescence search only, so drop checks cannot go on forever.
+QUIESCENCE_CHECK_PLIES = 1
+# A capture or promotion is skipped when even winning this much more than it gains cannot lift the score to alpha.
+DELTA_MARGIN = 200
+
+# Move ordering bonuses, see Engine.orderMoves.
+PV_BONUS = 1 << 20
+CAPTURE_BONUS = 1 << 16
+PROMOTION_BONUS = 1 << 15
+CHECK_BONUS = 1 << 14
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def score_to_table(score, ply):
+    """
+    Util method to store mate scores as plies from the stored position instead of from the root.
+    """
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """
+    Util method to convert a stored mate score back to plies from the root.
+    """
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def evaluate(board):
+    """
+    Method scores a position by material on the board and in hand.
+
+    Args:
+        board (Board): Board to score.
+
+    Returns:
+        int: Score from the point of view of the side to move.
+    """
+    position = board.position
+    promoted = position.promoted
+    score = 0
+    for (player, name), mask in position.pieces.items():
+        if not mask:
+            continue
+        value = PIECE_VALUES[(name, False)] * popcount(mask & ~promoted)
+        if mask & promoted:
+            value += PIECE_VALUES[(name, True)] * popcount(mask & promoted)
+        score += value if player == 'lower' else -value
+    for value, lower_count, upper_count in zip(HAND_VALUE_LIST, board.lower_player.captured.counts,
+                                               board.upper_player.captured.counts):
+        score += value * (lower_count - upper_count)
+    return score if board.side_to_move == 'lower' else -score
+
+
+def tablebase_score(outcome, ply):
+    """
+    Util method to convert a tablebase outcome to a search score, mates counted in plies from the root.
+
+    Args:
+        outcome (tuple): The outcome and distance to mate, see Tablebase.probe.
+        ply (int): Ply of the probed position.
+
+    Returns:
+        int: Score from the point of view of the side to move.
+    """
+    result, distance = outcome
+    if result == WIN:
+        return MATE_SCORE - ply - distance
+    if result == LOSS:
+        return -MATE_SCORE + ply + distance
+    return 0
+
+
+def gives_check(name, player, is_promoted, dest, occupied, enemy_drive):
+    """
+    Util method to tell, without making the move, if a piece standing on dest attacks the enemy drive directly.
+    Checks given through support moves or discovered by the move are not seen.
+    """
+    return piece_attacks(name, player, is_promoted, dest, occupied | SQUARE_BIT[dest]) & enemy_drive != 0
+
+
+def static_exchange(board, move):
+    """
+    Util method to estimate the material a capture wins for the side to move, without making any move.
+    The captures on the destination square are resolved in turn, each side recapturing with its least valuable
+    piece, and either side may stop when going on would lose material. A captured piece counts both as lost from the
+    board and as won in the capturer's hand, pieces promote when they can, and every attacker gets the support moves
+    of the piece left behind it. Pins are not seen, and the drive only recaptures onto an undefended square.
+
+    Args:
+        board (Board): Board the move is played on.
+        move (int): Packed move of the side to move.
+
+    Returns:
+        int: The material won, negative when the capture loses material, 0 for a move that does not capture.
+    """
+    position = board.position
+    squares = position.squares
+    dest = move_dest(move)
+    victim = squares[dest]
+    if is_drop(move) or victim is None:
+        return 0
+    origin = move_origin(move)
+    piece = squares[origin]
+    player = board.side_to_move
+    name, promoted = piece.name[-1], piece.isPromote
+    gain = [EXCHANGE_VALUES[(victim.name[-1], victim.isPromote)]]
+    if is_promote(move) and not promoted:
+        gain[0] += PROMOTION_GAIN[name]
+        promoted = True
+    # Square contents that differ from the board, as (name, player, isPromote) or None for an emptied square.
+    changed = {origin: None, dest: (name, player, promoted)}
+    occupied = position.occupied & ~SQUARE_BIT[origin]
+    at_risk = EXCHANGE_VALUES[(name, promoted)]
+    side = 'UPPER' if player == 'lower' else 'lower'
+    while True:
+        attacker = _leastValuableAttacker(position, changed, occupied, dest, side)
+        if attacker is None:
+            break
+        sq, name, promoted = attacker
+        promotion = 0
+        if not promoted and CAN_PROMOTE[TYPE_CODES[name]] and (SQUARE_BIT[sq] | SQUARE_BIT[dest]) & PROMOTION_ZONE[side]:
+            promotion, promoted = PROMOTION_GAIN[name], True
+        changed[sq] = None
+        changed[dest] = (name, side, promoted)
+        occupied &= ~SQUARE_BIT[sq]
+        other = 'UPPER' if side == 'lower' else 'lower'
+        if name == 'd' and _leastValuableAttacker(position, changed, occupied, dest, other) is not None:
+            break
+        gain.append(at_risk + promotion - gain[-1])
+        at_risk = EXCHANGE_VALUES[(name, promoted)]
+        side = other
+    for i in range(len(gain) - 1, 0, -1):
+        gain[i - 1] = -max(-gain[i - 1], gain[i])
+    return gain[0]
+
+
+def _leastValuableAttacker(position, changed, occupied, dest, side):
+    """
+    Util method to find the least valuable piece of side attacking dest in a position where the squares of changed
+    differ from the board, see static_exchange.
+
+    Returns:
+        tuple: The attacker's square, name and isPromote, None if side does not attack dest.
+    """
+    squares = position.squares
+    target = SQUARE_BIT[dest]
+    best, best_value = None, None
+    for sq in squares_of(position.sides[side] & occupied & ~target):
+        piece = squares[sq]
+        name = piece.name[-1]
+        attacks = piece_attacks(name, side, piece.isPromote, sq, occupied)
+        support_sq = SUPPORT_SQUARE[side][sq]
+        if not attacks & target and support_sq is not None:
+            if support_sq in changed:
+                support = changed[support_sq]
+            else:
+                support = squares[support_sq]
+                support = support and (support.name[-1], support.player, support.isPromote)
+            if support is not None and support[1] == side:
+                attacks |= piece_attacks(support[0], side, support[2], sq, occupied & ~SQUARE_BIT[support_sq])
+        if attacks & target:
+            value = ATTACKER_VALUES[(name, piece.isPromote)]
+            if best is None or value < best_value:
+                best, best_value = (sq, name, piece.isPromote), value
+    return best
+
+
+class SearchResult:
+    """
+    Class holding the outcome of a search.
+
+    Attributes:
+        move (int): Best packed move found, None if the side to move has no legal move.
+        score (int): Score of move from the point of view of the side to move.
+        depth (int): Deepest completed iteration.
+        nodes (int): Number of nodes searched.
+        elapsed (float): Search time in seconds.
+    """
+    __slots__ = ('move', 'score', 'depth', 'nodes', 'elapsed')
+
+    def __init__(self, move, score, depth, nodes, elapsed):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+
+class Engine:
+    """
+    Engine class searches a Board for the best move of the side to move.
+    It runs iterative deepening negamax with alpha-beta pruning, limited by depth, time or node count.
+    Moves are explored with Board.make_move/unmake_move, so the searched board is left unchanged.
+    At depth 0 a quiescence search plays on captures that do not lose material (see static_exchange), promotions
+    onto unattacked squares, checking drops and the moves out of check, so positions are only scored once they are
+    quiet. Captures and promotions that cannot bring the score up to alpha are skipped.
+    Search results are kept in a transposition table that lasts across searches.
+    Positions below the root held by a loaded tablebase are scored exactly from it, without searching them.
+
+    Attributes:
+        max_depth (int): Deepest iteration to run.
+        time_limit (float): Seconds a search may take, None for no limit.
+        node_limit (int): Nodes a search may visit, None for no limit.
+        quiescence (bool): Search the noisy moves below depth 0 instead of scoring the position right away.
+        tablebases (dict): A mapping from material to Tablebase, see tablebase.load_tablebases.
+        table (TranspositionTable): Transposition table shared by every search of the engine.
+        nodes (int): Nodes visited by the current search.
+    """
+    def __init__(self, max_depth=64, time_limit=None, node_limit=None, hash_mb=16, quiescence=True, tablebases=None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.quiescence = quiescence
+        self.tablebases = tablebases or {}
+        self.table = TranspositionTable(hash_mb)
+        self.nodes = 0
+        self._deadline = None
+        self._max_nodes = sys.maxsize
+        self._stopped = False
+        self._board = None
+        self._plies_left = None
+        self._horizon_keys = False
+
+    def search(self, board, root_moves=None, plies_left=None):
+        """
+        Method searches board and returns the best move of the side to move.
+        Each iteration searches the best move of the previous one first. An iteration cut short
+        by the time or node limit is thrown away, except when nothing deeper than depth 0 finished.
+
+        Args:
+            board (Board): Board to search.
+            root_moves (list): Packed moves the root is restricted to.
+                (default value None, every legal move)
+            plies_left (int): Plies the game may still last before it is a tie, see mate.plies_left. Positions past
+                it score as a tie, and tablebase mates that come later are ties.
+                (default value None, no limit)
+
+        Returns:
+            SearchResult: The best move found and its score.
+        """
+        start = time.perf_counter()
+        self._board = board
+        self._plies_left = plies_left
+        # When the tie can change a score, table entries are only shared by positions with as many plies left.
+        self._horizon_keys = plies_left is not None and (
+            bool(self.tablebases) or plies_left <= self.max_depth + MAX_QUIESCENCE_PLIES)
+        self._stopped = False
+        self._deadline = start + self.time_limit if self.time_limit is not None else None
+        self._max_nodes = self.node_limit if self.node_limit is not None else sys.maxsize
+        self.nodes = 0
+        self.table.newSearch()
+        moves = root_moves if root_moves is not None else board.generate_legal_moves()
+        if not moves:
+            return SearchResult(None, -MATE_SCORE, 0, 0, time.perf_counter() - start)
+        best_move, best_score, completed = moves[0], -INFINITY, 0
+        entry = self.table.probe(self._tableKey(0))
+        if entry is not None and entry[3] in moves:
+            best_move = entry[3]
+        for depth in range(1, self.max_depth + 1):
+            moves = self.orderMoves(moves, best_move)
+            alpha = -INFINITY
+            iteration_move = None
+            for move in moves:
+                undo = board.make_move(move)
+                score = -self._negamax(depth - 1, -INFINITY, -alpha, 1)
+                board.unmake_move(undo)
+                if self._stopped:
+                    break
+                if score > alpha:
+                    alpha, iteration_move = score, move
+            if self._stopped:
+                if completed == 0 and iteration_move is not None:
+                    best_move, best_score = iteration_move, alpha
+                break
+            best_move, best_score, completed = iteration_move, alpha, depth
+            if root_moves is None:
+                self.table.store(self._tableKey(0), depth, BOUND_EXACT, score_to_table(best_score, 0), best_move)
+            # A forced mate does not get any better with more depth.
+            if abs(best_score) > MATE_BOUND or self._outOfTime(half=True):
+                break
+        return SearchResult(best_move, best_score, completed, self.nodes, time.perf_counter() - start)
+
+    def _negamax(self, depth, alpha, beta, ply):
+        """
+        Alpha-beta search below the root, returns the score from the point of view of the side to move.
+        """
+        # The node limit is checked on every node, the clock only every 1024 nodes.
+        if self.nodes >= self._max_nodes or self.nodes & 1023 == 0 and self._outOfTime():
+            self._stopped = True
+        if self._stopped:
+            return 0
+        self.nodes += 1
+        board = self._board
+        plies_left = None if self._plies_left is None else self._plies_left - ply
+        if plies_left is not None and plies_left <= 0:
+            return self._tieScore(ply)
+        if self.tablebases:
+            outcome = probe_tablebases(self.tablebases, board, plies_left)
+            if outcome is not None:
+                return tablebase_score(outcome, ply)
+        if depth == 0:
+            return self._quiescence(alpha, beta, ply, 0) if self.quiescence else evaluate(board)
+        key = self._tableKey(ply)
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, bound, score, table_move = entry
+            if entry_depth >= depth:
+                score = score_from_table(score, ply)
+                if bound == BOUND_EXACT or (bound == BOUND_LOWER and score >= beta) \
+                        or (bound == BOUND_UPPER and score <= alpha):
+                    return score
+        moves = board.generate_legal_moves()
+        if not moves:
+            # No legal move left is a loss, sooner losses score lower.
+            return -MATE_SCORE + ply
+        original_alpha = alpha
+        best, best_move = -INFINITY, None
+        for move in self.orderMoves(moves, table_move):
+            undo = board.make_move(move)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move(undo)
+            if self._stopped:
+                return 0
+            if score > best:
+                best, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if best >= beta:
+            bound = BOUND_LOWER
+        elif best > original_alpha:
+            bound = BOUND_EXACT
+        else:
+            # Every move failed low, none of them is known to be best.
+            bound, best_move = BOUND_UPPER, None
+        self.table.store(key, depth, bound, score_to_table(best, ply), best_move)
+        return best
+
+    def _tieScore(self, ply):
+        """
+        Returns:
+            int: Score of a position reached when the game ends in a tie, a loss if the last move was a checkmate.
+        """
+        return 0 if self._board.generate_legal_moves() else -MATE_SCORE + ply
+
+    def _tableKey(self, ply):
+        """
+        Returns:
+            int: Transposition table key of the position at ply, its Zobrist key combined with the plies left
+                before the tie when they matter, see search.
+        """
+        key = self._board.getZobristKey()
+        if self._horizon_keys:
+            key ^= PLY_KEYS[self._plies_left - ply]
+        return key
+
+    def _quiescence(self, alpha, beta, ply, qply):
+        """
+        Quiescence search below depth 0, returns the score from the point of view of the side to move.
+        The side to move may stand pat on the static score unless it is in check.
+        """
+        # The node limit is checked on every node, the clock only every 1024 nodes.
+        if self.nodes >= self._max_nodes or self.nodes & 1023 == 0 and self._outOfTime():
+            self._stopped = True
+        if self._stopped:
+            return 0
+        self.nodes += 1
+        board = self._board
+        if self._plies_left is not None and ply >= self._plies_left:
+            return self._tieScore(ply)
+        if qply >= MAX_QUIESCENCE_PLIES:
+            return evaluate(board)
+        if board.isInCheck(board.side_to_move):
+            moves = board.generate_legal_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+            best = -INFINITY
+            moves = self.orderMoves(moves)
+        else:
+            best = evaluate(board)
+            if best >= beta:
+                return best
+            alpha = max(alpha, best)
+            moves = self.noisyMoves(board.generate_noisy_moves(), qply < QUIESCENCE_CHECK_PLIES,
+                                    alpha - best - DELTA_MARGIN)
+        for move in moves:
+            undo = board.make_move(move)
+            score = -self._quiescence(-beta, -alpha, ply + 1, qply + 1)
+            board.unmake_move(undo)
+            if self._stopped:
+                return 0
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def noisyMoves(self, moves, checking_drops=True, min_gain=0):
+        """
+        Method picks the moves the quiescence search plays: captures that do not lose material, best exchange first,
+        then promotions onto squares the other player does not attack, then drops giving check.
+
+        Args:
+            moves (list): Packed legal moves of the side to move, see Board.generate_noisy_moves.
+            checking_drops (bool): Include the drops giving check.
+                (default value True)
+            min_gain (int): Material a capture or promotion must win to be picked, captures never lose material.
+                (default value 0)
+
+        Returns:
+            list: The picked moves, in search order.
+        """
+        board = self._board
+        position = board.position
+        player = board.side_to_move
+        opponent = 'UPPER' if player == 'lower' else 'lower'
+        enemy_drive = position.pieces[(opponent, 'd')]
+        occupied = position.occupied
+        min_gain = max(min_gain, 0)
+        attacked = None
+        captures, promotions, drops = [], [], []
+        for move in moves:
+            if is_drop(move):
+                if checking_drops and gives_check(drop_name(move), player, False, move_dest(move), occupied, enemy_drive):
+                    drops.append(move)
+            elif position.squares[move_dest(move)] is not None:
+                exchange = static_exchange(board, move)
+                if exchange >= min_gain:
+                    captures.append((exchange, move))
+            elif is_promote(move) and PROMOTION_GAIN[position.squares[move_origin(move)].name[-1]] >= min_gain:
+                if attacked is None:
+                    attacked = board.attackedSquares(opponent)
+                if not attacked & SQUARE_BIT[move_dest(move)]:
+                    promotions.append(move)
+        captures.sort(reverse=True)
+        return [move for _, move in captures] + promotions + drops
+
+    def _outOfTime(self, half=False):
+        """
+        Returns:
+            bool: True if the node limit is reached, or the time limit (half of it if half is set) has passed.
+        """
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        if self._deadline is None:
+            return False
+        now = time.perf_counter()
+        if half:
+            return now >= self._deadline - self.time_limit / 2
+        return now >= self._deadline
+
+    def orderMoves(self, moves, best_move=None):
+        """
+        Method sorts moves so that the best move, captures (most valuable victim first, least valuable
+        attacker next), promotions and direct checks are searched first.
+
+        Args:
+            moves (list): Packed legal moves of the side to move.
+            best_move (int): Move to search before every other one.
+                (default value None)
+
+        Returns:
+            list: The sorted moves.
+        """
+        position = self._board.position
+        player = self._board.side_to_move
+        enemy_drive = position.pieces[('UPPER' if player == 'lower' else 'lower', 'd')]
+        occupied = position.occupied
+        scored = []
+        for move in moves:
+            dest = move_dest(move)
+            if move == best_move:
+                score = PV_BONUS
+            elif is_drop(move):
+                name, is_promoted, score = drop_name(move), False, 0
+            else:
+                piece = position.squares[move_origin(move)]
+                name, is_promoted, score = piece.name[-1], piece.isPromote, 0
+                victim = position.squares[dest]
+                if victim is not None:
+                    score += CAPTURE_BONUS + PIECE_VALUES[(victim.name[-1], victim.isPromote)] * 8 \
+                        - PIECE_VALUES[(name, is_promoted)] // 8
+                if is_promote(move):
+                    score += PROMOTION_BONUS
+                    is_promoted = True
+            if score < PV_BONUS and gives_check(name, player, is_promoted, dest, occupied, enemy_drive):
+                score += CHECK_BONUS
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
@@ -0,0 +1,135 @@
+from utils import BOARD_SIZE, PIECE_NAMES
+from bitboard import square
+from piece import DRIVE, CAN_PROMOTE, TYPE_CODES
+from zobrist import PIECE_KEYS, SIDE_KEY, hand_key
+from exceptions import FileParseException
+
+# A position is written on one line as four space separated fields:
+#   placement   the rows from 5 down to 1 separated by '/', each from column a to e. A piece is its name as printed on
+#               the board, like 'p', 'N' or '+g', and a run of empty squares is its length.
+#   side        'l' when lower is to move, 'U' when UPPER is.
+#   hands       the UPPER then the lower captured lists in order, every entry as its name, or '-' when both are empty.
+#   turns       the number of turns played, see Game.num_turns.
+SIDE_CODES = {'lower': 'l', 'UPPER': 'U'}
+CODE_SIDES = {code: player for player, code in SIDE_CODES.items()}
+# FEN_ROWS[i] is the tuple of squares of the i-th placement row, top row first.
+FEN_ROWS = tuple(tuple(square((col, row)) for col in range(BOARD_SIZE)) for row in range(BOARD_SIZE - 1, -1, -1))
+# FEN_START is the initial position of interactive mode.
+FEN_START = 'NGRSD/4P/5/p4/dsrgn l - 0'
+
+
+def board_to_fen(position, upper_captured, lower_captured, side_to_move, num_turns=0):
+    """
+    Util method to write a position in the one line notation, straight from the square contents.
+
+    Args:
+        position (BitboardPosition): Piece placement of the board.
+        upper_captured (list): UPPER's captured list.
+        lower_captured (list): lower's captured list.
+        side_to_move (str): The player whose move it is.
+        num_turns (int): The number of turns played.
+            (default value 0)
+
+    Returns:
+        str: The position, like FEN_START.
+    """
+    squares = position.squares
+    rows = []
+    for row in FEN_ROWS:
+        text, empty = '', 0
+        for sq in row:
+            piece = squares[sq]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            text += piece.toString()
+        if empty:
+            text += str(empty)
+        rows.append(text)
+    hands = ''.join(upper_captured) + ''.join(lower_captured) or '-'
+    return '{} {} {} {}'.format('/'.join(rows), SIDE_CODES[side_to_move], hands, num_turns)
+
+
+def parse_fen(fen):
+    """
+    Util method to read a position written in the one line notation, without building any piece.
+
+    Args:
+        fen (str): The position.
+
+    Returns:
+        tuple: A list of (square, piece name) pairs in placement order, UPPER's and lower's captured lists,
+            the player to move and the number of turns played.
+
+    Raises:
+        FileParseException: If fen is not a valid position: a malformed field, a side without exactly one drive,
+            a promoted piece that cannot promote or a drive in a hand.
+    """
+    fields = fen.split()
+    if len(fields) != 4 or fields[1] not in CODE_SIDES or not fields[3].isdigit():
+        raise FileParseException("Invalid position: {}".format(fen))
+    rows = fields[0].split('/')
+    if len(rows) != BOARD_SIZE:
+        raise FileParseException("Invalid position: {}".format(fen))
+    placement = []
+    for row, text in zip(FEN_ROWS, rows):
+        col, prefix = 0, ''
+        for char in text:
+            if char.isdigit():
+                col += int(char)
+            elif char == '+':
+                prefix = '+'
+            elif char.lower() in PIECE_NAMES and col < BOARD_SIZE:
+                placement.append((row[col], prefix + char))
+                col, prefix = col + 1, ''
+            else:
+                raise FileParseException("Invalid position: {}".format(fen))
+        if col != BOARD_SIZE or prefix:
+            raise FileParseException("Invalid position: {}".format(fen))
+    # Every side has exactly one drive, and only the pieces that can promote carry a '+'.
+    drives = sorted(name for _, name in placement if name[-1].lower() == 'd')
+    if drives != ['D', 'd'] or any(name[0] == '+' and not CAN_PROMOTE[TYPE_CODES[name[-1].lower()]]
+                                   for _, name in placement):
+        raise FileParseException("Invalid position: {}".format(fen))
+    hands = {True: [], False: []}
+    if fields[2] != '-':
+        prefix = ''
+        for char in fields[2]:
+            if char == '+':
+                prefix = '+'
+            elif char.lower() in PIECE_NAMES:
+                code = TYPE_CODES[char.lower()]
+                # A drive is never captured, and a captured piece may only be written promoted if it can promote.
+                if code == DRIVE or prefix and not CAN_PROMOTE[code]:
+                    raise FileParseException("Invalid position: {}".format(fen))
+                hands[char.isupper()].append(prefix + char)
+                prefix = ''
+            else:
+                raise FileParseException("Invalid position: {}".format(fen))
+        if prefix:
+            raise FileParseException("Invalid position: {}".format(fen))
+    return placement, hands[True], hands[False], CODE_SIDES[fields[1]], int(fields[3])
+
+
+def fen_key(fen):
+    """
+    Util method to compute the Zobrist key of a position written in the one line notation, without building a board.
+    It equals Board.getZobristKey() of the same position.
+
+    Args:
+        fen (str): The position.
+
+    Returns:
+        int: The position key.
+    """
+    placement, upper_captured, lower_captured, side_to_move, _ = parse_fen(fen)
+    key = hand_key('UPPER', upper_captured) ^ hand_key('lower', lower_captured)
+    for sq, name in placement:
+        player = 'UPPER' if name[-1].isupper() else 'lower'
+        key ^= PIECE_KEYS[(player, name[-1].lower(), name[0] == '+')][sq]
+    if side_to_move == 'UPPER':
+        key ^= SIDE_KEY
+    return key
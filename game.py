@@ -1,7 +1,51 @@
+from collections.abc import Sequence
 from board import Board
 from utils import *
 from exceptions import *
-from piece import Piece, Preview, Notes, Governanace, Drive, Shield
+from piece import DRIVE, PREVIEW, IS_SLIDER, CAN_PROMOTE
+from bitboard import square
+from move import encode_move, move_to_instruction
+from result import *
+
+# A game that reaches this many turns, each a move of both players, ends in a tie.
+MAX_TURNS = 200
+
+
+class EscapeMoves(Sequence):
+    """
+    Class holding the available moves of a player in check, built the first time they are read.
+    They are only valid while the position they were found in is on the board, which lasts until that player's turn.
+    """
+    __slots__ = ('_compute', '_moves')
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._moves = None
+
+    def _list(self):
+        if self._moves is None:
+            self._moves = self._compute()
+            self._compute = None
+        return self._moves
+
+    def __getitem__(self, i):
+        return self._list()[i]
+
+    def __len__(self):
+        return len(self._list())
+
+    def __iter__(self):
+        return iter(self._list())
+
+    def __contains__(self, move):
+        return move in self._list()
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self._list())
+
 
 class Game:
     """
@@ -13,7 +57,8 @@ class Game:
         opponent (str): The current player's opponent.
         num_turns (int): The number of turns that have occurred. A turn is an action done by both players.
         is_check (Mapping[str -> (boolean, list)]): A mapping from player_type(str) to a
-            tuple that contains weather the player is in check, and a list of available moves.
+            tuple that contains weather the player is in check, and the available moves. When in check they are an
+            EscapeMoves sequence, built the first time it is read.
         current_action (str): A string representing the current action being executed, either 'move' or 'drop'
     """
     def __init__(self, game_mode='i', file_input=None):
@@ -62,9 +107,8 @@ class Game:
 
     def executeTurn(self, inst):
         """
-        Method executes a player turn.
-        It checks for promotion and drop illegal moves.
-        Calls methods handleMove() and handleDrop() to implement a move or a drop.
+        Method executes a player turn through apply(), raising the exception matching an unsuccessful result.
+        It is the exception based interface the command line driver was written against.
 
         Args:
             inst (tuple): A tuple that contains command (move or drop), origin location, destination location, promote: A boolean is promote flag is given.
@@ -73,90 +117,141 @@ class Game:
             MoveException: When any illegal action is taken for a move command.
             DropException: When any illegal action is taken for a drop command.
             WrongPlayerException: When player tries to move the piece of the opposite player.
+            PositionOutofBoundsException: When a piece is dropped on a square that does not exist.
             GameEnd: When the game ends in either a tie or a checkmate.
         """
-        cmd, origin, dest, promote = inst
+        result = self.apply(inst)
+        if result.status != OK:
+            raise result.exception()
+
+    def executePackedMove(self, move):
+        """
+        Method executes a player turn given as a packed move, like the moves read from a game archive.
+
+        Args:
+            move (int): The packed move, see move.py.
+
+        Raises:
+            The exceptions of executeTurn().
+        """
+        self.executeTurn(move_to_instruction(move))
+
+    def apply(self, move):
+        """
+        Method executes a player turn and reports how it went without raising.
+        It checks for promotion and drop illegal moves, implements the move or the drop and passes the turn.
+        An illegal turn leaves the game as it was.
+
+        Args:
+            move: The turn, either an instruction tuple returned by getMove(), a packed move (see move.py)
+                or a command string like "move a1 a2".
+
+        Returns:
+            MoveResult: OK, ILLEGAL with a reason code, CHECKMATE or TIE, see result.py.
+        """
+        if isinstance(move, int):
+            move = move_to_instruction(move)
+        elif isinstance(move, str):
+            try:
+                move = getMove(move)
+            except MoveException:
+                return illegal(INVALID_COMMAND)
+        cmd, origin, dest, promote = move
+        current_check, opponent_check = self.is_check[self.current], self.is_check[self.opponent]
         self.current_action = cmd
+        self.refreshCheck()
         if cmd == 'move':
-            self.refreshCheck()
-            # Even if promote flag is not specified, Preview promotes by default on the last row.
-            if self.checkValidPromotion(origin, dest) and isinstance(self.board.getPiece(origin), Preview):
-               promote = True
-            # Checking for promotion illegal moves
-            if promote:
-                piece = self.board.getPiece(origin)
-                if piece.isPromote:
-                    raise MoveException("You tried to promote a piece that is already promoted.")
-                if isinstance(piece, Drive) or isinstance(piece, Shield):
-                    raise MoveException("You tired to promote a piece that cannot be promoted.")
-                if not self.checkValidPromotion(origin, dest):
-                    raise MoveException("You added in the promote flag when the move {} to {} does not have a promotion".format(origin, dest))
-                self.handleMove(origin, dest)
-                piece.promote()
-            else:
-                self.handleMove(origin, dest)
+            result = self._applyMove(origin, dest, promote)
         elif cmd == 'drop':
-            if promote:
-                raise DropException("You tried to promote a piece when dropping it.")
-            self.handleDrop(origin, dest)
-        self.nextTurn()
-
-    def handleMove(self, origin, dest):
+            result = self._applyDrop(origin, dest, promote)
+        else:
+            result = illegal(INVALID_COMMAND)
+        if result is RESULT_OK:
+            return self.nextTurn()
+        if result.status == ILLEGAL:
+            self.is_check[self.current], self.is_check[self.opponent] = current_check, opponent_check
+        return result
+
+    def handleMove(self, origin, dest, promote=False):
         """
-        Method to move piece from origin to destination.
-        Method checks for illegal actions on trying to move a piece.
-        Method calls util function location_to_index() that converts a square location. like a1 to its index (0, 0)
-        method calls util function sameteam() which checks if the two arguments are on the same team.
-        Method calls util function checkBounds, that takes in two arguments and returns true if they both are in bounds.
+        Method to move piece from origin to destination, raising on an illegal move. See _applyMove().
 
         Args:
             origin (str): Piece origin square string. The location is a square on the board like a3.
             dest (str): piece destination square. the location is a square on the board like a3.
+            promote (bool): Promote the piece on dest before looking for checks.
+                (default value False)
 
         Raises:
             WrongPlayerException: When player tires to move the other player's piece.
             MoveException: When players takes an illegal action when trying to move the piece.
             GameEnd: When the game ends in a checkmate.
+        """
+        result = self._applyMove(origin, dest, promote)
+        if result.status != OK:
+            raise result.exception()
 
+    def _applyMove(self, origin, dest, promote):
         """
-        if checkBounds(origin, dest):
-            origin_piece = self.board.getPiece(origin)
-            dest_piece = self.board.getPiece(dest)
-            # Checking for illegal actions when player tries to get piece at origin.
-            if not origin_piece:
-                raise MoveException("No piece at origin square {}".format(origin))
-            elif not sameTeam(origin_piece.getPlayerType(), self.current):
-                raise WrongPlayerException("You tried to move the other player's piece.")
-            else:
-                self.updatePieceMoves(origin_piece)
-                origin_moves = origin_piece.getMoves()
-                dest_index = location_to_index(dest)
-                # Checking for illegal actions when player moves the piece to an illegal location.
-                if dest_index not in origin_moves:
-                    raise MoveException("You tried to move a piece to a location it cant reach on this turn.")
-                if self.isPinned(origin_piece, dest_index):
-                    raise MoveException("You tried to move a pinned piece.")
-                if dest_piece and sameTeam(origin_piece.getPlayerType(), dest_piece.getPlayerType()):
-                    raise MoveException("Both origin and destination is owned by you")
-                # Move vs Capture
-                if dest_piece is None:
-                    self.board.move(origin, dest)
-                else:
-                    self.board.capture(origin, dest)
-                    self.board.removePiece(dest_piece, self.opponent)
-                origin_piece.updateLocation(dest_index)
-                self.updatePieceMoves(origin_piece)
-                ret_value = self.check_for_checks(origin_piece)
-                if ret_value == 'checkmate':
-                    raise GameEnd("{} player wins.  Checkmate.".format(self.current))
+        Method to move piece from origin to destination.
+        Method checks for illegal actions on trying to move a piece, promotion included.
+        Even if promote flag is not specified, Preview promotes by default on the last row.
+
+        Args:
+            origin (str): Piece origin square string. The location is a square on the board like a3.
+            dest (str): piece destination square. the location is a square on the board like a3.
+            promote (bool): True if the promote flag was given.
+
+        Returns:
+            MoveResult: RESULT_OK, an ILLEGAL result or the CHECKMATE result of the current player.
+        """
+        origin_index = LOCATION_INDICES.get(origin)
+        dest_index = LOCATION_INDICES.get(dest)
+        if origin_index is None or dest_index is None:
+            return illegal(OUT_OF_BOUNDS)
+        origin_piece = self.board.position.getPiece(square(origin_index))
+        if origin_piece is not None and origin_piece.type_code == PREVIEW and not origin_piece.isPromote \
+                and self.checkValidPromotion(origin, dest):
+            promote = True
+        # Checking for promotion illegal moves
+        if promote and origin_piece is not None:
+            if origin_piece.isPromote:
+                return illegal(ALREADY_PROMOTED)
+            if not CAN_PROMOTE[origin_piece.type_code]:
+                return illegal(CANNOT_PROMOTE)
+            if not self.checkValidPromotion(origin, dest):
+                return illegal(NO_PROMOTION, origin, dest)
+        # Checking for illegal actions when player tries to get piece at origin.
+        if not origin_piece:
+            return illegal(NO_PIECE, origin)
+        if not sameTeam(origin_piece.getPlayerType(), self.current):
+            return illegal(WRONG_PLAYER)
+        self.updatePieceMoves(origin_piece)
+        # Checking for illegal actions when player moves the piece to an illegal location.
+        if dest_index not in origin_piece.getMoves():
+            return illegal(UNREACHABLE)
+        if self.isPinned(origin_piece, dest_index):
+            return illegal(PINNED)
+        dest_piece = self.board.position.getPiece(square(dest_index))
+        if dest_piece and sameTeam(origin_piece.getPlayerType(), dest_piece.getPlayerType()):
+            return illegal(OWN_DESTINATION)
+        # Move vs Capture
+        if dest_piece is None:
+            self.board.move(origin, dest)
         else:
-            raise MoveException("Either origin or destination is out of bounds")
+            self.board.capture(origin, dest)
+            self.board.removePiece(dest_piece, self.opponent)
+        origin_piece.updateLocation(dest_index)
+        if promote:
+            self.board.promotePiece(origin_piece)
+        self.updatePieceMoves(origin_piece)
+        if self.check_for_checks(origin_piece) == 'checkmate':
+            return CHECKMATE_RESULTS[self.current]
+        return RESULT_OK
 
     def handleDrop(self, piece_type, dest):
         """
-        Method to drop a piece to a destination square.
-        Checks of illegal action when dropping the piece.
-        Method calls util function location_to_index() that converts a square location. like a1 to its index (0, 0)
+        Method to drop a piece to a destination square, raising on an illegal drop. See _applyDrop().
 
         Args:
             piece_type (str): The type of piece denoted by [d, r, s, n, g, p].
@@ -165,10 +260,30 @@ class Game:
         Raises:
             DropException: Exception thrown when a piece is dropped onto an illegal square.
             GameEnd: When a drop move results in a checkmate.
+        """
+        result = self._applyDrop(piece_type, dest, False)
+        if result.status != OK:
+            raise result.exception()
 
+    def _applyDrop(self, piece_type, dest, promote):
         """
-        dest_index = location_to_index(dest)
-        dest_piece = self.board.getPiece(dest)
+        Method to drop a piece to a destination square.
+        Checks of illegal action when dropping the piece.
+
+        Args:
+            piece_type (str): The type of piece denoted by [d, r, s, n, g, p].
+            dest (str): Destination square string. Example: a3
+            promote (bool): True if the promote flag was given, which a drop does not allow.
+
+        Returns:
+            MoveResult: RESULT_OK, an ILLEGAL result or the CHECKMATE result of the current player.
+        """
+        if promote:
+            return illegal(DROP_PROMOTE)
+        dest_index = LOCATION_INDICES.get(dest)
+        if dest_index is None:
+            return illegal(INVALID_SQUARE, dest)
+        dest_piece = self.board.position.getPiece(square(dest_index))
         if self.current == 'lower':
            current_captured = self.board.getLowerPlayer().getCaptured()
            current_active = self.board.getLowerPlayer().getPieces()
@@ -179,31 +294,39 @@ class Game:
             current_active = self.board.getUpperPlayer().getPieces()
             promotion_zone = 0
             piece_type = piece_type.upper()
-        # If current piece type is not in captured list then checks if the promoted piece type is in captured list.
-        piece_type = piece_type if piece_type in current_captured else '+' + piece_type
-        if piece_type not in current_captured:
-            raise DropException("You tried to drop a piece you have not captured.")
+        if not current_captured.has(piece_type):
+            return illegal(NOT_CAPTURED)
+        # Hands from a file may hold the promoted name of a piece.
+        piece_type = current_captured.entry(piece_type)
         # Checks for illegal action while dropping a preview piece.
         if piece_type.lower() == 'p':
             for i in current_active:
-                if isinstance(i, Preview) and dest_index[0] == i.getIndex()[0]:
-                    raise DropException("Tried to drop a preview piece into a column with another preview.")
+                if i.type_code == PREVIEW and dest_index[0] == i.getIndex()[0]:
+                    return illegal(PREVIEW_COLUMN)
             if dest_index[1] == promotion_zone:
-                raise DropException("You tried to drop a preview ont a spot that results in promotion.")
+                return illegal(PREVIEW_PROMOTION)
 
         piece = Board.createPieceFromName(piece_type[-1], self.current, dest_index)
         if dest_piece:
             if dest_piece.getPlayerType() == self.current:
                 self.board.updateSupportPieceMoves(dest_piece, piece)
             else:
-                raise DropException("")
+                return illegal(OCCUPIED_DROP)
         else:
             current_active.append(piece)
-            ret_value = self.check_for_checks(piece)
             self.board.drop(piece, dest_index)
-            current_captured.remove(piece_type)
+            # A dropped notes or governance is blocked by the pieces already on the board.
+            self.updatePieceMoves(piece)
+            ret_value = self.check_for_checks(piece)
+            if ret_value == 'illegal':
+                # A preview drop into checkmate is illegal, so the drop is taken back.
+                self.board.undoDrop(dest_index)
+                current_active.remove(piece)
+                return illegal(PREVIEW_MATE)
+            self.board.removeCapture(self.current, piece_type)
             if ret_value == 'checkmate':
-                raise GameEnd("{} player wins.  Checkmate.".format(self.current))
+                return CHECKMATE_RESULTS[self.current]
+        return RESULT_OK
 
     def check_for_checks(self, origin_piece):
         """
@@ -215,24 +338,48 @@ class Game:
 
         Returns:
             boolean: True if the other player is in check else false
-            str: string('checkmate") if the check results in a checkmate.
+            str: string('checkmate") if the check results in a checkmate, 'illegal' if that checkmate comes from a preview drop.
         """
         opponent_drive = self.board.getPlayerDrive(self.opponent)
-        possible_checks = origin_piece.getMoves()
-        # Checking for discovered attacks.
-        possible_checks.extend(self.board.getNotesGovernanceMoves(self.current))
-        if opponent_drive.getIndex() in possible_checks:
-            opponent_drive.updateMoves(self.board.getAllMoves(self.current), self.board.getActivePieceLocations(self.opponent))
-            escape_moves = self.board.getBlockMoves(origin_piece, opponent_drive)
-            escape_moves += self.board.getCapturedEscapeMoves(origin_piece.getIndex(), self.opponent)
-            escape_moves += ["move {} {}".format(index_to_location(opponent_drive.getIndex()), index_to_location(i)) for i in opponent_drive.getMoves()]
-            escape_moves.sort()
+        # The attack map covers direct checks, discovered attacks and checks from new support moves.
+        checkers = self.board.getCheckers(self.opponent)
+        if checkers:
+            escape_moves = EscapeMoves(lambda: self.getEscapeMoves(checkers, opponent_drive))
             self.is_check[opponent_drive.getPlayerType()] = (True, escape_moves)
-            if not escape_moves:
+            # A drive that can step out of check is never mated, so the escape list is only built when it cannot.
+            if not self.board.getDriveEscapeMask(opponent_drive) and not escape_moves:
                 return self.checkmate(origin_piece)
             return True
         return False
 
+    def getEscapeMoves(self, checkers, defend_king):
+        """
+        Method builds the sorted list of moves that get a drive out of check.
+
+        Args:
+            checkers (list): Pieces giving check to defend_king.
+            defend_king (Drive): Drive object currently under check.
+
+        Returns:
+            list: of full move strings like "move a2 a3" or "drop p c3".
+        """
+        escape_moves = self.board.getDriveEscapeMoves(defend_king)
+        # A double check cannot be blocked.
+        if len(checkers) == 1:
+            escape_moves += self.board.getBlockMoves(checkers[0], defend_king)
+        # Capturing a checker, or the support piece it checks with, ends the checks that piece gives.
+        capture_targets = None
+        for attack_piece in checkers:
+            targets = {attack_piece}
+            support_piece = self.board.getCheckSupport(attack_piece, defend_king)
+            if support_piece is not None:
+                targets.add(support_piece)
+            capture_targets = targets if capture_targets is None else capture_targets & targets
+        for attack_piece in capture_targets:
+            escape_moves += self.board.getCapturedEscapeMoves(attack_piece.getIndex(), defend_king.getPlayerType())
+        escape_moves.sort()
+        return escape_moves
+
     def checkmate(self, piece):
         """
         Method checks if the checkmate is valid, ie did not occur by dropping a preview piece.
@@ -241,13 +388,10 @@ class Game:
             piece (Piece): Piece whose action resulted in a checkmate.
 
         Returns:
-            str: 'checkmate" if its a valid checkmate.
-
-        Raises:
-            DropException: if the checkmate results from an illegal drop action.
+            str: 'checkmate" if its a valid checkmate, 'illegal' if it results from dropping a preview.
         """
-        if self.current_action == 'drop' and isinstance(piece, Preview):
-            raise DropException("Cannot drop a preview piece into a checkmate.")
+        if self.current_action == 'drop' and piece.type_code == PREVIEW:
+            return 'illegal'
         return 'checkmate'
 
     def checkValidPromotion(self, origin, dest):
@@ -283,23 +427,20 @@ class Game:
         Returns:
             bool: True if the piece is pinned, False if not.
         """
-        if isinstance(piece, Drive):
+        if piece.type_code == DRIVE:
             return False
-        current_king = self.board.getPlayerDrive(self.current)
-        origin_index = piece.getIndex()
-        piece.updateLocation(dest_index)
-        possible_checks = self.board.getNotesGovernanceMoves(self.opponent, piece)
-        piece.updateLocation(origin_index)
-        if current_king.getIndex() in possible_checks:
-            return True
-        return False
+        # Trying the move on the board and reading the attack map before taking it back.
+        undo = self.board.make_move(encode_move(square(piece.getIndex()), square(dest_index)))
+        pinned = self.board.isInCheck(self.current)
+        self.board.unmake_move(undo)
+        return pinned
 
     def nextTurn(self):
         """
         Method transitions the game object to the next player's turn.
 
-        Raises:
-            GameEnd: If the turns reaches 200, then its a tie game.
+        Returns:
+            MoveResult: RESULT_TIE if the turns reach MAX_TURNS, which is a tie game, RESULT_OK otherwise.
         """
         if self.current == "lower":
             self.current = "UPPER"
@@ -308,10 +449,12 @@ class Game:
             # A turn is both players taking an action.
             # Since game starts with lower player, a turn can only finish on an upper player's turn
             self.num_turns += 1
-            if self.num_turns >= 200:
-                raise GameEnd("Tie game.  Too many moves.")
+            if self.num_turns >= MAX_TURNS:
+                return RESULT_TIE
             self.current = "lower"
             self.opponent = 'UPPER'
+        self.board.side_to_move = self.current
+        return RESULT_OK
 
     def isPlayerinCheck(self):
         """
@@ -335,19 +478,28 @@ class Game:
         Args:
             piece (Piece): The piece whose moves are to be updated.
         """
-        # Three cases since Notes and Governance need to account for blocks
-        if isinstance(piece, Notes) or isinstance(piece, Governanace):
-            piece.updateMoves(self.board.getAllPieceLocations())
-        #  Drive needs to account for checks.
-        elif isinstance(piece, Drive):
-            piece.updateMoves(self.board.getAllMoves(self.opponent),
-                              self.board.getActivePieceLocations(self.current))
-        else:
-            piece.updateMoves()
+        MOVE_UPDATES[piece.type_code](self, piece)
         self.board.updateSupportPieceMoves(piece)
+        if piece.type_code == DRIVE:
+            # The support moves of the drive cannot go onto a controlled square either.
+            piece.setMoveMask(piece.move_mask & ~self.board.getAllMoves(self.opponent))
 
+    def _updateSliderMoves(self, piece):
+        """
+        Notes and governance need to account for blocks.
+        """
+        piece.updateMoves(self.board.getAllPieceLocations())
 
+    def _updateDriveMoves(self, piece):
+        """
+        Drive needs to account for checks.
+        """
+        piece.updateMoves(self.board.getAllMoves(self.opponent), self.board.getActivePieceLocations(self.current))
 
+    def _updateStepMoves(self, piece):
+        piece.updateMoves()
 
 
-
+# MOVE_UPDATES[code] is the Game method updating the moves of a piece of that type code, see Game.updatePieceMoves.
+MOVE_UPDATES = tuple(Game._updateDriveMoves if code == DRIVE else Game._updateSliderMoves if IS_SLIDER[code]
+                     else Game._updateStepMoves for code in range(len(IS_SLIDER)))
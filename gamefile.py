@@ -0,0 +1,158 @@
+from exceptions import FileParseException
+
+# A line starting with GAME_HEADER opens a game in a multi game file, the rest of the line is the game's name.
+GAME_HEADER = '#game'
+
+
+class _LineStream:
+    """
+    Reads a file line by line, with room to push one line back.
+    """
+    def __init__(self, f):
+        self._f = f
+        self._pushed = None
+
+    def readline(self):
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            return line
+        return self._f.readline()
+
+    def pushback(self, line):
+        self._pushed = line
+
+
+def readSetup(stream):
+    """
+    Util method to read the setup section of a game: piece lines up to a blank line, the UPPER and lower
+    captures lines, and the blank line before the moves.
+
+    Args:
+        stream (_LineStream): Stream positioned on the first piece line.
+
+    Returns:
+        dict: initialPieces, upperCaptures and lowerCaptures, as in parseTestCase.
+
+    Raises:
+        FileParseException: If the section is cut short or a piece line is malformed.
+    """
+    initial_pieces = []
+    line = stream.readline()
+    while line != '\n':
+        if line == '' or line.startswith(GAME_HEADER):
+            raise FileParseException("The file ended before the setup section was complete.")
+        try:
+            piece, position = line.strip().split(' ')
+        except ValueError:
+            raise FileParseException("Malformed piece line: {}".format(line.strip()))
+        initial_pieces.append(dict(piece=piece, position=position))
+        line = stream.readline()
+    captures = []
+    for _ in range(2):
+        line = stream.readline().strip()
+        captures.append([x for x in line[1:-1].split(' ') if x != ''])
+    stream.readline()
+    return dict(initialPieces=initial_pieces, upperCaptures=captures[0], lowerCaptures=captures[1])
+
+
+def iterMoves(stream, multi_game=False):
+    """
+    Util method to lazily read the moves section of a game.
+
+    Args:
+        stream (_LineStream): Stream positioned on the first move line.
+        multi_game (bool): Stop at the next game header, which is pushed back, and skip blank lines.
+            (default value False, every line up to the end of the file is a move)
+
+    Yields:
+        str: Each move command, like "move a1 a2".
+    """
+    line = stream.readline()
+    while line != '':
+        if multi_game:
+            if line.startswith(GAME_HEADER):
+                stream.pushback(line)
+                return
+            if not line.strip():
+                line = stream.readline()
+                continue
+        yield line.strip()
+        line = stream.readline()
+
+
+def readGame(path):
+    """
+    Util method to open a single game file. The setup is read right away, the moves are read as they are iterated,
+    and the file is closed once they run out.
+
+    Args:
+        path (str): Path of a .in file.
+
+    Returns:
+        dict: initialPieces, upperCaptures, lowerCaptures and a moves iterator.
+    """
+    f = open(path)
+    stream = _LineStream(f)
+    try:
+        file_input = readSetup(stream)
+    except Exception:
+        f.close()
+        raise
+    file_input['moves'] = _movesThenClose(stream, f)
+    return file_input
+
+
+def _movesThenClose(stream, f):
+    with f:
+        yield from iterMoves(stream)
+
+
+def readGames(path):
+    """
+    Util method to iterate over the games of a multi game file without loading the file.
+    Every game is a GAME_HEADER line followed by a setup and a moves section in the .in format.
+    The moves of a game must be iterated before the next game, moves left over are skipped.
+
+    Args:
+        path (str): Path of the multi game file.
+
+    Yields:
+        dict: name, initialPieces, upperCaptures, lowerCaptures and a moves iterator of each game.
+
+    Raises:
+        FileParseException: If a line outside of a game is not a game header.
+    """
+    with open(path) as f:
+        stream = _LineStream(f)
+        line = stream.readline()
+        while line != '':
+            if line.strip():
+                if not line.startswith(GAME_HEADER):
+                    raise FileParseException("Expected a game header, found: {}".format(line.strip()))
+                file_input = readSetup(stream)
+                file_input['name'] = line[len(GAME_HEADER):].strip()
+                moves = iterMoves(stream, multi_game=True)
+                file_input['moves'] = moves
+                yield file_input
+                for _ in moves:
+                    pass
+            line = stream.readline()
+
+
+def writeGame(f, file_input, name=None):
+    """
+    Util method to write a game in the .in format, behind a game header if it has a name.
+
+    Args:
+        f (file): File opened for writing.
+        file_input (dict): initialPieces, upperCaptures, lowerCaptures and moves of the game.
+        name (str): Name written in the game header.
+            (default value None, no header)
+    """
+    if name is not None:
+        f.write("{} {}\n".format(GAME_HEADER, name))
+    for piece in file_input['initialPieces']:
+        f.write("{} {}\n".format(piece['piece'], piece['position']))
+    f.write("\n[{}]\n[{}]\n\n".format(' '.join(file_input['upperCaptures']), ' '.join(file_input['lowerCaptures'])))
+    for move in file_input['moves']:
+        f.write(move + "\n")
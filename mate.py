@@ -0,0 +1,512 @@
+import os
+import time
+import random
+import contextlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from game import Game, MAX_TURNS
+from gamefile import readGame, readGames
+from bitboard import SQUARE_BIT, squares_of
+from attacks import BETWEEN, SUPPORT_SQUARE, supported_squares, piece_attacks
+from move import move_to_string, move_dest, move_origin, is_drop, is_promote, drop_name
+from result import OK
+
+# Status of a mate search.
+MATE = 0
+NO_MATE = 1
+UNKNOWN = 2
+
+# Proof and disproof numbers saturate at PN_INFINITY, a solved node has one of them at 0 and the other at PN_INFINITY.
+PN_INFINITY = (1 << 31) - 1
+ENTRY_BYTES = 16
+# A bucket holds a slot preferring solved entries followed by an always replace slot.
+BUCKET_SLOTS = 2
+
+# The same position is a different node with a different number of plies left, so the table key of a node is the
+# position key mixed with PLY_KEYS[plies left]. The keys come from a fixed seed, like the ones of zobrist.py.
+_random = random.Random(0x7E5A)
+PLY_KEYS = tuple(_random.getrandbits(64) for _ in range(2 * MAX_TURNS + 1))
+
+
+class ProofTable:
+    """
+    Fixed size table of the proof and disproof numbers of the mate solver, keyed by position and plies left.
+    Like the engine's TranspositionTable it is two preallocated arrays that never grow. Each bucket has a slot
+    that keeps solved entries, replaced by another solved entry or any entry of its own key, and an always replace
+    slot that takes everything else. A lost entry only costs searching the node again.
+
+    Attributes:
+        keys (array): Key of every slot.
+        data (array): Packed numbers of every slot, phi in bits 0-31 and delta in bits 32-63.
+        mask (int): Bucket index mask, the number of buckets is a power of two.
+    """
+    def __init__(self, size_mb=16):
+        """
+        Args:
+            size_mb (float): Memory cap of the table in megabytes.
+                (default value 16)
+        """
+        buckets = 1
+        while buckets * 2 * BUCKET_SLOTS * ENTRY_BYTES <= size_mb * (1 << 20):
+            buckets *= 2
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * buckets * BUCKET_SLOTS))
+        self.data = array('Q', bytes(8 * buckets * BUCKET_SLOTS))
+
+    def clear(self):
+        """
+        Method to empty the table without reallocating it.
+        """
+        size = len(self.keys)
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+
+    def probe(self, key):
+        """
+        Method to look up a node.
+
+        Args:
+            key (int): Table key of the node.
+
+        Returns:
+            tuple: (phi, delta) of the stored entry, None if the node is not stored.
+        """
+        slot = (key & self.mask) * BUCKET_SLOTS
+        keys = self.keys
+        if keys[slot] == key:
+            data = self.data[slot]
+        elif keys[slot + 1] == key:
+            data = self.data[slot + 1]
+        else:
+            return None
+        if not data:
+            return None
+        return data & 0xffffffff, data >> 32
+
+    def store(self, key, phi, delta):
+        """
+        Method to store the numbers of a node.
+
+        Args:
+            key (int): Table key of the node.
+            phi (int): Proof number of the side to move at the node, see MateSolver.
+            delta (int): Disproof number of the side to move at the node.
+        """
+        slot = (key & self.mask) * BUCKET_SLOTS
+        stored = self.data[slot]
+        if self.keys[slot] != key and stored and (phi and delta or not (stored & 0xffffffff and stored >> 32)):
+            slot += 1
+        self.data[slot] = phi | delta << 32
+        self.keys[slot] = key
+
+
+class MateResult:
+    """
+    Class holding the outcome of a mate search.
+
+    Attributes:
+        status (int): MATE, NO_MATE or UNKNOWN.
+        player (str): The player trying to mate, the side to move of the searched position.
+        moves (int): Number of the player's moves of the mate for MATE, the most moves searched for NO_MATE,
+            and the most moves proven not to mate for UNKNOWN.
+        line (list): Packed moves of the mating line, both players' moves, for MATE.
+        nodes (int): Number of nodes searched.
+        elapsed (float): Search time in seconds.
+    """
+    __slots__ = ('status', 'player', 'moves', 'line', 'nodes', 'elapsed')
+
+    def __init__(self, status, player, moves, line, nodes, elapsed):
+        self.status = status
+        self.player = player
+        self.moves = moves
+        self.line = line
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __str__(self):
+        if self.status == MATE:
+            return "mate in {} for {}: {}".format(self.moves, self.player, ', '.join(map(move_to_string, self.line)))
+        if self.status == NO_MATE:
+            return "no mate in {} for {}".format(self.moves, self.player)
+        if self.moves:
+            return "unknown for {}, node limit reached: no mate in {}".format(self.player, self.moves)
+        return "unknown for {}, node limit reached".format(self.player)
+
+
+class MateSolver:
+    """
+    MateSolver class proves or disproves that the side to move mates within a number of moves.
+    It runs depth first proof number search (df-pn) over an AND/OR tree: at OR nodes the attacker plays one of its
+    moves that give check, at AND nodes the defender plays any of its legal moves, and the attacker wins at an AND
+    node where the defender has no move. A node is the position and the plies left, so the tree has no cycles,
+    and an AND node with no plies left is a disproof.
+    Numbers are kept for the side to move at each node: phi is its proof number and delta its disproof number,
+    so phi is the proof number at OR nodes and the disproof number at AND nodes.
+    Moves are explored with Board.make_move/unmake_move, so the searched board is left unchanged.
+
+    Attributes:
+        node_limit (int): Nodes a search may visit, None for no limit.
+        table (ProofTable): Proof and disproof numbers, shared by every search of the solver.
+        nodes (int): Nodes visited by the current search.
+    """
+    def __init__(self, node_limit=None, hash_mb=16):
+        self.node_limit = node_limit
+        self.table = ProofTable(hash_mb)
+        self.nodes = 0
+        self._stopped = False
+        self._board = None
+
+    def solve(self, board, max_moves, max_plies=None):
+        """
+        Method searches the shortest mate of the side to move within max_moves moves. Mates in 1, 2 and up to
+        max_moves moves are tried in turn, so a found mate is the shortest one and the line has the longest defence.
+
+        Args:
+            board (Board): Board to search.
+            max_moves (int): Most moves of the side to move in the mate.
+            max_plies (int): Most plies the game may still last, see plies_left.
+                (default value None, no limit)
+
+        Returns:
+            MateResult: The mate found, or how far no mate was proven.
+        """
+        start = time.perf_counter()
+        self._board = board
+        self._stopped = False
+        self.nodes = 0
+        player = board.side_to_move
+        disproven = 0
+        for moves in range(1, max_moves + 1):
+            plies = 2 * moves - 1
+            if max_plies is not None and plies > max_plies:
+                break
+            phi, delta = self._mid(plies, PN_INFINITY, PN_INFINITY)
+            if self._stopped:
+                return MateResult(UNKNOWN, player, disproven, [], self.nodes, time.perf_counter() - start)
+            if phi == 0:
+                line = self._mateLine(plies)
+                return MateResult(MATE, player, moves, line, self.nodes, time.perf_counter() - start)
+            disproven = moves
+        return MateResult(NO_MATE, player, max_moves, [], self.nodes, time.perf_counter() - start)
+
+    def _children(self, plies):
+        """
+        Method to get the moves of a node: the moves giving check at an OR node and every legal move at an AND node.
+        The table keys of the nodes they lead to come for free at an OR node, where every move is made to see the
+        check, and are left out at an AND node, where a child is first looked up when it is searched.
+
+        Returns:
+            list: (packed move, child table key or None) tuples.
+        """
+        board = self._board
+        moves = board.generate_legal_moves()
+        if plies % 2 == 0:
+            return [(move, None) for move in moves]
+        position = board.position
+        player = board.side_to_move
+        defender = 'UPPER' if player == 'lower' else 'lower'
+        target = position.pieces[(defender, 'd')]
+        discovery = discovery_squares(position, player, target)
+        child_key = PLY_KEYS[plies - 1]
+        children = []
+        for move in moves:
+            if not may_give_check(position, player, move, target, discovery):
+                continue
+            undo = board.make_move(move)
+            if board.isInCheck(defender):
+                children.append((move, board.getZobristKey() ^ child_key))
+            board.unmake_move(undo)
+        return children
+
+    def _mid(self, plies, thphi, thdelta):
+        """
+        Method searches the node of the board with plies left until its phi reaches thphi or its delta
+        reaches thdelta, and returns (phi, delta).
+        """
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self._stopped = True
+        board = self._board
+        key = board.getZobristKey() ^ PLY_KEYS[plies]
+        entry = self.table.probe(key)
+        if entry is not None and (entry[0] >= thphi or entry[1] >= thdelta):
+            return entry
+        children = self._children(plies)
+        if not children:
+            # The attacker has no check left, or the defender is mated.
+            self.table.store(key, PN_INFINITY, 0)
+            return PN_INFINITY, 0
+        if plies == 0:
+            # The defender escaped the last check.
+            self.table.store(key, 0, PN_INFINITY)
+            return 0, PN_INFINITY
+        probe = self.table.probe
+        numbers = [child_key is not None and probe(child_key) or (1, 1) for _, child_key in children]
+        while True:
+            # The side to move wins when one child loses: phi is the smallest child delta, delta the sum of child phis.
+            phi, delta = PN_INFINITY, 0
+            best, second = 0, PN_INFINITY
+            for i, (child_phi, child_delta) in enumerate(numbers):
+                delta += child_phi
+                if child_delta < phi:
+                    best, second, phi = i, phi, child_delta
+                elif child_delta < second:
+                    second = child_delta
+            delta = min(delta, PN_INFINITY)
+            if phi >= thphi or delta >= thdelta or self._stopped:
+                break
+            child_phi = numbers[best][0]
+            undo = board.make_move(children[best][0])
+            numbers[best] = self._mid(plies - 1, min(thdelta - delta + child_phi, PN_INFINITY), min(thphi, second + 1))
+            board.unmake_move(undo)
+        if not self._stopped:
+            self.table.store(key, phi, delta)
+        return phi, delta
+
+    def _proven(self, plies):
+        """
+        Returns:
+            bool: True if the attacker mates from the node of the board with plies left.
+        """
+        phi, delta = self._mid(plies, PN_INFINITY, PN_INFINITY)
+        return (phi if plies % 2 else delta) == 0
+
+    def _mateLength(self, plies):
+        """
+        Returns:
+            int: Fewest plies the attacker needs to mate from the position of the board, None if it needs more than plies.
+        """
+        for length in range(plies % 2, plies + 1, 2):
+            if self._proven(length):
+                return length
+        return None
+
+    def _mateLine(self, plies):
+        """
+        Method follows a proven node down to the mate, the attacker taking its shortest mate and the defender
+        its longest defence. The node limit does not apply, the numbers of the line are mostly in the table.
+
+        Returns:
+            list: Packed moves of the line.
+        """
+        board = self._board
+        node_limit, self.node_limit = self.node_limit, None
+        line, undos = [], []
+        while True:
+            moves = [move for move, _ in self._children(plies)]
+            if not moves:
+                break
+            lengths = []
+            for move in moves:
+                undo = board.make_move(move)
+                length = self._mateLength(plies - 1)
+                board.unmake_move(undo)
+                # Every defence of a proven AND node is proven, only some checks of a proven OR node are.
+                if length is not None:
+                    lengths.append((length, move))
+            if plies % 2:
+                plies, move = min(lengths, key=lambda item: item[0])
+            else:
+                plies, move = max(lengths, key=lambda item: item[0])
+            line.append(move)
+            undos.append(board.make_move(move))
+        for undo in reversed(undos):
+            board.unmake_move(undo)
+        self.node_limit = node_limit
+        return line
+
+
+def discovery_squares(position, player, target):
+    """
+    Util method to get the squares a piece of player may give a discovered check by leaving: the squares between
+    the other player's drive and player's notes and governance pieces, or the pieces they support.
+
+    Args:
+        position (BitboardPosition): The position.
+        player (str): The player giving check.
+        target (int): bitmask of the other player's drive.
+
+    Returns:
+        int: bitmask of the squares.
+    """
+    target_sq = target.bit_length() - 1
+    sliders = position.pieces[(player, 'n')] | position.pieces[(player, 'g')]
+    squares = 0
+    for sq in squares_of(sliders | supported_squares(player, sliders) & position.sides[player]):
+        squares |= BETWEEN[sq][target_sq]
+    return squares
+
+
+def may_give_check(position, player, move, target, discovery):
+    """
+    Util method to tell cheaply if a move of player may give check, so that the moves that cannot are not made.
+    The defender is not in check before the move, so a check comes from an attack the move changes: the moved piece
+    on its destination with the support of the piece behind it, the piece in front of it now supported by it, or a
+    ray opened by leaving the origin. Every check is kept, and some moves that do not give check are kept too.
+
+    Args:
+        position (BitboardPosition): Position before the move.
+        player (str): Player making the move.
+        move (int): Packed legal move or drop of player.
+        target (int): bitmask of the other player's drive.
+        discovery (int): bitmask of the squares a piece may give a discovered check by leaving, see discovery_squares.
+
+    Returns:
+        bool: False if the move does not give check.
+    """
+    dest = move_dest(move)
+    squares = position.squares
+    if is_drop(move):
+        name, is_promoted, vacated = drop_name(move), False, 0
+    else:
+        origin = move_origin(move)
+        if SQUARE_BIT[origin] & discovery:
+            return True
+        piece = squares[origin]
+        name, is_promoted, vacated = piece.name[-1], piece.isPromote or is_promote(move), SQUARE_BIT[origin]
+    own = position.sides[player] & ~vacated
+    occupied = position.occupied & ~vacated | SQUARE_BIT[dest]
+    attacks = piece_attacks(name, player, is_promoted, dest, occupied)
+    support_sq = SUPPORT_SQUARE[player][dest]
+    if support_sq is not None and SQUARE_BIT[support_sq] & own:
+        support = squares[support_sq]
+        attacks |= piece_attacks(support.name[-1], player, support.isPromote, dest, occupied)
+    supported = supported_squares(player, SQUARE_BIT[dest]) & own
+    if supported:
+        # The piece in front of the destination gets the moves of the moved piece.
+        attacks |= piece_attacks(name, player, is_promoted, supported.bit_length() - 1, occupied)
+    return attacks & target != 0
+
+
+def plies_left(game):
+    """
+    Util method to get how many more plies a game may last before it ends in a tie.
+
+    Args:
+        game (Game): The game.
+
+    Returns:
+        int: The number of plies.
+    """
+    return 2 * (MAX_TURNS - game.num_turns) - (game.getCurrentPlayer() == 'UPPER')
+
+
+def puzzle_game(file_input):
+    """
+    Util method to set up a game from a parsed game and play its moves, the position after them is the puzzle.
+
+    Args:
+        file_input (dict): Setup and moves of the game, see gamefile.py.
+
+    Returns:
+        Game: The game.
+
+    Raises:
+        ValueError: If a move of the game is illegal or ends it.
+    """
+    game = Game('f', file_input)
+    for command in file_input['moves']:
+        result = game.apply(command)
+        if result.status != OK:
+            raise ValueError("{}: {}".format(command, result.message or "the game is over"))
+    return game
+
+
+def solve_game(file_input, max_moves, solver):
+    """
+    Util method to search the mate of the side to move after the moves of a parsed game.
+
+    Args:
+        file_input (dict): Setup and moves of the game, see gamefile.py.
+        max_moves (int): Most moves of the mate.
+        solver (MateSolver): Solver to search with.
+
+    Returns:
+        MateResult: The outcome.
+    """
+    game = puzzle_game(file_input)
+    return solver.solve(game.board, max_moves, plies_left(game))
+
+
+def runSolveMate(path, max_moves, node_limit=None, hash_mb=16):
+    """
+    Method searches the mate of the side to move after the moves of an input file, and prints the mating line
+    or how far no mate exists, and the search speed.
+
+    Args:
+        path (str): Path of the .in file.
+        max_moves (int): Most moves of the mate.
+        node_limit (int): Nodes the search may visit, None for no limit.
+            (default value None)
+        hash_mb (float): Size of the proof table in megabytes.
+            (default value 16)
+    """
+    result = solve_game(readGame(path), max_moves, MateSolver(node_limit, hash_mb))
+    print(result)
+    print("{} nodes in {:.3f}s ({:.0f} nodes/s)".format(
+        result.nodes, result.elapsed, result.nodes / result.elapsed if result.elapsed else 0))
+
+
+# Solver of a worker process, built once per process. Its table is cleared before every puzzle, so the outcome of a
+# puzzle does not depend on the puzzles solved before it.
+_solver = []
+
+
+def _solvePuzzle(args):
+    """
+    Worker method solving one puzzle of runMateBatch, given as a parsed game or the path of its .in file.
+    Returns the puzzle's status and result line.
+    """
+    file_input, path, max_moves, node_limit, hash_mb = args
+    if not _solver:
+        _solver.append(MateSolver(node_limit, hash_mb))
+    solver = _solver[0]
+    solver.node_limit = node_limit
+    solver.table.clear()
+    try:
+        result = solve_game(file_input or readGame(path), max_moves, solver)
+    except Exception as e:
+        return None, "error: {}: {}".format(type(e).__name__, e)
+    return result.status, str(result)
+
+
+def runMateBatch(source, max_moves, node_limit=None, hash_mb=16, jobs=1):
+    """
+    Method searches the mate of every .in file of a directory, or of every game of a multi game file, in one
+    process or in a pool of jobs processes. It prints a result line per puzzle in order, then a summary.
+
+    Args:
+        source (str): Directory or multi game file to read.
+        max_moves (int): Most moves of the mates.
+        node_limit (int): Nodes each search may visit, None for no limit.
+            (default value None)
+        hash_mb (float): Size of each proof table in megabytes.
+            (default value 16)
+        jobs (int): Number of worker processes, 1 solves in this process.
+            (default value 1)
+
+    Returns:
+        dict: A mapping from status to number of puzzles, None for the puzzles that could not be set up.
+    """
+    if os.path.isfile(source):
+        # The moves are read now, a worker cannot read them from the stream of the file.
+        games = [dict(file_input, moves=list(file_input['moves'])) for file_input in readGames(source)]
+        names = [file_input['name'] for file_input in games]
+        puzzles = [(file_input, None, max_moves, node_limit, hash_mb) for file_input in games]
+    else:
+        names = sorted(name for name in os.listdir(source) if name.endswith('.in'))
+        puzzles = [(None, os.path.join(source, name), max_moves, node_limit, hash_mb) for name in names]
+    counts = {MATE: 0, NO_MATE: 0, UNKNOWN: 0, None: 0}
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if jobs > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(jobs))
+            results = pool.map(_solvePuzzle, puzzles)
+        else:
+            results = map(_solvePuzzle, puzzles)
+        for name, (status, line) in zip(names, results):
+            counts[status] += 1
+            print("{}: {}".format(name, line))
+    print("{} mate, {} no mate, {} unknown, {} errors in {:.3f}s".format(
+        counts[MATE], counts[NO_MATE], counts[UNKNOWN], counts[None], time.perf_counter() - start))
+    return counts
@@ -0,0 +1,151 @@
+from utils import index_to_location, location_to_index
+from bitboard import PIECE_NAMES, NUM_SQUARES, square, square_to_index
+
+# A move is packed into a single int:
+#   bits 0-4   destination square
+#   bits 5-9   origin square (unused for drops)
+#   bit  10    promote flag
+#   bit  11    drop flag
+#   bits 12-14 dropped piece type, an index into PIECE_NAMES
+ORIGIN_SHIFT = 5
+PROMOTE_FLAG = 1 << 10
+DROP_FLAG = 1 << 11
+DROP_SHIFT = 12
+SQUARE_MASK = 0x1f
+# SQUARE_LOCATIONS[sq] is the location string of square sq, like 'a1'.
+SQUARE_LOCATIONS = tuple(index_to_location(square_to_index(sq)) for sq in range(NUM_SQUARES))
+
+
+def encode_move(origin, dest, promote=False):
+    """
+    Util method to pack a board move into an int.
+
+    Args:
+        origin (int): Origin square number.
+        dest (int): Destination square number.
+        promote (bool): True if the piece promotes at the end of the move.
+            (default value False)
+
+    Returns:
+        int: The packed move.
+    """
+    move = dest | origin << ORIGIN_SHIFT
+    if promote:
+        move |= PROMOTE_FLAG
+    return move
+
+
+def encode_drop(name, dest):
+    """
+    Util method to pack a drop into an int.
+
+    Args:
+        name (str): Name of the dropped piece, like 'p'.
+        dest (int): Destination square number.
+
+    Returns:
+        int: The packed drop.
+    """
+    return dest | DROP_FLAG | PIECE_NAMES.index(name.lower()) << DROP_SHIFT
+
+
+def move_dest(move):
+    return move & SQUARE_MASK
+
+
+def move_origin(move):
+    return move >> ORIGIN_SHIFT & SQUARE_MASK
+
+
+def is_drop(move):
+    return move & DROP_FLAG != 0
+
+
+def is_promote(move):
+    return move & PROMOTE_FLAG != 0
+
+
+def drop_name(move):
+    return PIECE_NAMES[move >> DROP_SHIFT & 0x7]
+
+
+def move_to_string(move):
+    """
+    Util method to convert a packed move to the command string used by the game interface.
+
+    Args:
+        move (int): The packed move.
+
+    Returns:
+        str: Command of the form "move a1 a2", "move a4 a5 promote" or "drop p c3".
+    """
+    dest = index_to_location(square_to_index(move & SQUARE_MASK))
+    if move & DROP_FLAG:
+        return "drop {} {}".format(drop_name(move), dest)
+    origin = index_to_location(square_to_index(move >> ORIGIN_SHIFT & SQUARE_MASK))
+    if move & PROMOTE_FLAG:
+        return "move {} {} promote".format(origin, dest)
+    return "move {} {}".format(origin, dest)
+
+
+def move_to_instruction(move):
+    """
+    Util method to convert a packed move to the instruction tuple Game.executeTurn() takes, without going through
+    a command string.
+
+    Args:
+        move (int): The packed move.
+
+    Returns:
+        tuple: command (move or drop), origin location or dropped piece name, destination location and the promote flag.
+    """
+    dest = SQUARE_LOCATIONS[move & SQUARE_MASK]
+    if move & DROP_FLAG:
+        return 'drop', drop_name(move), dest, False
+    return 'move', SQUARE_LOCATIONS[move >> ORIGIN_SHIFT & SQUARE_MASK], dest, move & PROMOTE_FLAG != 0
+
+
+def move_from_instruction(inst):
+    """
+    Util method to pack an instruction tuple returned by the util function getMove().
+
+    Args:
+        inst (tuple): A tuple that contains command (move or drop), origin, destination and the promote flag.
+
+    Returns:
+        int: The packed move.
+
+    Raises:
+        PositionOutofBoundsException: If origin or destination is not a square on the board.
+    """
+    cmd, origin, dest, promote = inst
+    if cmd == 'drop':
+        return encode_drop(origin, square(location_to_index(dest)))
+    return encode_move(square(location_to_index(origin)), square(location_to_index(dest)), promote)
+
+
+class UndoRecord:
+    """
+    Class holding everything Board.unmake_move needs to take back a move.
+    The moved piece's origin, which is also the drive location when the drive moved, is part of the packed move.
+
+    Attributes:
+        move (int): The packed move that was made.
+        piece (Piece): The piece that moved or was dropped.
+        captured (Piece): The captured piece, None if the move did not capture.
+        captured_slot (int): Position of the captured piece in its owner's piece list.
+        hand_slot (int): Position of the hand entry that was added by a capture or removed by a drop.
+        hand_entry (str): The hand entry that was removed by a drop.
+        promoted (bool): True if the move promoted the piece.
+    """
+    __slots__ = ('move', 'piece', 'captured', 'captured_slot', 'hand_slot', 'hand_entry', 'promoted')
+
+    def __init__(self, move, piece, captured=None, captured_slot=None, hand_slot=None, hand_entry=None,
+                 promoted=False):
+        self.move = move
+        self.piece = piece
+        self.captured = captured
+        self.captured_slot = captured_slot
+        self.hand_slot = hand_slot
+        self.hand_entry = hand_entry
+        self.promoted = promoted
@@ -0,0 +1,111 @@
+import time
+from move import move_to_string
+
+# Kinds of the last ply moves counted by perft. 'moves' are quiet board moves: not a capture, a drop or a promotion.
+# The other kinds can overlap, a capture can also promote and any move can give check.
+STAT_KINDS = ('moves', 'captures', 'drops', 'promotions', 'checks')
+
+
+def perft(board, depth, stats=None):
+    """
+    Method counts the leaf nodes of the legal move tree of the side to move, depth plies deep.
+    Moves are explored with make_move/unmake_move, so the board is left as it was.
+
+    Args:
+        board (Board): Board to count from.
+        depth (int): Number of plies.
+        stats (dict): A mapping from each of STAT_KINDS to a count, filled with the kinds of the last ply moves.
+            (default value None, no kind counts)
+
+    Returns:
+        int: Number of leaf nodes, 0 for a negative depth.
+    """
+    if depth < 0:
+        return 0
+    if depth == 0:
+        return 1
+    moves = board.generate_legal_moves()
+    if depth == 1 and stats is None:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = board.make_move(move)
+        if depth == 1:
+            countKinds(board, undo, stats)
+            nodes += 1
+        else:
+            nodes += perft(board, depth - 1, stats)
+        board.unmake_move(undo)
+    return nodes
+
+
+def countKinds(board, undo, stats):
+    """
+    Method adds the kinds of the move that was just made to stats.
+
+    Args:
+        board (Board): Board right after the move.
+        undo (UndoRecord): Undo record of the move.
+        stats (dict): A mapping from each of STAT_KINDS to a count.
+    """
+    if undo.captured is not None:
+        stats['captures'] += 1
+    elif undo.hand_entry is not None:
+        stats['drops'] += 1
+    elif not undo.promoted:
+        stats['moves'] += 1
+    if undo.promoted:
+        stats['promotions'] += 1
+    if board.isInCheck(board.side_to_move):
+        stats['checks'] += 1
+
+
+def divide(board, depth, stats=None):
+    """
+    Method runs perft below each legal move of the side to move.
+
+    Args:
+        board (Board): Board to count from.
+        depth (int): Number of plies, the root move included.
+        stats (dict): Kind counts, see perft.
+            (default value None)
+
+    Returns:
+        list: (move string, leaf nodes) tuples, sorted by move string.
+    """
+    counts = []
+    for move in board.generate_legal_moves():
+        undo = board.make_move(move)
+        if depth == 1 and stats is not None:
+            countKinds(board, undo, stats)
+        counts.append((move_to_string(move), perft(board, depth - 1, stats)))
+        board.unmake_move(undo)
+    counts.sort()
+    return counts
+
+
+def runPerft(board, depth, show_divide=False):
+    """
+    Method runs perft to the given depth and prints the node count, nodes per second and move kinds.
+
+    Args:
+        board (Board): Board to count from.
+        depth (int): Number of plies.
+        show_divide (bool): Print the leaf nodes below every root move.
+            (default value False)
+    """
+    stats = dict.fromkeys(STAT_KINDS, 0)
+    start = time.perf_counter()
+    if show_divide:
+        counts = divide(board, depth, stats)
+        nodes = sum(count for _, count in counts)
+    else:
+        nodes = perft(board, depth, stats)
+    elapsed = time.perf_counter() - start
+    if show_divide:
+        for move, count in counts:
+            print("{}: {}".format(move, count))
+        print()
+    print("perft {}: {} nodes in {:.3f}s ({:.0f} nodes/s)".format(depth, nodes, elapsed, nodes / elapsed if elapsed else 0))
+    for kind in STAT_KINDS:
+        print("{}: {}".format(kind, stats[kind]))
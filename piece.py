@@ -1,7 +1,10 @@
 import abc
-# Check bounds is a method that checks if a given index is in bounds of the board
-from utils import checkBounds
-from board import BOARD_SIZE
+from utils import BOARD_SIZE, PIECE_NAMES
+from attacks import STEP_ATTACKS, slider_attacks, mask_to_moves
+
+# Type code of every piece class, its index in PIECE_NAMES. Code that depends on the kind of a piece indexes the
+# tables at the end of this file with piece.type_code instead of testing its class.
+DRIVE, NOTES, GOVERNANCE, SHIELD, RELAY, PREVIEW = range(len(PIECE_NAMES))
 
 class Piece(metaclass=abc.ABCMeta):
     """
@@ -12,10 +15,14 @@ class Piece(metaclass=abc.ABCMeta):
         col: column index of the piece.
         row: row index of the piece.
         name: String name of the piece.
-        moves : List containing all the piece's current moves.
+        moves : Tuple containing all the piece's current moves. The tuple is shared with every other piece
+            that has the same moves, see attacks.mask_to_moves, so it must not be modified.
+        move_mask: bitmask of the squares in moves.
         isPromote: boolean flag indicating if piece is promoted.
+        type_code: class attribute, the piece's type code, see DRIVE to PREVIEW.
 
     """
+    __slots__ = ('player', 'col', 'row', 'name', 'moves', 'move_mask', 'isPromote')
 
     def __init__(self, player_type, index, name):
         """
@@ -26,10 +33,10 @@ class Piece(metaclass=abc.ABCMeta):
         self.col = index[0]
         self.row = index[1]
         self.name = name
-        self.moves = []
+        self.moves = ()
+        self.move_mask = 0
         self.isPromote = False
         self.updateMoves()
-        pass
 
     def __repr__(self):
         return ""
@@ -54,6 +61,13 @@ class Piece(metaclass=abc.ABCMeta):
         """
         self.name = '+' + self.name
 
+    def demote(self):
+        """
+        Method to take back a promotion, used when a promoting move is taken back.
+        """
+        self.isPromote = False
+        self.name = self.name[-1]
+
     def getPlayerType(self):
         """
         Method to return player who this piece belongs to.
@@ -91,9 +105,24 @@ class Piece(metaclass=abc.ABCMeta):
         self.col = new_location[0]
         self.row = new_location[1]
 
-    def updateSupportMoves(self, supporting_move_list):
-        self.moves += supporting_move_list
+    def setMoveMask(self, mask):
+        """
+        Method to set the piece's moves from a bitmask of squares.
 
+        Args:
+            mask (int): bitmask of the squares the piece can move to.
+        """
+        self.move_mask = mask
+        self.moves = mask_to_moves(mask)
+
+    def updateSupportMoves(self, support_mask):
+        """
+        Method to add the moves a support piece gives to the piece.
+
+        Args:
+            support_mask (int): bitmask of the squares the support piece reaches from the piece's square.
+        """
+        self.setMoveMask(self.move_mask | support_mask)
 
 
 class Drive(Piece):
@@ -101,6 +130,8 @@ class Drive(Piece):
     Class representing a drive object.
     Inherits from Piece.
     """
+    __slots__ = ()
+    type_code = DRIVE
 
     def __init__(self, player_type, index):
         """
@@ -108,28 +139,21 @@ class Drive(Piece):
         """
         super(Drive, self).__init__(player_type, index, 'd')
 
-    def updateMoves(self, check_moves=list(), own_pieces=list()):
+    def updateMoves(self, check_moves=0, own_pieces=0):
         """
         Method to update the moves of the drive.
         Drive can only move to locations that are not in check_moves or own_pieces.
         Args:
-            check_moves (list): A list of moves that are controlled by the other player.
-            own_pieces (list): A list containing locations of all the current player's pieces.
-        """
-        moves = set()
-        directions = [-1, 0, 1]
-        for i in directions:
-            for j in directions:
-                if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j) or (self.col + i, self.row + j) in own_pieces\
-                        or (self.col + i, self.row + j) in check_moves:
-                    continue
-                moves.add((self.col + i, self.row + j))
-        self.moves = list(moves)
+            check_moves (int): bitmask of the squares that are controlled by the other player.
+            own_pieces (int): bitmask containing locations of all the current player's pieces.
+        """
+        attacks = STEP_ATTACKS[('d', self.player, False)][self.col * BOARD_SIZE + self.row]
+        self.setMoveMask(attacks & ~(check_moves | own_pieces))
 
     def getMoves(self):
         """
         Returns:
-            list: list of index tuples containing possible moves.
+            tuple: index tuples containing possible moves.
         """
         return self.moves
 
@@ -144,65 +168,33 @@ class Notes(Piece):
     """
     Class representing a notes piece object.
     """
+    __slots__ = ()
+    type_code = NOTES
+
     def __init__(self, player_type, index):
         """
         Initializing object using super constructor.
         """
         super(Notes, self).__init__(player_type, index, 'n')
 
-    def updateMoves(self, blocked_path=list()):
+    def updateMoves(self, blocked_path=0):
         """
         method to update the moves of the notes(rook) piece.
-        Rook moves in four directions, to account for blockages I am using 4 loops to add moves in each direction
+        Rook moves in four directions, blockages are resolved with the precomputed ray tables in attacks.py.
 
         Args:
-            blocked_path (list): A list of current piece locations, which block the notes' path.
-        """
-        moves = set()
-        # vertically positive moves
-        for i in range(1, 5):
-            if not checkBounds(self.row + i):
-                break
-            moves.add((self.col, self.row + i))
-            if (self.col, self.row + i) in blocked_path:
-                break
-        # vertically negetive moves
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.row - i):
-                break
-            moves.add((self.col, self.row - i))
-            if (self.col, self.row - i) in blocked_path:
-                break
-        # horizontally positive moves
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.col + i):
-                break
-            moves.add((self.col + i, self.row))
-            if (self.col + i, self.row) in blocked_path:
-                break
-        # horizontally negetive moves
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.col - i):
-                break
-            moves.add((self.col - i, self.row))
-            if (self.col - i, self.row) in blocked_path:
-                break
-
-        if self.isPromote:
-            # If promoted the notes can also move like a drive.
-            directions = [-1, 0, 1]
-            for i in directions:
-                for j in directions:
-                    if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j):
-                        continue
-                    moves.add((self.col + i, self.row + j))
-        moves = list(moves)
-        self.moves = moves
+            blocked_path (int): bitmask of current piece locations, which block the notes' path.
+        """
+        sq = self.col * BOARD_SIZE + self.row
+        attacks = slider_attacks('n', sq, blocked_path)
+        # If promoted the notes can also move like a drive.
+        attacks |= STEP_ATTACKS[('n', self.player, self.isPromote)][sq]
+        self.setMoveMask(attacks)
 
     def getMoves(self):
         """
         Returns:
-            list: list of index tuple indicating possible moves.
+            tuple: index tuples indicating possible moves.
         """
         return self.moves
 
@@ -220,56 +212,25 @@ class Governanace(Piece):
     """
     Class representing a governance piece object.
     """
+    __slots__ = ()
+    type_code = GOVERNANCE
+
     def __init__(self, player_type, index):
         super(Governanace, self).__init__(player_type, index, 'g')
 
-    def updateMoves(self, blocked_path=list()):
+    def updateMoves(self, blocked_path=0):
         """
         Method updates the moves of the governance(bishop).
-        The bishop can move in four directions, to account for blockages, I shall have four loops, each loop representing one of the directions.
+        The bishop can move in four directions, blockages are resolved with the precomputed ray tables in attacks.py.
 
         Args:
-            blocked_path (list): A list of piece locations that may block the path of the governance.
-        """
-        moves = set()
-        # direction: +col, +row
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.row + i) or not checkBounds(self.col + i):
-                break
-            moves.add((self.col + i, self.row + i))
-            if (self.col + i, self.row + i) in blocked_path:
-                break
-        # direction: +col, -row
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.row - i) or not checkBounds(self.col + i):
-                break
-            moves.add((self.col + i, self.row - i))
-            if (self.col + i, self.row - i) in blocked_path:
-                break
-        # direction: -col, -row
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.row - i) or not checkBounds(self.col - i):
-                break
-            moves.add((self.col - i, self.row - i))
-            if (self.col - i, self.row - i) in blocked_path:
-                break
-        # direction: -col, +row
-        for i in range(1, BOARD_SIZE):
-            if not checkBounds(self.row + i) or not checkBounds(self.col - i):
-                break
-            moves.add((self.col - i, self.row + i))
-            if (self.col - i, self.row + i) in blocked_path:
-                break
-
-        if self.isPromote:
-            # If promoted, governance can also move like the drive.
-            directions = [-1, 0, 1]
-            for i in directions:
-                for j in directions:
-                    if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j):
-                        continue
-                    moves.add((self.col + i, self.row + j))
-        self.moves = list(moves)
+            blocked_path (int): bitmask of piece locations that may block the path of the governance.
+        """
+        sq = self.col * BOARD_SIZE + self.row
+        attacks = slider_attacks('g', sq, blocked_path)
+        # If promoted, governance can also move like the drive.
+        attacks |= STEP_ATTACKS[('g', self.player, self.isPromote)][sq]
+        self.setMoveMask(attacks)
 
     def getMoves(self):
         return self.moves
@@ -288,26 +249,18 @@ class Shield(Piece):
     """
     Shield class representing a shield piece object.
     """
+    __slots__ = ()
+    type_code = SHIELD
+
     def __init__(self, player_type, index):
         super(Shield, self).__init__(player_type, index, 's')
 
     def updateMoves(self):
         """
         Method to update the moves of the shield.
-        Method makes a banned_moves list to keep track of the locations the shield cannot move to.
-        """
-        moves = set()
-        directions = [-1, 0, 1]
-        backwards = -1 if self.player == 'lower' else 1
-        banned_moves = [(self.col + 1, self.row + backwards), (self.col - 1, self.row + backwards)]
-        for i in directions:
-            for j in directions:
-                if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j) or \
-                        (self.col + i, self.row + j) in banned_moves:
-                    continue
-                moves.add((self.col + i, self.row + j))
-        moves = list(moves)
-        self.moves = moves
+        The move set only depends on the square and player, so it is read from the precomputed step table.
+        """
+        self.setMoveMask(STEP_ATTACKS[('s', self.player, False)][self.col * BOARD_SIZE + self.row])
 
     def getMoves(self):
         return self.moves
@@ -323,35 +276,20 @@ class Relay(Piece):
     """
     Class representing a relay piece object.
     """
+    __slots__ = ()
+    type_code = RELAY
+
     def __init__(self, player_type, index):
         super(Relay, self).__init__(player_type, index, 'r')
 
     def updateMoves(self):
         """
         Method to update the moves of the relay.
-        Method makes a banned_moves list to keep track of the locations the relay cannot move to.
-        """
-        moves = set()
-        directions = [-1, 0, 1]
-        backwards = -1 if self.player == 'lower' else 1
-        # If promoted the relay moves like the shield.
-        if not self.isPromote:
-            banned_moves = [(self.col + 1, self.row), (self.col - 1, self.row), (self.col, self.row + backwards)]
-            for i in directions:
-                for j in directions:
-                    if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j) or \
-                            (self.col + i, self.row + j) in banned_moves:
-                        continue
-                    moves.add((self.col + i, self.row + j))
-        else:
-            banned_moves = [(self.col + 1, self.row + backwards), (self.col - 1, self.row + backwards)]
-            for i in directions:
-                for j in directions:
-                    if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j) or \
-                            (self.col + i, self.row + j) in banned_moves:
-                        continue
-                    moves.add((self.col + i, self.row + j))
-        self.moves = list(moves)
+        The move set only depends on the square, player and promotion, so it is read from the precomputed step table.
+        If promoted the relay moves like the shield.
+        """
+        attacks = STEP_ATTACKS[('r', self.player, self.isPromote)][self.col * BOARD_SIZE + self.row]
+        self.setMoveMask(attacks)
 
     def getMoves(self):
         return self.moves
@@ -370,32 +308,20 @@ class Preview(Piece):
     """
     Class representing a preview piece object.
     """
+    __slots__ = ()
+    type_code = PREVIEW
+
     def __init__(self, player_type, index):
         super(Preview, self).__init__(player_type, index, 'p')
 
     def updateMoves(self):
         """
-         Method to update the moves of the preview.
-        Method makes a banned_moves list to keep track of the locations the preview cannot move to.
-        """
-        # If promoted, the preview moves like the box shield peice.
-        if self.isPromote:
-            moves = set()
-            directions = [-1, 0, 1]
-            backwards = -1 if self.player == 'lower' else 1
-            banned_moves = [(self.col + 1, self.row + backwards), (self.col - 1, self.row + backwards)]
-            for i in directions:
-                for j in directions:
-                    if i == j == 0 or not checkBounds(self.col + i) or not checkBounds(self.row + j) or \
-                            (self.col + i, self.row + j) in banned_moves:
-                        continue
-                    moves.add((self.col + i, self.row + j))
-            self.moves = list(moves)
-        else:
-            # if not promoted preview can only move one square ahead.
-            forward = 1 if self.player == 'lower' else -1
-            if self.row + forward < BOARD_SIZE:
-                self.moves = [(self.col, self.row + forward)]
+        Method to update the moves of the preview.
+        The move set only depends on the square, player and promotion, so it is read from the precomputed step table.
+        If not promoted preview can only move one square ahead, if promoted it moves like the shield.
+        """
+        attacks = STEP_ATTACKS[('p', self.player, self.isPromote)][self.col * BOARD_SIZE + self.row]
+        self.setMoveMask(attacks)
 
     def getMoves(self):
         return self.moves
@@ -408,3 +334,13 @@ class Preview(Piece):
         self.updateMoves()
         self.name = "+" + self.name
         return True
+
+
+# PIECE_CLASSES[code] is the class of a type code.
+PIECE_CLASSES = (Drive, Notes, Governanace, Shield, Relay, Preview)
+# IS_SLIDER[code]: the piece moves along rays, so its moves depend on the pieces in the way.
+IS_SLIDER = (False, True, True, False, False, False)
+# CAN_PROMOTE[code]: the piece can be promoted.
+CAN_PROMOTE = (False, True, True, False, True, True)
+# TYPE_CODES[name] is the type code of a piece name, like 'p'.
+TYPE_CODES = {name: code for code, name in enumerate(PIECE_NAMES)}
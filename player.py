@@ -1,4 +1,115 @@
 from piece import Drive
+from utils import PIECE_NAMES
+
+# HAND_INDEX[name] is the slot of a piece type in the counts of a hand.
+HAND_INDEX = {name: i for i, name in enumerate(PIECE_NAMES)}
+
+
+class Hand:
+    """
+    Class holding the pieces a player has captured. The count of every piece type answers has, count and the
+    hand's Zobrist key in O(1); the entries are only kept to print the hand in the order the pieces were captured.
+    Iterating a hand, indexing it and len() work on the entries, like on the captured list it replaces.
+
+    Attributes:
+        counts (list): counts[HAND_INDEX[name]] is the number of held pieces of type name.
+        promoted (list): Number of held entries of every type written with a '+', which only come from input files.
+        entries (list): Entries in capture order, like 'S' or '+n'.
+    """
+    __slots__ = ('counts', 'promoted', 'entries')
+
+    def __init__(self, entries=()):
+        self.counts = [0] * len(PIECE_NAMES)
+        self.promoted = [0] * len(PIECE_NAMES)
+        self.entries = []
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry, slot=None):
+        """
+        Method to add an entry to the hand.
+
+        Args:
+            entry (str): The entry, like 'S' or '+n'.
+            slot (int): Position of the entry in capture order.
+                (default value None, the last one)
+        """
+        index = HAND_INDEX[entry[-1].lower()]
+        self.counts[index] += 1
+        if entry[0] == '+':
+            self.promoted[index] += 1
+        if slot is None:
+            self.entries.append(entry)
+        else:
+            self.entries.insert(slot, entry)
+
+    def remove(self, entry, slot=None):
+        """
+        Method to remove an entry from the hand.
+
+        Args:
+            entry (str): The entry, like 'S' or '+n'.
+            slot (int): Position of the entry in capture order.
+                (default value None, the first entry equal to entry)
+
+        Returns:
+            int: Position the entry had in capture order.
+        """
+        index = HAND_INDEX[entry[-1].lower()]
+        self.counts[index] -= 1
+        if entry[0] == '+':
+            self.promoted[index] -= 1
+        if slot is None:
+            slot = self.entries.index(entry)
+        del self.entries[slot]
+        return slot
+
+    def count(self, name):
+        """
+        Returns:
+            int: Number of held pieces of the type of name, promoted entries included.
+        """
+        return self.counts[HAND_INDEX[name[-1].lower()]]
+
+    def has(self, name):
+        """
+        Returns:
+            bool: True if a piece of type name, like 'p' or 'S', is held. False for a name that is not a piece type.
+        """
+        index = HAND_INDEX.get(name.lower())
+        return index is not None and self.counts[index] > 0
+
+    def entry(self, name):
+        """
+        Method to get the entry a drop of name takes from the hand: name itself, or its promoted name when only
+        that is held.
+
+        Args:
+            name (str): Piece name cased like the player, like 'p' or 'S'.
+        """
+        index = HAND_INDEX[name.lower()]
+        return name if self.counts[index] > self.promoted[index] else '+' + name
+
+    def types(self):
+        """
+        Returns:
+            list: The held piece types, like ['g', 'p'], in PIECE_NAMES order.
+        """
+        return [name for name, count in zip(PIECE_NAMES, self.counts) if count]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, slot):
+        return self.entries[slot]
+
+    def __repr__(self):
+        return "Hand({!r})".format(self.entries)
+
+
 class Player:
     """
     Class representing a player object.
@@ -6,7 +117,7 @@ class Player:
     Attributes:
         type: String representing the player type, lower or UPPER
         pieces: List containing all active pieces of the player.
-        captured: List containing all pieces captured by the player.
+        captured: Hand holding all pieces captured by the player.
         drive: Drive piece object of the current player.
 
     Class also has getters, setters, add and remove methods fro its various attributes as needed.
@@ -15,7 +126,7 @@ class Player:
     def __init__(self, type):
         self.type = type
         self.pieces = list()
-        self.captured = list()
+        self.captured = Hand()
         self.drive = Drive(type, (0, 0))
     def getPieces(self):
         return self.pieces
@@ -28,9 +139,9 @@ class Player:
     def getCaptured(self):
         return self.captured
     def setCaptured(self, captured_list):
-        self.captured = captured_list
+        self.captured = Hand(captured_list)
     def addCapture(self, capture):
-        self.captured.append(capture)
+        self.captured.add(capture)
     def removeCapture(self, capture):
         self.captured.remove(capture)
     def getType(self):
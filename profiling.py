@@ -0,0 +1,263 @@
+import json
+import math
+import time
+import functools
+import tracemalloc
+from game import Game
+from board import Board
+
+# Methods timed by the profiler, as (class, method name). Game.handleMove and Game.handleDrop only raise the results of
+# _applyMove and _applyDrop, which every turn goes through, so those are timed instead.
+PROFILED_METHODS = (
+    (Game, 'executeTurn'),
+    (Game, 'apply'),
+    (Game, '_applyMove'),
+    (Game, '_applyDrop'),
+    (Game, 'check_for_checks'),
+    (Game, 'getEscapeMoves'),
+    (Game, 'isPinned'),
+    (Board, 'getAllMoves'),
+    (Board, 'refreshAttacks'),
+    (Board, 'generate_legal_moves'),
+)
+# Latencies are counted in buckets of SUB_BUCKETS per power of two nanoseconds, so a percentile is within 12.5%.
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def bucket_index(ns):
+    """
+    Util method to get the latency bucket of a duration.
+    """
+    if ns < 2 * SUB_BUCKETS:
+        return ns
+    shift = ns.bit_length() - SUB_BITS - 1
+    return shift * SUB_BUCKETS + (ns >> shift)
+
+
+def bucket_limit(index):
+    """
+    Util method to get the smallest duration above a latency bucket.
+    """
+    if index < 2 * SUB_BUCKETS:
+        return index + 1
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS + 1) << shift
+
+
+class PhaseStats:
+    """
+    Class holding the measurements of one profiled method. The total time and the latencies include the profiled
+    methods it calls, the self time does not, so the self times of all methods add up to the profiled time.
+
+    Attributes:
+        calls (int): Number of calls.
+        total_ns (int): Total time of the calls in nanoseconds.
+        self_ns (int): Total time of the calls in nanoseconds, without the time of the profiled methods they call.
+        max_ns (int): Longest call in nanoseconds.
+        peak_bytes (int): Sum over the calls of the most memory a call held above what was allocated when it
+            started, see tracemalloc.
+        max_peak_bytes (int): Largest peak of a call.
+        buckets (dict): A mapping from latency bucket to its number of calls.
+    """
+    __slots__ = ('calls', 'total_ns', 'self_ns', 'max_ns', 'peak_bytes', 'max_peak_bytes', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.max_ns = 0
+        self.peak_bytes = 0
+        self.max_peak_bytes = 0
+        self.buckets = {}
+
+    def add(self, ns, self_ns, peak_bytes):
+        self.calls += 1
+        self.total_ns += ns
+        self.self_ns += self_ns
+        self.peak_bytes += peak_bytes
+        if ns > self.max_ns:
+            self.max_ns = ns
+        if peak_bytes > self.max_peak_bytes:
+            self.max_peak_bytes = peak_bytes
+        index = bucket_index(ns)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, fraction):
+        """
+        Method estimates a latency percentile.
+
+        Args:
+            fraction (float): The percentile, like 0.99.
+
+        Returns:
+            int: The latency in nanoseconds, the upper end of the bucket holding it.
+        """
+        rank = max(1, math.ceil(fraction * self.calls))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(bucket_limit(index), self.max_ns)
+        return 0
+
+    def toDict(self):
+        values = dict(calls=self.calls, total_seconds=self.total_ns / 1e9, self_seconds=self.self_ns / 1e9,
+                      mean_us=self.total_ns / self.calls / 1e3 if self.calls else 0.0)
+        for fraction in PERCENTILES:
+            values['p{:g}_us'.format(fraction * 100)] = self.percentile(fraction) / 1e3
+        values['max_us'] = self.max_ns / 1e3
+        values['mean_peak_bytes'] = self.peak_bytes / self.calls if self.calls else 0.0
+        values['max_peak_bytes'] = self.max_peak_bytes
+        return values
+
+
+class Profiler:
+    """
+    Class timing the hot methods of Game and Board. Enabling it wraps the methods of PROFILED_METHODS and disabling it
+    puts the original methods back, so nothing is measured, and nothing costs anything, while it is disabled.
+    Memory is traced with tracemalloc while it is enabled, which slows the profiled run down, so timings are only
+    comparable between profiled runs. It can be used as a context manager.
+
+    Attributes:
+        methods (tuple): The (class, method name) pairs to time.
+        phases (Mapping[str -> PhaseStats]): A mapping from method name, like 'Game.apply', to its measurements.
+        enabled (bool): If the methods are currently wrapped.
+    """
+    def __init__(self, methods=PROFILED_METHODS):
+        self.methods = methods
+        self.phases = {}
+        self.enabled = False
+        self._originals = []
+        self._calls = []
+        self._tracing = False
+
+    def enable(self):
+        if self.enabled:
+            return
+        # Memory already traced by someone else is left traced on disable.
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        for cls, name in self.methods:
+            function = cls.__dict__[name]
+            phase = self.phases.setdefault('{}.{}'.format(cls.__name__, name), PhaseStats())
+            self._originals.append((cls, name, function))
+            setattr(cls, name, _timed(function, phase, self._calls))
+        self.enabled = True
+
+    def disable(self):
+        for cls, name, function in reversed(self._originals):
+            setattr(cls, name, function)
+        self._originals = []
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        self.enabled = False
+
+    def reset(self):
+        for phase in self.phases.values():
+            phase.__init__()
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def _called(self):
+        phases = [(name, phase) for name, phase in self.phases.items() if phase.calls]
+        return sorted(phases, key=lambda item: item[1].total_ns, reverse=True)
+
+    def report(self):
+        """
+        Method formats the measurements as a table, the most expensive method first.
+
+        Returns:
+            str: The table.
+        """
+        columns = ['p{:g} us'.format(fraction * 100) for fraction in PERCENTILES]
+        lines = ["{:<26}{:>10}{:>10}{:>10}{:>10}".format('phase', 'calls', 'total s', 'self s', 'mean us')
+                 + ''.join("{:>10}".format(column) for column in columns)
+                 + "{:>10}{:>12}".format('max us', 'mean peak')]
+        for name, phase in self._called():
+            values = phase.toDict()
+            lines.append("{:<26}{:>10}{:>10.3f}{:>10.3f}{:>10.1f}".format(
+                name, phase.calls, values['total_seconds'], values['self_seconds'], values['mean_us'])
+                + ''.join("{:>10.1f}".format(values['p{:g}_us'.format(fraction * 100)]) for fraction in PERCENTILES)
+                + "{:>10.1f}{:>12.0f}".format(values['max_us'], values['mean_peak_bytes']))
+        return '\n'.join(lines)
+
+    def toJSON(self):
+        """
+        Returns:
+            str: The measurements of every called method as a JSON object.
+        """
+        return json.dumps(dict(phases={name: phase.toDict() for name, phase in self._called()}), indent=2)
+
+    def toPrometheus(self):
+        """
+        Returns:
+            str: The measurements in the Prometheus text format: per method a latency summary, a self time counter
+                and a gauge of the largest memory peak of a call.
+        """
+        lines = ["# HELP boxshogi_phase_seconds Time spent in a profiled method, including the methods it calls.",
+                 "# TYPE boxshogi_phase_seconds summary"]
+        for name, phase in self._called():
+            for fraction in PERCENTILES:
+                lines.append('boxshogi_phase_seconds{{phase="{}",quantile="{:g}"}} {:.9f}'.format(
+                    name, fraction, phase.percentile(fraction) / 1e9))
+            lines.append('boxshogi_phase_seconds_sum{{phase="{}"}} {:.9f}'.format(name, phase.total_ns / 1e9))
+            lines.append('boxshogi_phase_seconds_count{{phase="{}"}} {}'.format(name, phase.calls))
+        lines += ["# HELP boxshogi_phase_self_seconds_total Time spent in a profiled method, without the profiled methods it calls.",
+                  "# TYPE boxshogi_phase_self_seconds_total counter"]
+        for name, phase in self._called():
+            lines.append('boxshogi_phase_self_seconds_total{{phase="{}"}} {:.9f}'.format(name, phase.self_ns / 1e9))
+        lines += ["# HELP boxshogi_phase_peak_bytes Most memory a call of a profiled method held above what was allocated when it started.",
+                  "# TYPE boxshogi_phase_peak_bytes gauge"]
+        for name, phase in self._called():
+            lines.append('boxshogi_phase_peak_bytes{{phase="{}"}} {}'.format(name, phase.max_peak_bytes))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Method writes the measurements to a file, as JSON if its name ends with .json and in the Prometheus text
+        format otherwise.
+        """
+        with open(path, 'w') as f:
+            f.write(self.toJSON() if path.endswith('.json') else self.toPrometheus())
+
+
+def _timed(function, phase, calls):
+    """
+    Util method to wrap a method so that every call is added to phase.
+
+    calls holds a [children_ns, peak] pair for every profiled call in progress, the innermost last: the time of the
+    profiled calls it made, and the highest traced memory seen in it. The tracemalloc peak is reset by every call, so a
+    call hands its peak on to the call it is nested in.
+    """
+    perf_counter_ns, traced_memory, reset_peak = time.perf_counter_ns, tracemalloc.get_traced_memory, tracemalloc.reset_peak
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        current, peak = traced_memory()
+        if calls and peak > calls[-1][1]:
+            calls[-1][1] = peak
+        reset_peak()
+        frame = [0, current]
+        calls.append(frame)
+        start = perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            ns = perf_counter_ns() - start
+            calls.pop()
+            peak = max(frame[1], traced_memory()[1])
+            phase.add(ns, ns - frame[0], peak - current)
+            if calls:
+                calls[-1][0] += ns
+                if peak > calls[-1][1]:
+                    calls[-1][1] = peak
+    return wrapper
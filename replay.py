@@ -0,0 +1,148 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from game import Game
+from utils import parseTestCase
+from exceptions import FileParseException
+from result import OK, ILLEGAL
+
+# Chunks kept in flight per worker, so results stream back without queueing the whole corpus.
+CHUNKS_PER_WORKER = 4
+
+
+class GameOutcome:
+    """
+    Class holding how a replayed game ended.
+
+    Attributes:
+        path (str): Path of the replayed input file, or archive path and game number for an archive game.
+        winner (str): 'lower' or 'UPPER', None for a tie or a game that did not end.
+        reason (str): Name of the exception that ended the game, GameEnd for a checkmate or a tie,
+            the illegal move exception otherwise, FileParseException or the OSError subclass for a file
+            that could not be read. None if the moves ran out first.
+        message (str): Message of that exception, empty if the moves ran out.
+        moves (int): Number of commands played, the one ending the game with GameEnd included.
+        board (str): The final board, as printed in file mode, empty for a file that could not be read.
+    """
+    __slots__ = ('path', 'winner', 'reason', 'message', 'moves', 'board')
+
+    def __init__(self, path, winner, reason, message, moves, board):
+        self.path = path
+        self.winner = winner
+        self.reason = reason
+        self.message = message
+        self.moves = moves
+        self.board = board
+
+    def __repr__(self):
+        return "GameOutcome({!r}, winner={!r}, reason={!r}, moves={})".format(self.path, self.winner, self.reason, self.moves)
+
+
+def replay_game(path):
+    """
+    Method replays the moves of an input file and reports how the game ended, without printing anything.
+
+    Args:
+        path (str): Path of the .in file.
+
+    Returns:
+        GameOutcome: The end of the game, or the error for a file that cannot be read or set up, so one bad file
+            does not stop a run of many.
+    """
+    try:
+        file_input = parseTestCase(path)
+        game = Game('f', file_input)
+    except (FileParseException, OSError) as e:
+        return GameOutcome(path, None, type(e).__name__, str(e), 0, '')
+    return _replay(path, game, file_input['moves'])
+
+
+def replay_record(record):
+    """
+    Method replays a game of a game archive, feeding its packed moves straight to the game.
+
+    Args:
+        record (GameRecord): The game, see archive.py.
+
+    Returns:
+        GameOutcome: The end of the game, with the record's path.
+    """
+    return _replay(record.path, Game('f', record.setup()), record.moves())
+
+
+def _replay(path, game, moves):
+    """
+    Method plays moves with Game.apply() until they run out or the game ends.
+    """
+    winner, reason, message, count = None, None, '', 0
+    for move in moves:
+        result = game.apply(move)
+        if result.status == ILLEGAL:
+            winner, reason, message = game.getPreviousPlayer(), result.exceptionType().__name__, result.message
+            break
+        count += 1
+        if result.status != OK:
+            winner, reason, message = result.winner, result.exceptionType().__name__, result.message
+            break
+    return GameOutcome(path, winner, reason, message, count, repr(game.board))
+
+
+def _replayChunk(paths):
+    """
+    Worker method replaying a chunk of input files.
+    """
+    return [replay_game(path) for path in paths]
+
+
+def replay_many(paths, workers=None, ordered=True, chunksize=16):
+    """
+    Method replays many input files across a pool of worker processes and yields their outcomes.
+    Files are sent to the workers in chunks, and only a few chunks per worker are in flight at a time,
+    so any number of files can be streamed with flat memory.
+
+    Args:
+        paths (iterable): Paths of the .in files.
+        workers (int): Number of worker processes, 1 replays in this process.
+            (default value None, one per core)
+        ordered (bool): Yield the outcomes in the order of paths, otherwise as soon as each chunk completes.
+            (default value True)
+        chunksize (int): Number of files sent to a worker at once.
+            (default value 16)
+
+    Yields:
+        GameOutcome: The outcome of every file.
+    """
+    if workers == 1:
+        for path in paths:
+            yield replay_game(path)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        window = workers * CHUNKS_PER_WORKER
+        pending = deque()
+        chunk = []
+        for path in paths:
+            chunk.append(path)
+            if len(chunk) == chunksize:
+                pending.append(pool.submit(_replayChunk, chunk))
+                chunk = []
+                if len(pending) >= window:
+                    yield from _collect(pending, ordered)
+        if chunk:
+            pending.append(pool.submit(_replayChunk, chunk))
+        while pending:
+            yield from _collect(pending, ordered)
+
+
+def _collect(pending, ordered):
+    """
+    Method waits for the next chunk of outcomes, the oldest one if ordered, otherwise any finished one.
+    """
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    outcomes = []
+    for future in done:
+        pending.remove(future)
+        outcomes.extend(future.result())
+    return outcomes
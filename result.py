@@ -0,0 +1,131 @@
+from exceptions import MoveException, WrongPlayerException, PositionOutofBoundsException, DropException, GameEnd
+
+# Status of an executed turn.
+OK = 0
+ILLEGAL = 1
+CHECKMATE = 2
+TIE = 3
+
+# Reason codes of an illegal turn.
+INVALID_COMMAND = 1
+OUT_OF_BOUNDS = 2
+INVALID_SQUARE = 3
+NO_PIECE = 4
+WRONG_PLAYER = 5
+UNREACHABLE = 6
+PINNED = 7
+OWN_DESTINATION = 8
+ALREADY_PROMOTED = 9
+CANNOT_PROMOTE = 10
+NO_PROMOTION = 11
+DROP_PROMOTE = 12
+NOT_CAPTURED = 13
+PREVIEW_COLUMN = 14
+PREVIEW_PROMOTION = 15
+OCCUPIED_DROP = 16
+PREVIEW_MATE = 17
+
+# REASONS[reason] is the exception the command line interface raises for an illegal turn, and its message format.
+REASONS = {
+    INVALID_COMMAND: (MoveException, "Command does not have a valid move"),
+    OUT_OF_BOUNDS: (MoveException, "Either origin or destination is out of bounds"),
+    INVALID_SQUARE: (PositionOutofBoundsException, "Invalid location, square {} does not exist"),
+    NO_PIECE: (MoveException, "No piece at origin square {}"),
+    WRONG_PLAYER: (WrongPlayerException, "You tried to move the other player's piece."),
+    UNREACHABLE: (MoveException, "You tried to move a piece to a location it cant reach on this turn."),
+    PINNED: (MoveException, "You tried to move a pinned piece."),
+    OWN_DESTINATION: (MoveException, "Both origin and destination is owned by you"),
+    ALREADY_PROMOTED: (MoveException, "You tried to promote a piece that is already promoted."),
+    CANNOT_PROMOTE: (MoveException, "You tired to promote a piece that cannot be promoted."),
+    NO_PROMOTION: (MoveException, "You added in the promote flag when the move {} to {} does not have a promotion"),
+    DROP_PROMOTE: (DropException, "You tried to promote a piece when dropping it."),
+    NOT_CAPTURED: (DropException, "You tried to drop a piece you have not captured."),
+    PREVIEW_COLUMN: (DropException, "Tried to drop a preview piece into a column with another preview."),
+    PREVIEW_PROMOTION: (DropException, "You tried to drop a preview ont a spot that results in promotion."),
+    OCCUPIED_DROP: (DropException, ""),
+    PREVIEW_MATE: (DropException, "Cannot drop a preview piece into a checkmate."),
+}
+
+
+class MoveResult:
+    """
+    Class holding the outcome of a turn executed with Game.apply(). The message is only formatted when it is read,
+    so rejecting a move costs no string work.
+
+    Attributes:
+        status (int): OK, ILLEGAL, CHECKMATE or TIE.
+        reason (int): Reason code of an illegal turn, None otherwise.
+        winner (str): The player who won by checkmate, None otherwise.
+        args (tuple): Values filled into the reason's message, like the origin square.
+    """
+    __slots__ = ('status', 'reason', 'winner', 'args')
+
+    def __init__(self, status, reason=None, winner=None, args=()):
+        self.status = status
+        self.reason = reason
+        self.winner = winner
+        self.args = args
+
+    @property
+    def ok(self):
+        return self.status == OK
+
+    @property
+    def message(self):
+        """
+        Returns:
+            str: The message the command line interface prints for this result, empty for OK.
+        """
+        if self.status == ILLEGAL:
+            return REASONS[self.reason][1].format(*self.args)
+        if self.status == CHECKMATE:
+            return "{} player wins.  Checkmate.".format(self.winner)
+        if self.status == TIE:
+            return "Tie game.  Too many moves."
+        return ""
+
+    def exceptionType(self):
+        """
+        Returns:
+            type: The exception raising this result would use, None for OK.
+        """
+        if self.status == ILLEGAL:
+            return REASONS[self.reason][0]
+        if self.status in (CHECKMATE, TIE):
+            return GameEnd
+        return None
+
+    def exception(self):
+        """
+        Method builds the exception that executeTurn() raises for this result.
+
+        Returns:
+            Exception: The exception, None for OK.
+        """
+        exception_type = self.exceptionType()
+        return None if exception_type is None else exception_type(self.message)
+
+    def __repr__(self):
+        return "MoveResult(status={}, reason={}, winner={!r})".format(self.status, self.reason, self.winner)
+
+
+def illegal(reason, *args):
+    """
+    Util method to get the result of an illegal turn. Results without message arguments are shared.
+
+    Args:
+        reason (int): Reason code.
+        args: Values filled into the reason's message.
+
+    Returns:
+        MoveResult: The ILLEGAL result.
+    """
+    if args:
+        return MoveResult(ILLEGAL, reason, args=args)
+    return ILLEGAL_RESULTS[reason]
+
+
+RESULT_OK = MoveResult(OK)
+RESULT_TIE = MoveResult(TIE)
+CHECKMATE_RESULTS = {player: MoveResult(CHECKMATE, winner=player) for player in ('lower', 'UPPER')}
+ILLEGAL_RESULTS = {reason: MoveResult(ILLEGAL, reason) for reason in REASONS}
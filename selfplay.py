@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from game import Game
+from engine import Engine, PIECE_VALUES
+from fen import FEN_START, parse_fen
+from bitboard import square_to_index
+from utils import index_to_location
+from archive import writeArchive
+from gamefile import readGame, readGames
+from replay import CHUNKS_PER_WORKER
+from piece import PREVIEW
+from move import move_to_string, move_dest, move_origin, is_drop, is_promote, PROMOTE_FLAG
+from result import OK, ILLEGAL
+from mate import plies_left
+
+# Games sent to a worker process at once.
+CHUNK_GAMES = 8
+# Transposition table size of a search policy. The table is cleared before every game, so it is kept small.
+POLICY_HASH_MB = 1
+# Depth of a search policy given as 'search' without a depth.
+DEFAULT_SEARCH_DEPTH = 2
+
+
+class RandomPolicy:
+    """
+    Policy playing a uniformly random legal move.
+    """
+    def newGame(self):
+        pass
+
+    def choose(self, board, moves, rng, plies_left):
+        return rng.choice(moves)
+
+
+class GreedyPolicy:
+    """
+    Policy capturing the most valuable piece it can, and playing a random legal move when it cannot capture.
+    """
+    def newGame(self):
+        pass
+
+    def choose(self, board, moves, rng, plies_left):
+        squares = board.position.squares
+        best, best_value = [], 0
+        for move in moves:
+            victim = None if is_drop(move) else squares[move_dest(move)]
+            if victim is None:
+                continue
+            value = PIECE_VALUES[(victim.name[-1], victim.isPromote)]
+            if value > best_value:
+                best, best_value = [move], value
+            elif value == best_value:
+                best.append(move)
+        return rng.choice(best or moves)
+
+
+class SearchPolicy:
+    """
+    Policy playing the best move of a fixed depth engine search. Searches have no time limit and the
+    transposition table is cleared before every game, so a game does not depend on the games played before it.
+    Like engine play, the search scores the lines running past the turn limit as ties.
+
+    Attributes:
+        engine (Engine): The engine searching the moves.
+    """
+    def __init__(self, depth):
+        self.engine = Engine(max_depth=depth, hash_mb=POLICY_HASH_MB)
+
+    def newGame(self):
+        self.engine.table.clear()
+
+    def choose(self, board, moves, rng, plies_left):
+        return self.engine.search(board, moves, plies_left).move
+
+
+def make_policy(spec):
+    """
+    Util method to build a policy from its name.
+
+    Args:
+        spec (str): 'random', 'greedy', or 'search' optionally followed by the depth, like 'search:3'.
+
+    Returns:
+        The policy, with newGame() and choose(board, moves, rng, plies_left) methods, plies_left being the
+            plies the game may still last, see mate.plies_left.
+
+    Raises:
+        ValueError: If spec is not a policy.
+    """
+    name, _, depth = spec.partition(':')
+    if name == 'random' and not depth:
+        return RandomPolicy()
+    if name == 'greedy' and not depth:
+        return GreedyPolicy()
+    if name == 'search' and (not depth or depth.isdigit() and int(depth) > 0):
+        return SearchPolicy(int(depth) if depth else DEFAULT_SEARCH_DEPTH)
+    raise ValueError("Unknown policy: {}".format(spec))
+
+
+def escape_moves(game):
+    """
+    Util method to get the legal moves out of check that are in the game's escape list, with the command of each.
+    A preview reaching its promotion row promotes on its own, so its promoting move is listed without the promote
+    flag; the promoting moves of other pieces are not in the list. Escapes of the list that leave the drive attacked
+    on the board are left out.
+
+    Args:
+        game (Game): Game object that contains the current game state, its current player in check.
+
+    Returns:
+        dict: A mapping from every packed move to its command in the escape list.
+    """
+    squares = game.board.position.squares
+    available = set(game.get_check_moves()[1])
+    moves = {}
+    for move in game.board.generate_legal_moves():
+        if is_promote(move) and squares[move_origin(move)].type_code == PREVIEW:
+            command = move_to_string(move & ~PROMOTE_FLAG)
+        else:
+            command = move_to_string(move)
+        if command in available:
+            moves[move] = command
+    return moves
+
+
+def available_moves(game):
+    """
+    Util method to get the packed moves the current player may play. A player in check is limited to the
+    game's available moves out of check, like in interactive mode, see escape_moves().
+
+    Args:
+        game (Game): Game object that contains the current game state.
+
+    Returns:
+        list: The packed moves.
+    """
+    if game.isPlayerinCheck():
+        return list(escape_moves(game))
+    return game.board.generate_legal_moves()
+
+
+def standard_setup():
+    """
+    Util method to get the initial position of interactive mode as a setup dict.
+
+    Returns:
+        dict: name, initialPieces, upperCaptures and lowerCaptures.
+    """
+    placement = parse_fen(FEN_START)[0]
+    pieces = [dict(piece=name, position=index_to_location(square_to_index(sq))) for sq, name in placement]
+    return dict(name='start', initialPieces=pieces, upperCaptures=[], lowerCaptures=[])
+
+
+def load_setups(source):
+    """
+    Util method to read the initial positions of every .in file of a directory, or of every game of a multi game
+    file. The moves of the games are not played.
+
+    Args:
+        source (str): Directory or multi game file to read.
+
+    Returns:
+        list: The setup dicts, see standard_setup().
+    """
+    if os.path.isfile(source):
+        games = readGames(source)
+    else:
+        names = sorted(name for name in os.listdir(source) if name.endswith('.in'))
+        games = (dict(readGame(os.path.join(source, name)), name=name[:-len('.in')]) for name in names)
+    setups = []
+    for file_input in games:
+        # Reading the moves to the end closes a single game file and moves a multi game file on to the next game.
+        for _ in file_input.pop('moves'):
+            pass
+        setups.append(file_input)
+    return setups
+
+
+def play_game(index, seed, setup, lower, upper):
+    """
+    Method plays one self play game. The game only depends on its arguments: the random generator is seeded
+    with seed and index, and moves are chosen from the legal moves in generation order.
+
+    Args:
+        index (int): Number of the game.
+        seed (int): Seed of the run.
+        setup (dict): Initial position, see standard_setup().
+        lower: Policy playing lower, see make_policy().
+        upper: Policy playing UPPER.
+
+    Returns:
+        tuple: The file_input dict of the game, with the moves as commands, and its statistics dict.
+    """
+    rng = random.Random('{}:{}'.format(seed, index))
+    game = Game('f', setup)
+    policies = {'lower': lower, 'UPPER': upper}
+    lower.newGame()
+    upper.newGame()
+    commands = []
+    stats = dict(game=index, start=setup.get('name', ''), result=None, winner=None,
+                 plies=0, captures=0, drops=0, promotions=0, checks=0)
+    while True:
+        player = game.getCurrentPlayer()
+        moves = available_moves(game)
+        if not moves:
+            stats['result'], stats['winner'] = 'nomove', game.getPreviousPlayer()
+            break
+        move = policies[player].choose(game.board, moves, rng, plies_left(game))
+        capture = not is_drop(move) and game.board.position.squares[move_dest(move)] is not None
+        result = game.apply(move)
+        if result.status == ILLEGAL:
+            stats['result'], stats['winner'] = 'illegal', game.getPreviousPlayer()
+            break
+        commands.append(move_to_string(move))
+        stats['captures'] += capture
+        stats['drops'] += bool(is_drop(move))
+        stats['promotions'] += bool(is_promote(move))
+        if result.status != OK:
+            stats['result'] = 'checkmate' if result.winner else 'tie'
+            stats['winner'] = result.winner
+            break
+        stats['checks'] += game.isPlayerinCheck()
+    stats['plies'] = len(commands)
+    file_input = dict(initialPieces=setup['initialPieces'], upperCaptures=setup['upperCaptures'],
+                      lowerCaptures=setup['lowerCaptures'], moves=commands)
+    return file_input, stats
+
+
+# Policies of a worker process, built once per process and reused by every game.
+_policies = {}
+# Initial positions of a worker process, sent once when the process starts.
+_setups = []
+
+
+def _policy(spec):
+    if spec not in _policies:
+        _policies[spec] = make_policy(spec)
+    return _policies[spec]
+
+
+def _initWorker(setups):
+    _setups[:] = setups
+
+
+def _playChunk(first, count, seed, lower, upper, swap):
+    """
+    Worker method playing games first to first + count - 1.
+    """
+    games = []
+    for index in range(first, first + count):
+        lower_spec, upper_spec = (upper, lower) if swap and index % 2 else (lower, upper)
+        setup = _setups[index % len(_setups)]
+        file_input, stats = play_game(index, seed, setup, _policy(lower_spec), _policy(upper_spec))
+        stats['lower'], stats['UPPER'] = lower_spec, upper_spec
+        games.append((file_input, stats))
+    return games
+
+
+def selfplay_games(num_games, lower='random', upper='random', seed=0, setups=None, swap=False, workers=1):
+    """
+    Method plays self play games on a pool of worker processes and yields them in game order.
+    The games of a seed are the same whatever the number of workers.
+
+    Args:
+        num_games (int): Number of games to play.
+        lower (str): Policy of lower, see make_policy().
+            (default value 'random')
+        upper (str): Policy of UPPER.
+            (default value 'random')
+        seed (int): Seed of the run.
+            (default value 0)
+        setups (list): Initial positions, game n starts from setups[n % len(setups)].
+            (default value None, the initial position of interactive mode)
+        swap (bool): Swap the policies every other game, so each one plays both sides.
+            (default value False)
+        workers (int): Number of worker processes, 1 plays in this process.
+            (default value 1)
+
+    Yields:
+        tuple: The file_input dict and the statistics dict of every game.
+    """
+    make_policy(lower)
+    make_policy(upper)
+    setups = setups or [standard_setup()]
+    chunks = ((first, min(CHUNK_GAMES, num_games - first)) for first in range(0, num_games, CHUNK_GAMES))
+    if workers <= 1:
+        _initWorker(setups)
+        for first, count in chunks:
+            yield from _playChunk(first, count, seed, lower, upper, swap)
+        return
+    with ProcessPoolExecutor(workers, initializer=_initWorker, initargs=(setups,)) as pool:
+        window = workers * CHUNKS_PER_WORKER
+        pending = deque()
+        for first, count in chunks:
+            pending.append(pool.submit(_playChunk, first, count, seed, lower, upper, swap))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def runSelfPlay(num_games, lower, upper, seed=0, setups=None, swap=False, workers=1, path=None):
+    """
+    Method plays self play games and streams them to a game archive, with one JSON line of statistics per game
+    in a sibling .stats file, then prints a summary.
+
+    Args:
+        num_games (int): Number of games to play.
+        lower (str): Policy of lower, see make_policy().
+        upper (str): Policy of UPPER.
+        seed (int): Seed of the run.
+            (default value 0)
+        setups (list): Initial positions, see selfplay_games().
+            (default value None)
+        swap (bool): Swap the policies every other game.
+            (default value False)
+        workers (int): Number of worker processes.
+            (default value 1)
+        path (str): Path of the archive file, None to only print the summary.
+            (default value None)
+    """
+    start = time.perf_counter()
+    wins = {'lower': 0, 'UPPER': 0, None: 0}
+    plies = 0
+    stats_file = open(path + '.stats', 'w') if path else None
+
+    def games():
+        nonlocal plies
+        for file_input, stats in selfplay_games(num_games, lower, upper, seed, setups, swap, workers):
+            wins[stats['winner']] += 1
+            plies += stats['plies']
+            if stats_file:
+                stats_file.write(json.dumps(stats) + '\n')
+            yield file_input
+
+    try:
+        if path:
+            writeArchive(path, games())
+        else:
+            for _ in games():
+                pass
+    finally:
+        if stats_file:
+            stats_file.close()
+    elapsed = time.perf_counter() - start
+    print("{} games: lower {}, UPPER {}, no winner {}, {:.1f} plies per game".format(
+        num_games, wins['lower'], wins['UPPER'], wins[None], plies / max(num_games, 1)))
+    print("{:.3f}s, {:.1f} games/s, {:.1f} games/s per worker".format(
+        elapsed, num_games / elapsed, num_games / elapsed / max(workers, 1)))
+    if path:
+        print("games written to {}, statistics to {}".format(path, path + '.stats'))
@@ -0,0 +1,284 @@
+import sys
+import time
+import signal
+import asyncio
+import itertools
+import multiprocessing
+from game import Game
+from result import OK, ILLEGAL
+
+# Line protocol. Every client line is one command:
+#   new                          start a game played from this connection, answered with "game <id>" and its board
+#   <id> move a1 a2 [promote]    play a move in game <id>
+#   <id> drop p c3               play a drop in game <id>
+#   close <id>                   end game <id>
+#   quit                         close the connection
+# The server answers with lines of the form:
+#   game <id>                    a game was started
+#   board <id> <position>        the position after a turn, see fen.py
+#   check <id> <player> <moves>  the player to move is in check, its available moves separated by ','
+#   end <id> <message>           the game is over, with the message interactive mode prints
+#   error <message>              the line could not be handled
+IDLE_TIMEOUT = 300.0
+MAX_GAMES = 10000
+# A client whose unread output grows past this many bytes is disconnected instead of slowing the server down.
+MAX_BUFFERED = 1 << 20
+
+
+class HostedGame:
+    """
+    Class holding a game hosted by the server.
+
+    Attributes:
+        game (Game): The game.
+        session (Session): The connection playing the game.
+        last_active (float): time.monotonic() of the game's last command.
+    """
+    __slots__ = ('game', 'session', 'last_active')
+
+    def __init__(self, game, session):
+        self.game = game
+        self.session = session
+        self.last_active = time.monotonic()
+
+
+class Session:
+    """
+    Class holding a client connection.
+
+    Attributes:
+        writer (StreamWriter): Stream the answers are written to, None for a session driven without a connection.
+        games (set): Ids of the games the connection plays.
+    """
+    __slots__ = ('writer', 'games')
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self.games = set()
+
+
+class GameServer:
+    """
+    Class hosting many concurrent games on one asyncio event loop.
+
+    Attributes:
+        games (Mapping[str -> HostedGame]): A mapping from game id to the hosted game.
+        idle_timeout (float): Seconds without a command after which a game is ended.
+        max_games (int): Most games hosted at a time.
+        worker (int): Number of the worker process, the prefix of every game id.
+    """
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_games=MAX_GAMES, worker=0):
+        self.games = {}
+        self.idle_timeout = idle_timeout
+        self.max_games = max_games
+        self.worker = worker
+        self._ids = itertools.count(1)
+
+    def handleLine(self, session, line):
+        """
+        Method handles one command line of a session.
+
+        Args:
+            session (Session): The session sending the line.
+            line (str): The command line.
+
+        Returns:
+            list: The answer lines.
+        """
+        words = line.split()
+        if not words:
+            return []
+        if words[0] == 'new':
+            return self.newGame(session)
+        if words[0] == 'close' and len(words) == 2:
+            hosted = self._sessionGame(session, words[1])
+            if hosted is None:
+                return ["error unknown game {}".format(words[1])]
+            return self.endGame(words[1], "Game closed.")
+        if len(words) < 2 or words[1] not in ('move', 'drop'):
+            return ["error unknown command: {}".format(line.strip())]
+        game_id = words[0]
+        hosted = self._sessionGame(session, game_id)
+        if hosted is None:
+            return ["error unknown game {}".format(game_id)]
+        hosted.last_active = time.monotonic()
+        return self.playCommand(game_id, hosted.game, ' '.join(words[1:]))
+
+    def newGame(self, session):
+        """
+        Method starts a game played by session.
+
+        Returns:
+            list: The answer lines.
+        """
+        if len(self.games) >= self.max_games:
+            return ["error the server is hosting too many games"]
+        game_id = "{}.{}".format(self.worker, next(self._ids))
+        game = Game('i')
+        self.games[game_id] = HostedGame(game, session)
+        session.games.add(game_id)
+        return ["game {}".format(game_id), "board {} {}".format(game_id, game.board.to_fen(game.num_turns))]
+
+    def playCommand(self, game_id, game, command):
+        """
+        Method plays a command in a game with the rules of interactive mode, a player in check must play one of
+        the available moves and an illegal move loses the game.
+
+        Args:
+            game_id (str): Id of the game.
+            game (Game): The game.
+            command (str): The command, like "move a1 a2".
+
+        Returns:
+            list: The answer lines.
+        """
+        if game.isPlayerinCheck() and command not in game.get_check_moves()[1]:
+            return self.endGame(game_id, "{} player wins.  Illegal move.".format(game.getPreviousPlayer()))
+        result = game.apply(command)
+        if result.status == ILLEGAL:
+            return self.endGame(game_id, "{} player wins.  Illegal move.".format(game.getPreviousPlayer()))
+        lines = ["board {} {}".format(game_id, game.board.to_fen(game.num_turns))]
+        if result.status != OK:
+            return lines + self.endGame(game_id, result.message)
+        is_check, moves = game.get_check_moves()
+        if is_check:
+            lines.append("check {} {} {}".format(game_id, game.getCurrentPlayer(), ','.join(moves)))
+        return lines
+
+    def endGame(self, game_id, message):
+        """
+        Method stops hosting a game.
+
+        Returns:
+            list: The answer lines.
+        """
+        hosted = self.games.pop(game_id)
+        hosted.session.games.discard(game_id)
+        return ["end {} {}".format(game_id, message)]
+
+    def closeSession(self, session):
+        """
+        Method ends every game of a session whose connection is gone.
+        """
+        for game_id in list(session.games):
+            self.endGame(game_id, "Connection closed.")
+
+    def reapIdle(self, now=None):
+        """
+        Method ends every game that has been idle longer than idle_timeout and tells its session.
+
+        Args:
+            now (float): The current time.monotonic().
+                (default value None, read the clock)
+        """
+        now = time.monotonic() if now is None else now
+        idle = [game_id for game_id, hosted in self.games.items() if now - hosted.last_active > self.idle_timeout]
+        for game_id in idle:
+            session = self.games[game_id].session
+            self._send(session, self.endGame(game_id, "Idle timeout."))
+
+    def _sessionGame(self, session, game_id):
+        hosted = self.games.get(game_id)
+        if hosted is None or hosted.session is not session:
+            return None
+        return hosted
+
+    def _send(self, session, lines):
+        """
+        Method queues answer lines on a session's connection, dropping the connection if the client stopped reading.
+        """
+        writer = session.writer
+        if writer is None or writer.is_closing() or not lines:
+            return
+        writer.write(('\n'.join(lines) + '\n').encode())
+        if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            writer.close()
+
+    async def handleClient(self, reader, writer):
+        """
+        Coroutine serving one connection until it sends quit or disconnects.
+        Lines are handled one at a time and the answers are drained before the next line is read,
+        so a client sending faster than it reads is slowed down to its own pace.
+        """
+        session = Session(writer)
+        try:
+            while not writer.is_closing():
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors='replace')
+                if line.strip() == 'quit':
+                    break
+                self._send(session, self.handleLine(session, line))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.closeSession(session)
+            writer.close()
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 2, 60))
+            self.reapIdle()
+
+    async def serve(self, host, port, reuse_port=False):
+        """
+        Coroutine accepting connections on host:port until cancelled.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): Port to listen on.
+            reuse_port (bool): Share the port with the other worker processes.
+                (default value False)
+        """
+        server = await asyncio.start_server(self.handleClient, host, port, reuse_port=reuse_port or None)
+        reaper = asyncio.ensure_future(self._reaper())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+
+
+def _serveWorker(host, port, worker, reuse_port, idle_timeout):
+    """
+    Worker process method running one event loop.
+    """
+    try:
+        asyncio.run(GameServer(idle_timeout, worker=worker).serve(host, port, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def runServer(port, host='127.0.0.1', workers=1, idle_timeout=IDLE_TIMEOUT):
+    """
+    Method hosts games on host:port. With several workers, every worker process runs its own event loop on the
+    same port and the kernel spreads the connections over them. A game lives in the worker of its connection.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to listen on.
+            (default value '127.0.0.1')
+        workers (int): Number of worker processes, one event loop each.
+            (default value 1)
+        idle_timeout (float): Seconds without a command after which a game is ended.
+            (default value IDLE_TIMEOUT)
+    """
+    if workers <= 1:
+        _serveWorker(host, port, 0, False, idle_timeout)
+        return
+    processes = [multiprocessing.Process(target=_serveWorker, args=(host, port, worker, True, idle_timeout))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    # A terminated server takes its workers down with it.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
@@ -0,0 +1,496 @@
+import os
+import mmap
+import time
+import struct
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utils import PIECE_NAMES, PLAYERS
+from bitboard import NUM_SQUARES, SQUARE_BIT, squares_of
+from attacks import PROMOTION_ZONE
+from piece import CAN_PROMOTE, TYPE_CODES
+from board import Board
+from move import SQUARE_LOCATIONS
+from replay import CHUNKS_PER_WORKER
+from gamefile import readGame
+from mate import puzzle_game, plies_left
+
+# A tablebase file is a header followed by one little endian 16 bit value per position index:
+#   DRAW       no side can force a mate
+#   ILLEGAL    the index is not a position, see TableIndex.setup
+#   otherwise  value - 1 is the distance to mate in plies with best play, the side to move wins when it is odd
+#              and loses when it is even (0 is checkmated, or left without a legal move)
+# The header holds the magic, the format version, the material and the number of positions, padded to HEADER_SIZE.
+MAGIC = b'BXTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8sQ')
+HEADER_SIZE = 32
+DRAW = 0
+ILLEGAL = 0xffff
+# Outcome of a probe, for the side to move.
+WIN = 1
+LOSS = -1
+# Positions generated by a worker at once. A chunk of successor lists is also the unit of the passes over the
+# successor file, so it bounds the memory of a build.
+CHUNK_POSITIONS = 1 << 14
+# Most pieces besides the drives. A table of three pieces has over a billion indices, which would take days of
+# pure Python move generation to build.
+MAX_PIECES = 2
+
+
+def parse_material(text):
+    """
+    Util method to read the pieces of a tablebase besides the drives, like 'gp' for a governance and a preview.
+    The pieces have no owner: each one may stand on the board for either player or be held in either hand.
+
+    Args:
+        text (str): Piece names.
+
+    Returns:
+        str: The names sorted in the order of PIECE_NAMES, the name of the tablebase.
+
+    Raises:
+        ValueError: If a name is not a piece, is a drive, or there are too many pieces.
+    """
+    names = text.lower()
+    if not 0 < len(names) <= MAX_PIECES or any(name not in PIECE_NAMES[1:] for name in names):
+        raise ValueError("A tablebase holds 1 to {} of the pieces {}, not {!r}".format(
+            MAX_PIECES, ''.join(PIECE_NAMES[1:]), text))
+    return ''.join(sorted(names, key=PIECE_NAMES.index))
+
+
+def material_key(board):
+    """
+    Util method to get the name of the tablebase a board's position belongs to, see parse_material.
+
+    Returns:
+        str: The names of every piece on the board or in a hand, drives excluded.
+    """
+    pieces = board.position.pieces
+    counts = [0] * len(PIECE_NAMES)
+    for player in PLAYERS:
+        for code, count in enumerate(board.players[player].captured.counts):
+            counts[code] += count
+    for code in range(1, len(PIECE_NAMES)):
+        counts[code] += bin(pieces[('lower', PIECE_NAMES[code])] | pieces[('UPPER', PIECE_NAMES[code])]).count('1')
+    return ''.join(name * count for name, count in zip(PIECE_NAMES, counts))
+
+
+class TableIndex:
+    """
+    Class numbering the positions of a tablebase. An index is mixed radix: the side to move, the squares of
+    the lower and UPPER drives, then a state for every piece of the material. A state is a square, an owner
+    and a promotion for a piece on the board, or an owner for a piece in hand. Pieces of the same type take
+    their states in ascending order, so every position has exactly one index.
+
+    Attributes:
+        material (str): The tablebase name, see parse_material.
+        state_counts (tuple): Number of states of every piece.
+        size (int): Number of indices.
+    """
+    def __init__(self, material):
+        self.material = material
+        # A piece on the board has 25 squares, 2 owners and 2 promotions if it can promote, then a hand state per owner.
+        self._promotions = tuple(2 if CAN_PROMOTE[TYPE_CODES[name]] else 1 for name in material)
+        self._board_states = tuple(len(PLAYERS) * promotions * NUM_SQUARES for promotions in self._promotions)
+        self.state_counts = tuple(board_states + len(PLAYERS) for board_states in self._board_states)
+        # (name, first piece, number of pieces) of every piece type of the material.
+        self._groups = tuple((name, material.index(name), material.count(name))
+                             for name in sorted(set(material), key=material.index))
+        self.size = len(PLAYERS) * NUM_SQUARES * NUM_SQUARES
+        for count in self.state_counts:
+            self.size *= count
+
+    def decode(self, index):
+        """
+        Method splits an index into its parts.
+
+        Returns:
+            tuple: The side to move (0 for lower), the lower drive square, the UPPER drive square and the piece states.
+        """
+        states = []
+        for count in reversed(self.state_counts):
+            index, state = divmod(index, count)
+            states.append(state)
+        states.reverse()
+        index, upper_drive = divmod(index, NUM_SQUARES)
+        side, lower_drive = divmod(index, NUM_SQUARES)
+        return side, lower_drive, upper_drive, states
+
+    def setup(self, index):
+        """
+        Method builds the setup of the position of an index. Indices whose pieces share a square, whose pieces of one
+        type are out of order, or with an unpromoted preview on its last row, which it can never reach, are not
+        positions.
+
+        Returns:
+            tuple: The setup dict, as in parseTestCase, and the side to move, or None if the index is not a position.
+        """
+        side, lower_drive, upper_drive, states = self.decode(index)
+        if lower_drive == upper_drive:
+            return None
+        occupied = SQUARE_BIT[lower_drive] | SQUARE_BIT[upper_drive]
+        pieces = [dict(piece='d', position=SQUARE_LOCATIONS[lower_drive]),
+                  dict(piece='D', position=SQUARE_LOCATIONS[upper_drive])]
+        captures = {player: [] for player in PLAYERS}
+        previous = None
+        for name, promotions, board_states, state in zip(self.material, self._promotions, self._board_states, states):
+            if previous is not None and previous[0] == name and state < previous[1]:
+                return None
+            previous = name, state
+            if state >= board_states:
+                player = PLAYERS[state - board_states]
+                captures[player].append(name if player == 'lower' else name.upper())
+                continue
+            owner, state = divmod(state, promotions * NUM_SQUARES)
+            promoted, sq = divmod(state, NUM_SQUARES)
+            player = PLAYERS[owner]
+            if occupied & SQUARE_BIT[sq] or name == 'p' and not promoted and SQUARE_BIT[sq] & PROMOTION_ZONE[player]:
+                return None
+            occupied |= SQUARE_BIT[sq]
+            text = name if player == 'lower' else name.upper()
+            pieces.append(dict(piece='+' + text if promoted else text, position=SQUARE_LOCATIONS[sq]))
+        setup = dict(initialPieces=pieces, upperCaptures=captures['UPPER'], lowerCaptures=captures['lower'])
+        return setup, PLAYERS[side]
+
+    def boardIndex(self, board):
+        """
+        Method gets the index of a board's position.
+
+        Args:
+            board (Board): The board.
+
+        Returns:
+            int: The index, None if the position does not have the tablebase's material.
+        """
+        position = board.position
+        pieces = position.pieces
+        hands = [board.players[player].captured.counts for player in PLAYERS]
+        if bin(position.occupied).count('1') - 2 + sum(map(sum, hands)) != len(self.material):
+            return None
+        index = PLAYERS.index(board.side_to_move)
+        index = index * NUM_SQUARES + pieces[('lower', 'd')].bit_length() - 1
+        index = index * NUM_SQUARES + pieces[('UPPER', 'd')].bit_length() - 1
+        for name, first, count in self._groups:
+            promotions, board_states = self._promotions[first], self._board_states[first]
+            states = []
+            for owner, player in enumerate(PLAYERS):
+                base = owner * promotions * NUM_SQUARES
+                for sq in squares_of(pieces[(player, name)]):
+                    promoted = position.promoted >> sq & 1 if promotions == 2 else 0
+                    states.append(base + promoted * NUM_SQUARES + sq)
+                states += [board_states + owner] * hands[owner][TYPE_CODES[name]]
+            if len(states) != count:
+                return None
+            states.sort()
+            state_count = self.state_counts[first]
+            for state in states:
+                index = index * state_count + state
+        return index
+
+
+class Tablebase:
+    """
+    Class reading a tablebase file. The file is memory mapped, so opening it reads nothing and a probe is
+    one index computation and one read.
+
+    Attributes:
+        material (str): The tablebase name, see parse_material.
+        index (TableIndex): Numbering of the positions.
+        values (memoryview): The value of every index, see DRAW.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the tablebase file.
+
+        Raises:
+            ValueError: If the file is not a tablebase.
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length, material, positions = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("{} is not a tablebase file".format(path))
+        self.material = material[:length].decode()
+        self.index = TableIndex(self.material)
+        if positions != self.index.size or len(self._map) != HEADER_SIZE + 2 * positions:
+            self._map.close()
+            raise ValueError("{} is truncated".format(path))
+        self.values = memoryview(self._map)[HEADER_SIZE:].cast('H')
+
+    def close(self):
+        self.values.release()
+        self._map.close()
+
+    def probe(self, board, plies_left=None):
+        """
+        Method looks up the outcome of a board's position with best play.
+
+        Args:
+            board (Board): The board, its position must have the tablebase's material.
+            plies_left (int): Plies the game may still last before it is a tie, see mate.plies_left.
+                (default value None, no limit)
+
+        Returns:
+            tuple: WIN, LOSS or DRAW for the side to move and the distance to mate in plies (0 for DRAW),
+                None if the position is not in the tablebase.
+        """
+        index = self.index.boardIndex(board)
+        if index is None:
+            return None
+        value = self.values[index]
+        if value == ILLEGAL:
+            return None
+        distance = value - 1
+        if value == DRAW or plies_left is not None and distance > plies_left:
+            # A mate the losing side can put off past the tie is no mate.
+            return DRAW, 0
+        return (WIN if distance % 2 else LOSS), distance
+
+
+def load_tablebases(paths):
+    """
+    Util method to open tablebase files.
+
+    Args:
+        paths (list): Paths of the files.
+
+    Returns:
+        dict: A mapping from material to the Tablebase.
+    """
+    tablebases = {}
+    for path in paths:
+        tablebase = Tablebase(path)
+        tablebases[tablebase.material] = tablebase
+    return tablebases
+
+
+def probe_tablebases(tablebases, board, plies_left=None):
+    """
+    Util method to look up a board's position in the tablebase of its material, when one is loaded.
+
+    Args:
+        tablebases (dict): A mapping from material to Tablebase, see load_tablebases.
+        board (Board): The board.
+        plies_left (int): Plies the game may still last, see Tablebase.probe.
+            (default value None, no limit)
+
+    Returns:
+        tuple: The outcome, see Tablebase.probe, None if no tablebase holds the position.
+    """
+    position = board.position
+    pieces = bin(position.occupied).count('1') - 2
+    if pieces > MAX_PIECES:
+        return None
+    pieces += sum(board.lower_player.captured.counts) + sum(board.upper_player.captured.counts)
+    if pieces > MAX_PIECES:
+        return None
+    tablebase = tablebases.get(material_key(board))
+    return None if tablebase is None else tablebase.probe(board, plies_left)
+
+
+# Numbering of a worker process, built once per process and reused by every chunk.
+_indices = {}
+
+
+def _generateChunk(material, first, count):
+    """
+    Worker method setting up the positions first to first + count - 1 and listing their moves.
+    Returns the initial values of the positions, ILLEGAL, 1 (no legal move) or DRAW, and their successor lists:
+    the number of successors of every position and the indices they lead to.
+    """
+    if material not in _indices:
+        _indices[material] = TableIndex(material)
+    table_index = _indices[material]
+    values = array('H', bytes(2 * count))
+    counts = array('H', bytes(2 * count))
+    successors = array(_successorType(table_index.size))
+    for i in range(count):
+        found = table_index.setup(first + i)
+        if found is None:
+            values[i] = ILLEGAL
+            continue
+        setup, side = found
+        board = Board('f', setup)
+        board.side_to_move = side
+        if board.isInCheck('UPPER' if side == 'lower' else 'lower'):
+            # The side that just moved cannot be left in check.
+            values[i] = ILLEGAL
+            continue
+        moves = board.generate_legal_moves()
+        if not moves:
+            values[i] = 1
+            continue
+        counts[i] = len(moves)
+        for move in moves:
+            undo = board.make_move(move)
+            successors.append(table_index.boardIndex(board))
+            board.unmake_move(undo)
+    return values.tobytes(), counts, successors
+
+
+def _successorType(size):
+    return 'I' if size <= 1 << 32 else 'Q'
+
+
+def _labelPass(values, path, chunk, distance):
+    """
+    Method runs one retrograde pass over the successor file, labelling the positions mated or mating in exactly
+    distance plies: a position wins in an odd distance when a move leads to a loss in distance - 1, and loses in an
+    even distance when every move leads to a win in less than distance.
+
+    Returns:
+        int: Number of positions labelled.
+    """
+    labelled = 0
+    target = distance + 1
+    typecode = _successorType(len(values))
+    with open(path, 'rb') as f:
+        for first in range(0, len(values), chunk):
+            count, total = struct.unpack('<QQ', f.read(16))
+            counts = array('H')
+            counts.fromfile(f, count)
+            successors = array(typecode)
+            successors.fromfile(f, total)
+            offset = 0
+            for i, moves in enumerate(counts):
+                if not moves:
+                    continue
+                end = offset + moves
+                if values[first + i] == DRAW:
+                    if distance % 2:
+                        if any(values[child] == distance for child in successors[offset:end]):
+                            values[first + i] = target
+                            labelled += 1
+                    elif all(values[child] % 2 == 0 and DRAW < values[child] < target
+                             for child in successors[offset:end]):
+                        values[first + i] = target
+                        labelled += 1
+                offset = end
+    return labelled
+
+
+def build_tablebase(material, path, workers=1, chunk=CHUNK_POSITIONS):
+    """
+    Method builds the tablebase of a material and writes it to a file. The moves of every position are generated
+    once, by Board.generate_legal_moves like the engine, and streamed chunk by chunk to a successor file next to the
+    output. Retrograde passes over that file then label the positions by distance to mate, shortest first, until
+    a pass labels nothing. Positions never labelled are draws. The values are written straight into the memory
+    mapped output, so memory use stays at one chunk of successors whatever the size of the table.
+
+    Args:
+        material (str): The pieces besides the drives, see parse_material.
+        path (str): Path of the tablebase file.
+        workers (int): Number of worker processes generating moves, 1 generates in this process.
+            (default value 1)
+        chunk (int): Positions per chunk.
+            (default value CHUNK_POSITIONS)
+
+    Returns:
+        dict: Number of positions won, lost, drawn and illegal for the side to move, and the longest distance to mate.
+    """
+    material = parse_material(material)
+    table_index = TableIndex(material)
+    size = table_index.size
+    successor_path = path + '.succ'
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(material), material.encode(), size).ljust(HEADER_SIZE, b'\0'))
+        f.truncate(HEADER_SIZE + 2 * size)
+    with open(path, 'r+b') as f:
+        output = mmap.mmap(f.fileno(), 0)
+    values = memoryview(output)[HEADER_SIZE:].cast('H')
+    try:
+        chunks = [(first, min(chunk, size - first)) for first in range(0, size, chunk)]
+        with open(successor_path, 'wb') as successor_file:
+            for first, (chunk_values, counts, successors) in _generateChunks(material, chunks, workers):
+                values[first:first + len(counts)] = memoryview(chunk_values).cast('H')
+                successor_file.write(struct.pack('<QQ', len(counts), len(successors)))
+                counts.tofile(successor_file)
+                successors.tofile(successor_file)
+        distance = 1
+        while _labelPass(values, successor_path, chunk, distance):
+            distance += 1
+        stats = dict(win=0, loss=0, draw=0, illegal=0, longest=0)
+        for value in values:
+            if value == ILLEGAL:
+                stats['illegal'] += 1
+            elif value == DRAW:
+                stats['draw'] += 1
+            else:
+                stats['win' if value % 2 == 0 else 'loss'] += 1
+                stats['longest'] = max(stats['longest'], value - 1)
+        output.flush()
+    finally:
+        values.release()
+        output.close()
+        if os.path.exists(successor_path):
+            os.remove(successor_path)
+    return stats
+
+
+def _generateChunks(material, chunks, workers):
+    """
+    Util method to generate the chunks of a build on a pool of worker processes and yield them in order.
+
+    Yields:
+        tuple: The first index of the chunk and the result of _generateChunk.
+    """
+    if workers <= 1:
+        for first, count in chunks:
+            yield first, _generateChunk(material, first, count)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        window = workers * CHUNKS_PER_WORKER
+        pending = deque()
+        for first, count in chunks:
+            pending.append((first, pool.submit(_generateChunk, material, first, count)))
+            if len(pending) >= window:
+                first, future = pending.popleft()
+                yield first, future.result()
+        while pending:
+            first, future = pending.popleft()
+            yield first, future.result()
+
+
+def runBuildTablebase(material, path=None, workers=1):
+    """
+    Method builds a tablebase and prints what it holds.
+
+    Args:
+        material (str): The pieces besides the drives, see parse_material.
+        path (str): Path of the tablebase file.
+            (default value None, the material followed by .bxtb)
+        workers (int): Number of worker processes.
+            (default value 1)
+    """
+    material = parse_material(material)
+    path = path or material + '.bxtb'
+    start = time.perf_counter()
+    stats = build_tablebase(material, path, workers)
+    print("tablebase {} written to {} in {:.3f}s".format(material, path, time.perf_counter() - start))
+    print("{win} won, {loss} lost, {draw} drawn for the side to move, {illegal} illegal indices, "
+          "longest mate {longest} plies".format(**stats))
+
+
+def runProbeTablebase(path, tablebases):
+    """
+    Method prints the tablebase outcome of the position after the moves of an input file.
+
+    Args:
+        path (str): Path of the .in file.
+        tablebases (dict): A mapping from material to Tablebase, see load_tablebases.
+
+    Raises:
+        ValueError: If a move of the file is illegal or ends the game.
+    """
+    game = puzzle_game(readGame(path))
+    player = game.getCurrentPlayer()
+    outcome = probe_tablebases(tablebases, game.board, plies_left(game))
+    if outcome is None:
+        print("{} is not in the tablebases".format(material_key(game.board) or 'bare drives'))
+    elif outcome[0] == DRAW:
+        print("draw for {}".format(player))
+    else:
+        print("{} for {}: mate in {} plies".format('win' if outcome[0] == WIN else 'loss', player, outcome[1]))
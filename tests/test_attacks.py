@@ -0,0 +1,73 @@
+import os
+import unittest
+from board import Board
+from game import Game
+from bitboard import SQUARE_BIT
+from utils import parseTestCase, getMove
+
+TEST_CASES = 'test_cases'
+
+
+def inputs():
+    for name in sorted(os.listdir(TEST_CASES)):
+        if name.endswith('.in'):
+            yield name, parseTestCase(os.path.join(TEST_CASES, name))
+
+
+def fresh_map(board, player, occupied=None):
+    """
+    Returns player's attack map computed from scratch, piece by piece.
+    """
+    attacks = 0
+    for sq in range(len(board.position.squares)):
+        if board.position.sides[player] & SQUARE_BIT[sq]:
+            attacks |= board.pieceMoveMask(sq, occupied)
+    return attacks
+
+
+class AttackMapTest(unittest.TestCase):
+    """
+    The incrementally refreshed attack maps must equal maps built from scratch.
+    """
+    def checkMaps(self, board, name):
+        for player in ('lower', 'UPPER'):
+            self.assertEqual(board.attackedSquares(player), fresh_map(board, player), name)
+
+    def checkTree(self, board, depth, name):
+        self.checkMaps(board, name)
+        if depth == 0:
+            return
+        for move in board.generate_legal_moves():
+            undo = board.make_move(move)
+            self.checkTree(board, depth - 1, name)
+            board.unmake_move(undo)
+            self.checkMaps(board, name)
+
+    def testMakeUnmake(self):
+        self.checkTree(Board('i'), 2, 'start')
+        for name, file_input in inputs():
+            self.checkTree(Board('f', file_input), 1, name)
+
+    def testGameTurns(self):
+        for name, file_input in inputs():
+            game = Game('f', file_input)
+            self.checkMaps(game.board, name)
+            for command in file_input['moves']:
+                try:
+                    game.executeTurn(getMove(command))
+                except Exception:
+                    break
+                self.checkMaps(game.board, name + ': ' + command)
+
+    def testOtherOccupied(self):
+        for name, file_input in inputs():
+            board = Board('f', file_input)
+            for sq in range(len(board.position.squares)):
+                # The map with one square emptied or filled, as pin and escape checks ask for.
+                occupied = board.position.occupied ^ SQUARE_BIT[sq]
+                for player in ('lower', 'UPPER'):
+                    self.assertEqual(board.attackedSquares(player, occupied), fresh_map(board, player, occupied), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
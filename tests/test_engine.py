@@ -0,0 +1,50 @@
+import unittest
+from exceptions import GameEnd
+from engine import Engine, MATE_SCORE, MATE_BOUND
+from game import Game
+from move import move_to_string
+from utils import parseTestCase, getMove
+
+
+def before_last_move(path):
+    """
+    Returns the game of an input file with every move but the last one played, and that last move.
+    """
+    file_input = parseTestCase(path)
+    game = Game('f', file_input)
+    for command in file_input['moves'][:-1]:
+        game.executeTurn(getMove(command))
+    return game, file_input['moves'][-1]
+
+
+class EngineTest(unittest.TestCase):
+    def testMateInOne(self):
+        game, _ = before_last_move('test_cases/checkmate.in')
+        fen = repr(game.board)
+        result = Engine(max_depth=3).search(game.board)
+        self.assertEqual(result.score, MATE_SCORE - 1)
+        self.assertEqual(repr(game.board), fen)
+        with self.assertRaisesRegex(GameEnd, 'Checkmate'):
+            game.executeTurn(getMove(move_to_string(result.move)))
+
+    def testRootMoves(self):
+        game, mating = before_last_move('test_cases/checkmate.in')
+        moves = {move_to_string(move): move for move in game.board.generate_legal_moves()}
+        quiet = [move for name, move in moves.items() if name.startswith('move b1')]
+        result = Engine(max_depth=2).search(game.board, quiet)
+        self.assertIn(result.move, quiet)
+        self.assertLess(abs(result.score), MATE_BOUND)
+        result = Engine(max_depth=2).search(game.board, quiet + [moves[mating]])
+        self.assertEqual(result.move, moves[mating])
+        self.assertEqual(result.score, MATE_SCORE - 1)
+
+    def testNodeLimit(self):
+        result = Engine(node_limit=500).search(Game('i').board)
+        self.assertIsNotNone(result.move)
+        self.assertGreaterEqual(result.depth, 1)
+        # The limit is exact, not rounded up to the next clock check.
+        for limit in (1, 100, 1500):
+            self.assertEqual(Engine(node_limit=limit).search(Game('i').board).nodes, limit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import copy
+import os
+import unittest
+from game import Game, EscapeMoves
+from move import move_to_string
+from utils import parseTestCase
+
+TEST_CASES = 'test_cases'
+
+
+class EscapeMovesTest(unittest.TestCase):
+    def testLazyList(self):
+        calls = []
+        moves = EscapeMoves(lambda: calls.append(1) or ['move a1 a2', 'move a1 b1'])
+        self.assertEqual(calls, [])
+        self.assertEqual(len(moves), 2)
+        self.assertIn('move a1 b1', moves)
+        self.assertEqual(moves[0], 'move a1 a2')
+        self.assertEqual(moves, ['move a1 a2', 'move a1 b1'])
+        self.assertEqual(calls, [1])
+
+    def assertSameAsEager(self, game, name):
+        is_check, moves = game.get_check_moves()
+        self.assertTrue(is_check)
+        self.assertIsInstance(moves, EscapeMoves)
+        player = game.getCurrentPlayer()
+        drive = game.board.getPlayerDrive(player)
+        # Nothing is built until the moves are read, unless the drive cannot step out of check.
+        if game.board.getDriveEscapeMask(drive):
+            self.assertIsNone(moves._moves, name)
+        eager = game.getEscapeMoves(game.board.getCheckers(player), drive)
+        self.assertEqual(list(moves), eager, name)
+        self.assertEqual(eager, sorted(eager))
+
+    def testSameAsEager(self):
+        checks = 0
+        for name in sorted(os.listdir(TEST_CASES)):
+            if not name.endswith('.in'):
+                continue
+            game = Game('f', parseTestCase(os.path.join(TEST_CASES, name)))
+            # Every checking move of the side to move is tried.
+            for move in game.board.generate_legal_moves(game.current):
+                child = copy.deepcopy(game)
+                if child.apply(move).ok and child.isPlayerinCheck():
+                    self.assertSameAsEager(child, '%s: %s' % (name, move_to_string(move)))
+                    checks += 1
+        self.assertGreater(checks, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import unittest
+from board import Board
+from fen import FEN_START, fen_key, parse_fen
+from exceptions import FileParseException
+from utils import parseTestCase
+
+TEST_CASES = 'test_cases'
+
+
+class FenTest(unittest.TestCase):
+    def testStart(self):
+        board = Board('i')
+        self.assertEqual(board.to_fen(), FEN_START)
+        self.assertEqual(fen_key(FEN_START), board.getZobristKey())
+
+    def testRoundTrip(self):
+        for name in sorted(os.listdir(TEST_CASES)):
+            if not name.endswith('.in'):
+                continue
+            board = Board('f', parseTestCase(os.path.join(TEST_CASES, name)))
+            for side in ('lower', 'UPPER'):
+                board.side_to_move = side
+                fen = board.to_fen(17)
+                copy, num_turns = Board.from_fen(fen)
+                self.assertEqual(num_turns, 17)
+                self.assertEqual(copy.to_fen(17), fen, name)
+                self.assertEqual(repr(copy), repr(board), name)
+                self.assertEqual(copy.getZobristKey(), board.getZobristKey(), name)
+                self.assertEqual(fen_key(fen), board.getZobristKey(), name)
+
+    def testPromotedHand(self):
+        self.assertEqual(parse_fen('NGRSD/4P/5/p4/dsrgn U +Pg 3')[1:], (['+P'], ['g'], 'UPPER', 3))
+
+    def testInvalid(self):
+        for fen in ('NGRSD/4P/5/p4/dsrgn', 'NGRSD/4P/5/p4/dsrgn x - 0', 'NGRSD/4P/5/p4/dsrgn l - x',
+                    'NGRSD/4P/5/p4 l - 0', 'NGRSD/4P/6/p4/dsrgn l - 0', 'NGRSD/4P/5/p4/dsrgx l - 0',
+                    'NGRSD/4P/5/p4/dsrg+ l - 0', 'NGRSD/4P/5/p4/dsrgn l q 0', 'NGRSD/4P/5/p4/dsrgn l P+ 0',
+                    # No lower drive, two lower drives, no UPPER drive.
+                    'NGRSD/4P/5/p4/1srgn l - 0', 'NGRSD/4P/5/p3d/dsrgn l - 0', 'NGRS1/4P/5/p4/dsrgn l - 0',
+                    # A promoted drive or shield, a drive in a hand, a promoted shield in a hand.
+                    'NGRS+D/4P/5/p4/dsrgn l - 0', 'NGR+SD/4P/5/p4/dsrgn l - 0', 'NGRSD/4P/5/p4/dsrgn l d 0',
+                    'NGRSD/4P/5/p4/dsrgn l +s 0'):
+            with self.assertRaises(FileParseException, msg=fen):
+                Board.from_fen(fen)
+            with self.assertRaises(FileParseException, msg=fen):
+                fen_key(fen)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from board import Board
+from game import Game
+from bitboard import square
+from move import encode_move
+from player import Hand, HAND_INDEX
+from zobrist import hand_key
+
+PROMOTED_SETUP = {
+    'initialPieces': [{'piece': 'd', 'position': 'a1'}, {'piece': '+p', 'position': 'c3'},
+                      {'piece': '+g', 'position': 'b2'}, {'piece': 'N', 'position': 'c5'},
+                      {'piece': 'D', 'position': 'e5'}],
+    'upperCaptures': [], 'lowerCaptures': [], 'moves': [],
+}
+
+
+class HandTest(unittest.TestCase):
+    def testCounts(self):
+        hand = Hand(['S', '+n', 'p', 'p'])
+        self.assertEqual(hand.count('p'), 2)
+        self.assertEqual(hand.count('+n'), 1)
+        self.assertEqual(hand.counts[HAND_INDEX['g']], 0)
+        self.assertTrue(hand.has('S') and hand.has('n'))
+        self.assertFalse(hand.has('g') or hand.has('x'))
+        self.assertEqual(hand.types(), ['n', 's', 'p'])
+        # A drop takes the plain entry while there is one, and the promoted entry otherwise.
+        self.assertEqual(hand.entry('p'), 'p')
+        self.assertEqual(hand.entry('n'), '+n')
+        self.assertEqual(list(hand), ['S', '+n', 'p', 'p'])
+        slot = hand.remove('+n')
+        self.assertEqual((slot, hand.count('n'), hand.promoted[HAND_INDEX['n']]), (1, 0, 0))
+        hand.add('+n', slot)
+        self.assertEqual((list(hand), len(hand), hand[1]), (['S', '+n', 'p', 'p'], 4, '+n'))
+
+    def testPromotedCapturesComeBackUnpromoted(self):
+        game = Game('f', PROMOTED_SETUP)
+        for command in ('move a1 a2', 'move c5 c3'):
+            self.assertTrue(game.apply(command).ok)
+        captured = game.board.getUpperPlayer().getCaptured()
+        self.assertEqual((list(captured), captured.count('P'), captured.promoted), (['P'], 1, [0] * len(HAND_INDEX)))
+        for command in ('move a2 a1', 'drop p c4'):
+            self.assertTrue(game.apply(command).ok)
+        dropped = game.board.getPiece('c4')
+        self.assertEqual((dropped.toString(), dropped.isPromote), ('P', False))
+        self.assertEqual(len(captured), 0)
+
+    def testMakeUnmake(self):
+        board = Board('f', PROMOTED_SETUP)
+        board.side_to_move = 'UPPER'
+        before = list(board.getUpperPlayer().getCaptured())
+        undo = board.make_move(encode_move(square((2, 4)), square((2, 2))))
+        hand = board.getUpperPlayer().getCaptured()
+        self.assertEqual((list(hand), hand.count('P')), (['P'], 1))
+        self.assertEqual(board.hand_key, hand_key('lower', board.getLowerPlayer().getCaptured()) ^ hand_key('UPPER', hand))
+        board.unmake_move(undo)
+        self.assertEqual((list(hand), hand.count('P')), (before, 0))
+        self.assertEqual(board.getZobristKey(), board.computeZobristKey())
+
+
+if __name__ == '__main__':
+    unittest.main()
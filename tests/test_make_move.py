@@ -0,0 +1,97 @@
+import os
+import unittest
+from board import Board
+from bitboard import square
+from move import encode_move, encode_drop
+from utils import parseTestCase
+
+TEST_CASES = 'test_cases'
+
+
+def setups():
+    """
+    Yields the initial board of interactive mode and the setup of every input file.
+    """
+    yield 'start', Board('i')
+    for name in sorted(os.listdir(TEST_CASES)):
+        if name.endswith('.in'):
+            yield name, Board('f', parseTestCase(os.path.join(TEST_CASES, name)))
+
+
+def snapshot(board):
+    """
+    Returns everything make_move changes: the bitboards, the square contents, the piece lists and the hands.
+    """
+    position = board.position
+    pieces = [(piece.name, piece.player, piece.getIndex(), piece.isPromote) if piece else None
+              for piece in position.squares]
+    players = [(list(player.getPieces()), list(player.getCaptured())) for player in board.players.values()]
+    return (board.side_to_move, position.occupied, dict(position.sides), dict(position.pieces), position.promoted,
+            pieces, players, repr(board))
+
+
+def candidate_moves(board):
+    """
+    Returns moves of the side to move, legal or not, that make_move can make: every piece move onto a square
+    without a piece of its own side or a drive, with and without the promote flag, and every drop onto an empty square.
+    """
+    position = board.position
+    player = board.players[board.side_to_move]
+    blocked = position.sides[player.type] | position.pieces[('lower', 'd')] | position.pieces[('UPPER', 'd')]
+    moves = []
+    for piece in player.getPieces():
+        origin = square(piece.getIndex())
+        for index in piece.getMoves():
+            dest = square(index)
+            if not blocked >> dest & 1:
+                moves.append(encode_move(origin, dest))
+                moves.append(encode_move(origin, dest, True))
+    for name in set(player.getCaptured()):
+        for dest in range(25):
+            if position.squares[dest] is None:
+                moves.append(encode_drop(name[-1], dest))
+    return moves
+
+
+class MakeMoveTest(unittest.TestCase):
+    def testUnmakeRestores(self):
+        count = 0
+        for name, board in setups():
+            before = snapshot(board)
+            for move in candidate_moves(board):
+                undo = board.make_move(move)
+                after = snapshot(board)
+                self.assertNotEqual(after, before, name)
+                # A reply is taken back first, then the move.
+                for reply in candidate_moves(board)[:5]:
+                    reply_undo = board.make_move(reply)
+                    board.unmake_move(reply_undo)
+                    self.assertEqual(snapshot(board), after, name)
+                board.unmake_move(undo)
+                self.assertEqual(snapshot(board), before, name)
+                count += 1
+        self.assertGreater(count, 500)
+
+    def testCaptureAndDrop(self):
+        board = Board('i')
+        before = snapshot(board)
+        # lower's preview walks from a2 to a4 and takes UPPER's notes on a5, which lower drops on c3.
+        moves = [encode_move(square((0, 1)), square((0, 2))), encode_move(square((0, 2)), square((0, 3))),
+                 encode_move(square((0, 3)), square((0, 4))), encode_drop('n', square((2, 2)))]
+        undos = []
+        for move in moves:
+            board.side_to_move = 'lower'
+            undos.append(board.make_move(move))
+            if len(undos) == 3:
+                self.assertEqual(list(board.lower_player.getCaptured()), ['n'])
+                self.assertNotIn((0, 4), [piece.getIndex() for piece in board.upper_player.getPieces()])
+        self.assertEqual(list(board.lower_player.getCaptured()), [])
+        self.assertEqual(board.position.squares[square((2, 2))].toString(), 'n')
+        for undo in reversed(undos):
+            board.side_to_move = 'UPPER'
+            board.unmake_move(undo)
+        self.assertEqual(snapshot(board), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from mate import MateSolver, MATE, NO_MATE, UNKNOWN, puzzle_game, solve_game
+from gamefile import readGame
+from move import move_to_string
+from result import OK, CHECKMATE
+
+# After its moves, lower mates in 2 with drops: drop n c4, drop n d5, drop r e4.
+MATE_IN_2 = 'test_cases/capture.in'
+
+
+class MateSolverTest(unittest.TestCase):
+    def setUp(self):
+        self.solver = MateSolver(hash_mb=1)
+
+    def testMateIn2(self):
+        result = solve_game(readGame(MATE_IN_2), 3, self.solver)
+        self.assertEqual((result.status, result.player, result.moves), (MATE, 'lower', 2))
+        self.assertEqual([move_to_string(move) for move in result.line], ['drop n c4', 'drop n d5', 'drop r e4'])
+        # Playing the line through Game ends the game with lower's checkmate.
+        game = puzzle_game(readGame(MATE_IN_2))
+        for move in result.line[:-1]:
+            self.assertEqual(game.apply(move).status, OK)
+        last = game.apply(result.line[-1])
+        self.assertEqual((last.status, last.winner), (CHECKMATE, 'lower'))
+
+    def testNoShorterMate(self):
+        result = solve_game(readGame(MATE_IN_2), 1, self.solver)
+        self.assertEqual((result.status, result.moves), (NO_MATE, 1))
+
+    def testNodeLimit(self):
+        result = solve_game(readGame(MATE_IN_2), 3, MateSolver(node_limit=10, hash_mb=1))
+        self.assertEqual(result.status, UNKNOWN)
+
+
+if __name__ == '__main__':
+    unittest.main()
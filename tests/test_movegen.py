@@ -0,0 +1,90 @@
+import copy
+import os
+import unittest
+from exceptions import GameEnd
+from game import Game
+from move import move_to_string
+from utils import parseTestCase, getMove, index_to_location
+
+TEST_CASES = 'test_cases'
+
+
+def games():
+    """
+    Yields the interactive game and every input file's game, before and after each of its first moves.
+    """
+    yield 'start', Game('i')
+    for name in sorted(os.listdir(TEST_CASES)):
+        if name.endswith('.in'):
+            file_input = parseTestCase(os.path.join(TEST_CASES, name))
+            game = Game('f', file_input)
+            yield name, game
+            for command in file_input['moves'][:2]:
+                try:
+                    game.executeTurn(getMove(command))
+                except Exception:
+                    break
+                yield name + ' + ' + command, copy.deepcopy(game)
+
+
+def accepts(game, command):
+    """
+    Returns whether game takes command as a legal move; a move that ends the game counts as legal.
+    """
+    game = copy.deepcopy(game)
+    try:
+        game.executeTurn(getMove(command))
+    except GameEnd:
+        return True
+    except Exception:
+        return False
+    return True
+
+
+def board_moves(game):
+    """
+    Returns every move command, with and without promote, from a square of the side to move.
+    """
+    player = game.board.players[game.current]
+    locations = [index_to_location((col, row)) for col in range(5) for row in range(5)]
+    commands = []
+    for piece in player.getPieces():
+        origin = index_to_location(piece.getIndex())
+        for dest in locations:
+            if dest != origin:
+                commands.append('move %s %s' % (origin, dest))
+                commands.append('move %s %s promote' % (origin, dest))
+    return commands
+
+
+class MoveGenerationTest(unittest.TestCase):
+    def testGeneratedMovesAreLegal(self):
+        count = 0
+        for name, game in games():
+            for move in game.board.generate_legal_moves(game.current):
+                self.assertTrue(accepts(game, move_to_string(move)), '%s: %s' % (name, move_to_string(move)))
+                count += 1
+        self.assertGreater(count, 1000)
+
+    def testLegalBoardMovesAreGenerated(self):
+        for name, game in games():
+            generated = {move_to_string(move) for move in game.board.generate_legal_moves(game.current)}
+            for command in board_moves(game):
+                # Game promotes a preview reaching the far row by itself; the generator only emits the promotion.
+                if accepts(game, command) and command + ' promote' not in generated:
+                    self.assertIn(command, generated, name)
+
+    def testSupportedDriveMoves(self):
+        # lower's notes on b1 lends the drive on b2 its moves, and UPPER's notes on d5 controls d2.
+        pieces = [dict(piece='d', position='b2'), dict(piece='n', position='b1'),
+                  dict(piece='D', position='e5'), dict(piece='N', position='d5')]
+        game = Game('f', dict(initialPieces=pieces, upperCaptures=[], lowerCaptures=[]))
+        generated = {move_to_string(move) for move in game.board.generate_legal_moves(game.current)}
+        self.assertTrue(accepts(game, 'move b2 c2'))
+        self.assertIn('move b2 c2', generated)
+        self.assertFalse(accepts(game, 'move b2 d2'))
+        self.assertNotIn('move b2 d2', generated)
+
+
+if __name__ == '__main__':
+    unittest.main()
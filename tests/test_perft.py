@@ -0,0 +1,43 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from board import Board
+from utils import parseTestCase
+from perft import perft, divide, runPerft, STAT_KINDS
+
+
+class PerftTest(unittest.TestCase):
+    """
+    Leaf node counts of the legal move tree, which change whenever the move generator does.
+    """
+    def testStartPosition(self):
+        board = Board('i')
+        before = repr(board)
+        for depth, nodes in ((-1, 0), (0, 1), (1, 14), (2, 181), (3, 2667)):
+            self.assertEqual(perft(board, depth), nodes)
+        self.assertEqual(repr(board), before)
+
+    def testMoveKinds(self):
+        stats = dict.fromkeys(STAT_KINDS, 0)
+        self.assertEqual(perft(Board('i'), 3, stats), 2667)
+        self.assertEqual(stats, dict(moves=2310, captures=326, drops=24, promotions=40, checks=192))
+        # Every other leaf is a quiet promotion.
+        self.assertEqual(2667 - stats['moves'] - stats['captures'] - stats['drops'], 7)
+
+    def testDivide(self):
+        board = Board('f', parseTestCase('test_cases/captureDrop.in'))
+        counts = divide(board, 2)
+        self.assertEqual(sum(count for _, count in counts), 4389)
+        self.assertEqual(counts, sorted(counts))
+
+    def testReport(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            runPerft(Board('i'), 2)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('perft 2: 181 nodes'))
+        self.assertEqual([line.split(':')[0] for line in lines[1:]], list(STAT_KINDS))
+
+
+if __name__ == '__main__':
+    unittest.main()
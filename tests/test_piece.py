@@ -0,0 +1,52 @@
+import unittest
+from board import Board
+from game import Game, MOVE_UPDATES
+from piece import PIECE_CLASSES, IS_SLIDER, CAN_PROMOTE, TYPE_CODES, DRIVE, Shield, Preview
+from attacks import mask_to_moves, piece_attacks
+from bitboard import SQUARE_BIT, square
+from utils import PIECE_NAMES
+
+
+class PieceTest(unittest.TestCase):
+    def testSlots(self):
+        for piece_class in PIECE_CLASSES:
+            piece = piece_class('lower', (2, 2))
+            self.assertFalse(hasattr(piece, '__dict__'), piece_class.__name__)
+            with self.assertRaises(AttributeError):
+                piece.extra = True
+
+    def testSharedMoves(self):
+        # Pieces with the same reachable squares share one move tuple.
+        first, second = Shield('lower', (2, 2)), Shield('lower', (2, 2))
+        self.assertIs(first.moves, second.moves)
+        self.assertIs(mask_to_moves(first.move_mask), first.moves)
+        self.assertEqual(sum(SQUARE_BIT[square(index)] for index in first.moves), first.move_mask)
+        preview = Preview('lower', (0, 1))
+        preview.promote()
+        self.assertIs(preview.moves, Shield('lower', (0, 1)).moves)
+
+    def testBoardPieces(self):
+        board = Board('i')
+        for player in (board.getLowerPlayer(), board.getUpperPlayer()):
+            for piece in player.getPieces():
+                self.assertIs(piece.moves, mask_to_moves(piece.move_mask))
+
+    def testTypeCodes(self):
+        center = square((2, 2))
+        full = sum(SQUARE_BIT)
+        for code, piece_class in enumerate(PIECE_CLASSES):
+            name = PIECE_NAMES[code]
+            self.assertEqual((piece_class.type_code, TYPE_CODES[name]), (code, code))
+            piece = piece_class('lower', (2, 2))
+            self.assertEqual(piece.name, name)
+            # Only the moves of a slider change when the squares around it fill up.
+            self.assertEqual(IS_SLIDER[code], piece_attacks(name, 'lower', False, center, SQUARE_BIT[center])
+                             != piece_attacks(name, 'lower', False, center, full), name)
+            self.assertEqual(CAN_PROMOTE[code], piece.promote() is not False, name)
+            expected = Game._updateDriveMoves if code == DRIVE else \
+                Game._updateSliderMoves if IS_SLIDER[code] else Game._updateStepMoves
+            self.assertIs(MOVE_UPDATES[code], expected, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
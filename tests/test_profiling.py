@@ -0,0 +1,97 @@
+import json
+import tracemalloc
+import unittest
+from board import Board
+from game import Game
+from profiling import Profiler, PROFILED_METHODS, PhaseStats, bucket_index, bucket_limit
+from utils import parseTestCase, getMove
+
+
+def play(path):
+    file_input = parseTestCase(path)
+    game = Game('f', file_input)
+    for command in file_input['moves']:
+        game.apply(getMove(command))
+    return game
+
+
+class ProfilerTest(unittest.TestCase):
+    def testUnwrappedWhenDisabled(self):
+        originals = [cls.__dict__[name] for cls, name in PROFILED_METHODS]
+        profiler = Profiler()
+        with profiler:
+            self.assertTrue(profiler.enabled)
+            self.assertTrue(all(cls.__dict__[name] is not original
+                                for (cls, name), original in zip(PROFILED_METHODS, originals)))
+            play('test_cases/checkmate.in')
+        self.assertFalse(profiler.enabled)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual([cls.__dict__[name] for cls, name in PROFILED_METHODS], originals)
+        calls = profiler.phases['Game.apply'].calls
+        self.assertGreater(calls, 0)
+        # Nothing is counted while disabled.
+        play('test_cases/checkmate.in')
+        self.assertEqual(profiler.phases['Game.apply'].calls, calls)
+
+    def testBuckets(self):
+        for ns in list(range(200)) + [10 ** 3, 12345, 10 ** 6, 987654321]:
+            index = bucket_index(ns)
+            self.assertLessEqual(bucket_limit(index - 1), ns)
+            self.assertLess(ns, bucket_limit(index))
+            self.assertLessEqual(bucket_limit(index), ns + ns // 8 + 1)
+        phase = PhaseStats()
+        for ns in range(1, 101):
+            phase.add(ns * 1000, ns * 1000, 0)
+        self.assertAlmostEqual(phase.percentile(0.5), 50000, delta=50000 / 8)
+        self.assertAlmostEqual(phase.percentile(0.99), 99000, delta=99000 / 8)
+        self.assertEqual(phase.percentile(1.0), 100000)
+
+    def testOutputs(self):
+        with Profiler() as profiler:
+            play('test_cases/checkmate.in')
+            Board('i').generate_legal_moves()
+        phases = json.loads(profiler.toJSON())['phases']
+        self.assertEqual(phases['Game.apply']['calls'], 1)
+        self.assertEqual(phases['Board.generate_legal_moves']['calls'], 1)
+        # Methods that were never called are left out.
+        self.assertNotIn('Game._applyDrop', phases)
+        for values in phases.values():
+            self.assertLessEqual(values['p50_us'], values['p99_us'])
+            self.assertLessEqual(values['p99_us'], values['max_us'])
+            self.assertLessEqual(values['self_seconds'], values['total_seconds'])
+            self.assertLessEqual(values['mean_peak_bytes'], values['max_peak_bytes'])
+        lines = profiler.toPrometheus().splitlines()
+        self.assertIn('# TYPE boxshogi_phase_seconds summary', lines)
+        self.assertIn('boxshogi_phase_seconds_count{phase="Game.apply"} 1', lines)
+        samples = [line for line in lines if not line.startswith('#')]
+        self.assertEqual(len(samples), len(phases) * (3 + 2 + 1 + 1))
+        for line in samples:
+            name, value = line.rsplit(' ', 1)
+            float(value)
+            self.assertRegex(name, r'^boxshogi_phase_\w+\{phase="\w+\.\w+"(,quantile="0\.\d+")?\}$')
+
+    def testNestedCalls(self):
+        profiler = Profiler(methods=((Allocator, 'allocate'), (Allocator, 'run')))
+        with profiler:
+            Allocator().run()
+        # Memory freed before the call returns still counts, and a nested call hands its peak on to its caller.
+        allocate, run = profiler.phases['Allocator.allocate'], profiler.phases['Allocator.run']
+        self.assertEqual(allocate.calls, 3)
+        self.assertGreater(allocate.max_peak_bytes, 8 * 10 ** 5)
+        self.assertLess(allocate.max_peak_bytes, 2 * 8 * 10 ** 5)
+        self.assertGreaterEqual(run.max_peak_bytes, allocate.max_peak_bytes)
+        # The self time of run is its time without the calls of allocate.
+        self.assertEqual(run.self_ns, run.total_ns - allocate.total_ns)
+        self.assertEqual(allocate.self_ns, allocate.total_ns)
+
+
+class Allocator:
+    def allocate(self):
+        return len([None] * 10 ** 5)
+
+    def run(self):
+        return [self.allocate() for _ in range(3)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+import engine
+from board import Board
+from bitboard import square
+from engine import Engine, static_exchange, EXCHANGE_VALUES, MAX_QUIESCENCE_PLIES
+from move import encode_move, encode_drop, PROMOTE_FLAG
+from utils import parseTestCase, location_to_index
+
+
+def move(command):
+    origin, dest = command.split()
+    return encode_move(square(location_to_index(origin)), square(location_to_index(dest)))
+
+
+class DepthRecorder(Engine):
+    """
+    Engine remembering the deepest quiescence ply it reached.
+    """
+    max_qply = -1
+
+    def _quiescence(self, alpha, beta, ply, qply):
+        self.max_qply = max(self.max_qply, qply)
+        return super()._quiescence(alpha, beta, ply, qply)
+
+
+class StaticExchangeTest(unittest.TestCase):
+    def exchange(self, fen, command):
+        board, _ = Board.from_fen(fen)
+        return static_exchange(board, move(command))
+
+    def testExchanges(self):
+        shield, preview, notes = EXCHANGE_VALUES[('s', False)], EXCHANGE_VALUES[('p', False)], EXCHANGE_VALUES[('n', False)]
+        # An undefended shield.
+        self.assertEqual(self.exchange('4D/S4/5/5/n3d l - 0', 'a1 a4'), shield)
+        # The notes taking a shield defended by a notes is taken back.
+        self.assertEqual(self.exchange('N3D/S4/5/5/n3d l - 0', 'a1 a4'), shield - notes)
+        # A preview taking it is taken back too, which still wins material.
+        self.assertEqual(self.exchange('N3D/S4/p4/5/4d l - 0', 'a3 a4'), shield - preview)
+        # UPPER does not take the preview back, since the notes behind it would then take UPPER's notes.
+        self.assertEqual(self.exchange('N3D/S4/p4/5/n3d l - 0', 'a3 a4'), shield)
+        board, _ = Board.from_fen('N3D/S4/p4/5/n3d l s 0')
+        self.assertEqual(static_exchange(board, move('a1 a2')), 0)
+        self.assertEqual(static_exchange(board, encode_drop('s', square(location_to_index('c3')))), 0)
+        self.assertEqual(board.to_fen(), 'N3D/S4/p4/5/n3d l s 0')
+
+
+class QuiescenceTest(unittest.TestCase):
+    def noisy(self, fen, min_gain=0):
+        board, _ = Board.from_fen(fen)
+        searcher = Engine()
+        searcher._board = board
+        return searcher.noisyMoves(board.generate_noisy_moves(), min_gain=min_gain)
+
+    def testNoisyMoves(self):
+        shield = EXCHANGE_VALUES[('s', False)]
+        # A preview promotes onto an empty square, but not onto one UPPER's shield covers.
+        self.assertEqual(self.noisy('4D/p4/5/5/4d l - 0'), [move('a4 a5') | PROMOTE_FLAG])
+        self.assertEqual(self.noisy('1S2D/p4/5/5/4d l - 0'), [])
+        # A capture is skipped once it cannot win enough to reach alpha.
+        self.assertEqual(self.noisy('4D/S4/5/5/n3d l - 0', shield), [move('a1 a4')])
+        self.assertEqual(self.noisy('4D/S4/5/5/n3d l - 0', shield + 1), [])
+
+    def search(self, depth, quiescence=True):
+        board = Board('f', parseTestCase('test_cases/captureDrop.in'))
+        fen = board.to_fen()
+        searcher = DepthRecorder(max_depth=depth, quiescence=quiescence)
+        searcher.search(board)
+        self.assertEqual(board.to_fen(), fen)
+        return searcher.max_qply
+
+    def testBounded(self):
+        deepest = self.search(2)
+        self.assertLessEqual(deepest, MAX_QUIESCENCE_PLIES)
+        with mock.patch.object(engine, 'MAX_QUIESCENCE_PLIES', deepest - 1):
+            self.assertEqual(self.search(2), deepest - 1)
+        self.assertEqual(self.search(2, quiescence=False), -1)
+
+    def testFindsRecapture(self):
+        # At depth 1 the quiescence search sees UPPER's notes take the capturing notes back.
+        board, _ = Board.from_fen('N3D/S4/5/5/n3d l - 0')
+        result = Engine(max_depth=1).search(board)
+        self.assertNotEqual(result.move, move('a1 a4'))
+        result = Engine(max_depth=1, quiescence=False).search(board)
+        self.assertEqual(result.move, move('a1 a4'))
+
+
+if __name__ == '__main__':
+    unittest.main()
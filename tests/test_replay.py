@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+from archive import GameArchive, writeArchive, encodeGame
+from exceptions import FileParseException
+from replay import replay_game, replay_record, replay_many
+from utils import parseTestCase
+
+TEST_CASES = 'test_cases'
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = sorted(os.path.join(TEST_CASES, name) for name in os.listdir(TEST_CASES) if name.endswith('.in'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSameOutcome(self, outcome, expected):
+        self.assertEqual((outcome.winner, outcome.reason, outcome.message, outcome.moves, outcome.board),
+                         (expected.winner, expected.reason, expected.message, expected.moves, expected.board))
+
+    def testParallelReplay(self):
+        expected = [replay_game(path) for path in self.paths]
+        outcomes = list(replay_many(self.paths, workers=2, chunksize=4))
+        self.assertEqual([outcome.path for outcome in outcomes], self.paths)
+        for outcome, serial in zip(outcomes, expected):
+            self.assertSameOutcome(outcome, serial)
+        # Without ordering every file still comes back exactly once.
+        unordered = replay_many(self.paths, workers=2, ordered=False, chunksize=1)
+        self.assertEqual(sorted(outcome.path for outcome in unordered), self.paths)
+
+    def testArchiveReplay(self):
+        # Files with commands an archive cannot hold, like a move off the board, are left out.
+        games = []
+        for path in self.paths:
+            file_input = parseTestCase(path)
+            try:
+                encodeGame(file_input)
+            except FileParseException:
+                continue
+            games.append((path, file_input))
+        self.assertGreater(len(games), 40)
+        archive_path = os.path.join(self.directory, 'games.bxsg')
+        self.assertEqual(writeArchive(archive_path, (file_input for _, file_input in games)), len(games))
+        with GameArchive(archive_path) as archive:
+            self.assertEqual(len(archive), len(games))
+            for n, (path, file_input) in enumerate(games):
+                record = archive[n]
+                self.assertEqual(record.fileInput()['moves'], file_input['moves'])
+                self.assertSameOutcome(replay_record(record), replay_game(path))
+
+    def testUnreadableFiles(self):
+        broken = os.path.join(self.directory, 'broken.in')
+        with open(broken, 'w') as f:
+            f.write('d a1\nbogus\n')
+        missing = os.path.join(self.directory, 'missing.in')
+        paths = [self.paths[0], broken, missing, self.paths[1]]
+        outcomes = list(replay_many(paths, workers=2, chunksize=1))
+        self.assertEqual([outcome.path for outcome in outcomes], paths)
+        self.assertEqual(outcomes[1].reason, 'FileParseException')
+        self.assertEqual(outcomes[2].reason, 'FileNotFoundError')
+        self.assertSameOutcome(outcomes[3], replay_game(self.paths[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from exceptions import GameEnd
+from game import Game
+from result import (OK, ILLEGAL, CHECKMATE, TIE, REASONS, INVALID_COMMAND, OUT_OF_BOUNDS, NO_PIECE, WRONG_PLAYER,
+                    UNREACHABLE, PINNED, CANNOT_PROMOTE, NO_PROMOTION, NOT_CAPTURED, PREVIEW_COLUMN,
+                    PREVIEW_PROMOTION, OCCUPIED_DROP)
+from move import encode_move
+from bitboard import square
+from utils import parseTestCase
+
+PINNED_SETUP = {
+    'initialPieces': [{'piece': 'd', 'position': 'a1'}, {'piece': 's', 'position': 'a2'},
+                      {'piece': 'N', 'position': 'a5'}, {'piece': 'D', 'position': 'e5'}],
+    'upperCaptures': [], 'lowerCaptures': [], 'moves': [],
+}
+
+PREVIEW_SETUP = {
+    'initialPieces': [{'piece': 'd', 'position': 'a1'}, {'piece': 'p', 'position': 'b2'}, {'piece': 'D', 'position': 'e5'}],
+    'upperCaptures': [], 'lowerCaptures': ['p'], 'moves': [],
+}
+
+
+class MoveResultTest(unittest.TestCase):
+    def assertIllegal(self, game, command, reason, message):
+        board, current, turns = repr(game.board), game.current, game.num_turns
+        result = game.apply(command)
+        self.assertEqual((result.status, result.reason), (ILLEGAL, reason), command)
+        self.assertFalse(result.ok)
+        self.assertEqual(result.message, message)
+        self.assertIs(result.exceptionType(), REASONS[reason][0])
+        # An illegal turn leaves the game as it was.
+        self.assertEqual((repr(game.board), game.current, game.num_turns), (board, current, turns), command)
+        with self.assertRaises(REASONS[reason][0]) as raised:
+            game.executeTurn(command)
+        self.assertEqual(str(raised.exception), message)
+
+    def testIllegalMoves(self):
+        game = Game('i')
+        self.assertIllegal(game, 'jump a1 a2', INVALID_COMMAND, "Command does not have a valid move")
+        self.assertIllegal(game, 'move a1 f1', OUT_OF_BOUNDS, "Either origin or destination is out of bounds")
+        self.assertIllegal(game, 'move b3 b4', NO_PIECE, "No piece at origin square b3")
+        self.assertIllegal(game, 'move e5 e4', WRONG_PLAYER, "You tried to move the other player's piece.")
+        self.assertIllegal(game, 'move a2 a4', UNREACHABLE,
+                           "You tried to move a piece to a location it cant reach on this turn.")
+        self.assertIllegal(game, 'move a2 a3 promote', NO_PROMOTION,
+                           "You added in the promote flag when the move a2 to a3 does not have a promotion")
+        self.assertIllegal(game, 'move b1 b2 promote', CANNOT_PROMOTE,
+                           "You tired to promote a piece that cannot be promoted.")
+        self.assertIllegal(Game('f', PINNED_SETUP), 'move a2 b3', PINNED, "You tried to move a pinned piece.")
+
+    def testIllegalDrops(self):
+        game = Game('f', parseTestCase('test_cases/captureDrop.in'))
+        self.assertIllegal(game, 'drop p b5', PREVIEW_PROMOTION,
+                           "You tried to drop a preview ont a spot that results in promotion.")
+        self.assertIllegal(game, 'drop s c5', OCCUPIED_DROP, "")
+        self.assertIllegal(game, 'drop d c3', NOT_CAPTURED, "You tried to drop a piece you have not captured.")
+        game = Game('f', PREVIEW_SETUP)
+        self.assertIllegal(game, 'drop p b4', PREVIEW_COLUMN,
+                           "Tried to drop a preview piece into a column with another preview.")
+
+    def testLegalTurns(self):
+        game = Game('i')
+        for move in ('move a2 a3', encode_move(square((4, 3)), square((4, 2)))):
+            result = game.apply(move)
+            self.assertIs(result.status, OK)
+            self.assertTrue(result.ok)
+            self.assertEqual(result.message, "")
+            self.assertIsNone(result.exception())
+        self.assertEqual(game.board.getPiece('e3').toString(), 'P')
+
+    def testCheckmate(self):
+        game = Game('f', parseTestCase('test_cases/checkmate.in'))
+        result = game.apply('move d3 e4')
+        self.assertEqual((result.status, result.winner), (CHECKMATE, 'lower'))
+        self.assertIs(result.exceptionType(), GameEnd)
+        self.assertEqual(result.message, "lower player wins.  Checkmate.")
+
+    def testTie(self):
+        file_input = parseTestCase('test_cases/tieGame.in')
+        game = Game('f', file_input)
+        results = [game.apply(command) for command in file_input['moves']]
+        self.assertTrue(all(result.ok for result in results[:-1]))
+        self.assertEqual(results[-1].status, TIE)
+        self.assertEqual(results[-1].message, "Tie game.  Too many moves.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import copy
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from archive import GameArchive
+from game import Game
+from result import ILLEGAL
+from selfplay import runSelfPlay, escape_moves, play_game, make_policy, standard_setup
+from replay import replay_record
+from utils import parseTestCase
+
+TEST_CASES = 'test_cases'
+
+
+class SelfPlayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self, name, seed, workers):
+        path = os.path.join(self.directory, name)
+        with redirect_stdout(io.StringIO()):
+            runSelfPlay(20, 'random', 'greedy', seed=seed, swap=True, workers=workers, path=path)
+        with open(path, 'rb') as archive, open(path + '.stats') as stats:
+            return archive.read(), stats.read()
+
+    def testSameGamesForAnyJobs(self):
+        serial = self.play('serial.bxsg', 7, 1)
+        self.assertEqual(self.play('parallel.bxsg', 7, 3), serial)
+        self.assertNotEqual(self.play('other.bxsg', 8, 1), serial)
+
+    def testArchivedGamesReplay(self):
+        path = os.path.join(self.directory, 'games.bxsg')
+        self.play('games.bxsg', 3, 1)
+        with GameArchive(path) as archive:
+            self.assertEqual(len(archive), 20)
+            for n in range(len(archive)):
+                # A self play game only ends on the last move, and never with an illegal one.
+                outcome = replay_record(archive[n])
+                self.assertEqual(outcome.moves, len(archive[n].fileInput()['moves']))
+                self.assertIn(outcome.reason, (None, 'GameEnd'))
+
+    def testSearchPolicyPliesLeft(self):
+        policy = make_policy('search:1')
+        search = policy.engine.search
+        plies = []
+
+        def recordingSearch(board, root_moves=None, plies_left=None):
+            plies.append(plies_left)
+            return search(board, root_moves, plies_left)
+
+        policy.engine.search = recordingSearch
+        play_game(0, 1, standard_setup(), policy, make_policy('random'))
+        # lower moves first, with the 400 plies of a 200 turn game ahead, and searches every other ply.
+        self.assertGreater(len(plies), 1)
+        self.assertEqual(plies, [400 - 2 * n for n in range(len(plies))])
+
+    def testEscapeMoves(self):
+        checks = 0
+        for name in sorted(os.listdir(TEST_CASES)):
+            if not name.endswith('.in'):
+                continue
+            game = Game('f', parseTestCase(os.path.join(TEST_CASES, name)))
+            for move in game.board.generate_legal_moves(game.current):
+                child = copy.deepcopy(game)
+                if not child.apply(move).ok or not child.isPlayerinCheck():
+                    continue
+                checks += 1
+                board, player = child.board, child.current
+                for escape, command in escape_moves(child).items():
+                    self.assertIn(command, child.get_check_moves()[1])
+                    undo = board.make_move(escape)
+                    self.assertFalse(board.isInCheck(player), '%s: %s' % (name, command))
+                    board.unmake_move(undo)
+                    self.assertNotEqual(copy.deepcopy(child).apply(command).status, ILLEGAL, command)
+        self.assertGreater(checks, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
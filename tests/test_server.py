@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from unittest import mock
+import server
+from server import GameServer
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Drives a GameServer listening on a free localhost port through the line protocol.
+    """
+    async def asyncSetUp(self):
+        self.server = GameServer(idle_timeout=60)
+        self.closed = asyncio.Event()
+
+        async def handleClient(reader, writer):
+            try:
+                await self.server.handleClient(reader, writer)
+            finally:
+                self.closed.set()
+
+        self.listener = await asyncio.start_server(handleClient, '127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        self.addAsyncCleanup(self.disconnect, writer)
+        return reader, writer
+
+    @staticmethod
+    async def disconnect(writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    async def ask(reader, writer, line, answers=1):
+        writer.write((line + '\n').encode())
+        await writer.drain()
+        return [(await asyncio.wait_for(reader.readline(), 5)).decode().rstrip('\n') for _ in range(answers)]
+
+    async def testGame(self):
+        reader, writer = await self.connect()
+        started = await self.ask(reader, writer, 'new', 2)
+        self.assertEqual(started, ['game 0.1', 'board 0.1 NGRSD/4P/5/p4/dsrgn l - 0'])
+        self.assertEqual(await self.ask(reader, writer, '0.1 move a2 a3'), ['board 0.1 NGRSD/4P/p4/5/dsrgn U - 0'])
+        self.assertEqual(await self.ask(reader, writer, '0.1 move e4 e3'), ['board 0.1 NGRSD/5/p3P/5/dsrgn l - 1'])
+        self.assertEqual(await self.ask(reader, writer, '0.2 move a3 a4'), ['error unknown game 0.2'])
+        self.assertEqual(await self.ask(reader, writer, 'jump'), ['error unknown command: jump'])
+        # An illegal move loses the game, as in interactive mode.
+        self.assertEqual(await self.ask(reader, writer, '0.1 move a1 a5'), ['end 0.1 UPPER player wins.  Illegal move.'])
+        self.assertEqual(self.server.games, {})
+        self.assertEqual(await self.ask(reader, writer, '0.1 move a3 a4'), ['error unknown game 0.1'])
+        writer.write(b'quit\n')
+        self.assertEqual(await asyncio.wait_for(reader.read(), 5), b'')
+
+    async def testIdleReaper(self):
+        reader, writer = await self.connect()
+        await self.ask(reader, writer, 'new', 2)
+        await self.ask(reader, writer, 'new', 2)
+        await self.ask(reader, writer, '0.2 move a2 a3')
+        # Only the game idle for longer than the timeout is ended.
+        self.server.games['0.1'].last_active -= 61
+        self.server.reapIdle()
+        self.assertEqual((await asyncio.wait_for(reader.readline(), 5)).decode(), 'end 0.1 Idle timeout.\n')
+        self.assertEqual(list(self.server.games), ['0.2'])
+
+    async def testSlowReaderDisconnected(self):
+        reader, writer = await self.connect()
+        # Every line is echoed back in an error, and the client never reads them.
+        line = b'x' * 50000 + b'\n'
+
+        async def flood():
+            try:
+                for _ in range(1000):
+                    if self.closed.is_set():
+                        break
+                    writer.write(line)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            await self.closed.wait()
+
+        # The answers are drained after every line, so the write buffer stays around the transport's high water
+        # mark and the limit is lowered below it.
+        with mock.patch.object(server, 'MAX_BUFFERED', 4096):
+            await asyncio.wait_for(flood(), 10)
+        try:
+            answers = (await asyncio.wait_for(reader.read(), 10)).count(b'\n')
+        except ConnectionError:
+            answers = 0
+        self.assertLess(answers, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from board import Board
+from engine import Engine, MATE_SCORE
+from tablebase import Tablebase, build_tablebase, load_tablebases, probe_tablebases, parse_material, WIN, LOSS, DRAW, ILLEGAL
+
+
+class TablebaseTest(unittest.TestCase):
+    """
+    Builds the smallest table, the drives and a shield, once for every test.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 's.bxtb')
+        cls.stats = build_tablebase('s', cls.path)
+        cls.tablebase = Tablebase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        shutil.rmtree(cls.directory)
+
+    def positions(self, count):
+        """
+        Yields the boards of count random legal indices.
+        """
+        rng = random.Random(25)
+        index = self.tablebase.index
+        found = 0
+        while found < count:
+            i = rng.randrange(index.size)
+            position = index.setup(i)
+            if position is None or self.tablebase.values[i] == ILLEGAL:
+                continue
+            setup, side = position
+            board = Board('f', setup)
+            board.side_to_move = side
+            found += 1
+            yield i, board
+
+    def testStats(self):
+        self.assertEqual(self.stats['win'] + self.stats['loss'] + self.stats['draw'] + self.stats['illegal'],
+                         self.tablebase.index.size)
+        self.assertFalse(os.path.exists(self.path + '.succ'))
+
+    def testMaterial(self):
+        self.assertEqual(parse_material('PG'), 'gp')
+        for text in ('', 'd', 'x', 'ggr'):
+            with self.assertRaises(ValueError):
+                parse_material(text)
+
+    def testChildren(self):
+        # A won position has a move to a position lost as fast as it says, a lost one only moves to won positions.
+        for i, board in self.positions(300):
+            self.assertEqual(self.tablebase.index.boardIndex(board), i)
+            result, distance = self.tablebase.probe(board)
+            children = []
+            for move in board.generate_legal_moves():
+                undo = board.make_move(move)
+                children.append(self.tablebase.probe(board))
+                board.unmake_move(undo)
+            if result == WIN:
+                self.assertIn((LOSS, distance - 1), children)
+                self.assertFalse(any(child[0] == LOSS and child[1] < distance - 1 for child in children))
+            elif result == LOSS:
+                self.assertTrue(all(child[0] == WIN for child in children))
+                self.assertEqual(max((child[1] + 1 for child in children), default=0), distance)
+            else:
+                self.assertNotIn(LOSS, [child[0] for child in children])
+                self.assertFalse(all(child[0] == WIN for child in children))
+
+    def testTie(self):
+        for _, board in self.positions(50):
+            result, distance = self.tablebase.probe(board)
+            if result != DRAW and distance > 0:
+                self.assertEqual(self.tablebase.probe(board, distance), (result, distance))
+                self.assertEqual(self.tablebase.probe(board, distance - 1), (DRAW, 0))
+
+    def testEngine(self):
+        tablebases = load_tablebases([self.path])
+        searched = 0
+        for _, board in self.positions(20):
+            result, distance = probe_tablebases(tablebases, board)
+            if result == WIN and distance > 1:
+                engine = Engine(max_depth=2, hash_mb=1, tablebases=tablebases)
+                self.assertEqual(engine.search(board).score, MATE_SCORE - distance)
+                # The mate comes after the tie.
+                self.assertEqual(engine.search(board, plies_left=distance - 1).score, 0)
+                searched += 1
+        self.assertGreater(searched, 0)
+        self.assertIsNone(probe_tablebases(tablebases, Board('i')))
+
+
+if __name__ == '__main__':
+    unittest.main()
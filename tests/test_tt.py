@@ -0,0 +1,58 @@
+import unittest
+from tt import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, BUCKET_SLOTS
+from engine import MATE_SCORE, score_to_table, score_from_table
+from board import Board
+from move import encode_move
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(0.01)
+        self.buckets = self.table.mask + 1
+
+    def entries(self, key):
+        return sum(1 for stored in self.table.keys if stored == key)
+
+    def testStoreProbe(self):
+        key = Board('i').getZobristKey()
+        move = encode_move(3, 4)
+        self.assertIsNone(self.table.probe(key))
+        self.table.store(key, 5, BOUND_LOWER, -250, move)
+        self.assertEqual(self.table.probe(key), (5, BOUND_LOWER, -250, move))
+        self.table.store(key, 6, BOUND_UPPER, 40, None)
+        # A result without a best move keeps the move of the earlier one.
+        self.assertEqual(self.table.probe(key), (6, BOUND_UPPER, 40, move))
+
+    def testMateScores(self):
+        # A mate 3 plies below a position stored at ply 4 is a mate 7 plies below the root, and 5 below ply 2.
+        key = 12345
+        self.table.store(key, 3, BOUND_EXACT, score_to_table(MATE_SCORE - 7, 4), None)
+        score = self.table.probe(key)[2]
+        self.assertEqual(score, MATE_SCORE - 3)
+        self.assertEqual(score_from_table(score, 2), MATE_SCORE - 5)
+        self.table.store(key, 3, BOUND_EXACT, score_to_table(-MATE_SCORE + 6, 5), None)
+        self.assertEqual(score_from_table(self.table.probe(key)[2], 1), -MATE_SCORE + 2)
+        self.assertEqual(score_from_table(score_to_table(120, 9), 3), 120)
+
+    def testReplacement(self):
+        key, other = 7, 7 + self.buckets
+        self.table.store(other, 9, BOUND_EXACT, 10, None)
+        # The deeper entry of the current search keeps the depth preferred slot.
+        self.table.store(key, 2, BOUND_EXACT, 20, encode_move(1, 2))
+        self.assertEqual(self.table.probe(other)[0], 9)
+        self.assertEqual(self.table.probe(key)[0], 2)
+        self.table.newSearch()
+        # An entry of an older search is replaced, and the key is not left in the other slot of its bucket.
+        self.table.store(key, 12, BOUND_EXACT, 30, None)
+        self.assertEqual(self.table.probe(key), (12, BOUND_EXACT, 30, encode_move(1, 2)))
+        self.assertEqual(self.entries(key), 1)
+        self.assertEqual(len(self.table.keys), self.buckets * BUCKET_SLOTS)
+
+    def testClear(self):
+        self.table.store(99, 1, BOUND_EXACT, 0, None)
+        self.table.clear()
+        self.assertIsNone(self.table.probe(99))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import unittest
+from board import Board
+from exceptions import FileParseException
+from zobrist import MAX_HAND
+from game import Game
+from utils import parseTestCase, getMove
+
+TEST_CASES = 'test_cases'
+
+
+def inputs():
+    for name in sorted(os.listdir(TEST_CASES)):
+        if name.endswith('.in'):
+            yield name, parseTestCase(os.path.join(TEST_CASES, name))
+
+
+class ZobristTest(unittest.TestCase):
+    """
+    The incremental key must always equal the key computed from scratch.
+    """
+    def checkTree(self, board, depth, name):
+        key = board.getZobristKey()
+        self.assertEqual(key, board.computeZobristKey(), name)
+        if depth == 0:
+            return
+        for move in board.generate_legal_moves():
+            undo = board.make_move(move)
+            self.assertNotEqual(board.getZobristKey(), key, name)
+            self.checkTree(board, depth - 1, name)
+            board.unmake_move(undo)
+            self.assertEqual(board.getZobristKey(), key, name)
+
+    def testMakeUnmake(self):
+        self.checkTree(Board('i'), 2, 'start')
+        for name, file_input in inputs():
+            self.checkTree(Board('f', file_input), 1, name)
+
+    def testGameTurns(self):
+        for name, file_input in inputs():
+            game = Game('f', file_input)
+            for command in file_input['moves']:
+                try:
+                    game.executeTurn(getMove(command))
+                except Exception:
+                    break
+                self.assertEqual(game.board.getZobristKey(), game.board.computeZobristKey(), name)
+
+    def testTransposition(self):
+        keys = []
+        for commands in (('a2 a3', 'e4 e3', 'c1 c2', 'd5 d4'), ('c1 c2', 'd5 d4', 'a2 a3', 'e4 e3')):
+            game = Game('i')
+            for command in commands:
+                game.executeTurn(getMove('move ' + command))
+            keys.append(game.board.getZobristKey())
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], Game('i').board.getZobristKey())
+
+    def testFullHands(self):
+        setup = dict(initialPieces=[dict(piece='d', position='a1'), dict(piece='D', position='e5')],
+                     upperCaptures=[], lowerCaptures=['p'] * MAX_HAND)
+        board = Board('f', setup)
+        self.assertEqual(board.getZobristKey(), board.computeZobristKey())
+        undo = board.make_move(board.generate_legal_moves()[-1])
+        self.assertEqual(board.getZobristKey(), board.computeZobristKey())
+        board.unmake_move(undo)
+        # One more preview than the hand keys cover is refused, on the board or in a hand.
+        for pieces, captures in (([dict(piece='P', position='c3')], ['p'] * MAX_HAND), ([], ['p'] * (MAX_HAND + 1))):
+            with self.assertRaises(FileParseException):
+                Board('f', dict(setup, initialPieces=setup['initialPieces'] + pieces, lowerCaptures=captures))
+
+
+if __name__ == '__main__':
+    unittest.main()
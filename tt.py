@@ -0,0 +1,121 @@
+from array import array
+
+BOUND_EXACT = 0
+BOUND_LOWER = 1
+BOUND_UPPER = 2
+
+# Every entry is a 64 bit key and a 64 bit data word packing:
+#   bits 0-14  best move (0 when there is none, no real move packs to 0)
+#   bits 15-32 score + SCORE_OFFSET
+#   bits 33-34 bound type
+#   bits 35-41 depth
+#   bits 42-47 age of the search that stored the entry
+SCORE_OFFSET = 1 << 17
+ENTRY_BYTES = 16
+# A bucket holds a depth preferred slot followed by an always replace slot.
+BUCKET_SLOTS = 2
+MAX_AGE = 63
+
+
+class TranspositionTable:
+    """
+    Fixed size transposition table keyed by the board's Zobrist key.
+    The table is two preallocated arrays that never grow, so its memory stays at the configured cap.
+    Each bucket has a depth preferred slot, replaced by deeper searches or entries from older searches,
+    and an always replace slot that takes everything else.
+
+    Attributes:
+        keys (array): Zobrist key of every slot.
+        data (array): Packed depth, bound, score and move of every slot.
+        mask (int): Bucket index mask, the number of buckets is a power of two.
+        age (int): Age of the current search.
+    """
+    def __init__(self, size_mb=16):
+        """
+        Args:
+            size_mb (float): Memory cap of the table in megabytes.
+                (default value 16)
+        """
+        buckets = 1
+        while buckets * 2 * BUCKET_SLOTS * ENTRY_BYTES <= size_mb * (1 << 20):
+            buckets *= 2
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * buckets * BUCKET_SLOTS))
+        self.data = array('Q', bytes(8 * buckets * BUCKET_SLOTS))
+        self.age = 0
+
+    def newSearch(self):
+        """
+        Method to start a new search, older entries become the first to be replaced.
+        """
+        self.age = (self.age + 1) & MAX_AGE
+
+    def clear(self):
+        """
+        Method to empty the table without reallocating it.
+        """
+        size = len(self.keys)
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+        self.age = 0
+
+    def probe(self, key):
+        """
+        Method to look up a position.
+
+        Args:
+            key (int): Zobrist key of the position.
+
+        Returns:
+            tuple: (depth, bound, score, move) of the stored entry, None if the position is not stored.
+        """
+        slot = (key & self.mask) * BUCKET_SLOTS
+        keys = self.keys
+        if keys[slot] == key:
+            data = self.data[slot]
+        elif keys[slot + 1] == key:
+            data = self.data[slot + 1]
+        else:
+            return None
+        if not data:
+            return None
+        return data >> 35 & 0x7f, data >> 33 & 0x3, (data >> 15 & 0x3ffff) - SCORE_OFFSET, data & 0x7fff
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Method to store a search result.
+
+        Args:
+            key (int): Zobrist key of the position.
+            depth (int): Depth the position was searched to.
+            bound (int): BOUND_EXACT, BOUND_LOWER or BOUND_UPPER.
+            score (int): Score of the position.
+            move (int): Best packed move, None if there is none.
+        """
+        slot = (key & self.mask) * BUCKET_SLOTS
+        keys, data = self.keys, self.data
+        stored = data[slot]
+        if keys[slot] != key and stored and (stored >> 35 & 0x7f) > depth and (stored >> 42) == self.age:
+            # The depth preferred slot keeps its deeper entry of the current search.
+            target = slot + 1
+        else:
+            target = slot
+        # The bucket holds a key at most once, so an entry of the key in the other slot is moved to the target.
+        for old in (slot, slot + 1):
+            if keys[old] == key:
+                if not move:
+                    # Keep the best move of an earlier search of the same position.
+                    move = data[old] & 0x7fff
+                if old != target:
+                    keys[old] = data[old] = 0
+        data[target] = (move or 0) | (score + SCORE_OFFSET) << 15 | bound << 33 | min(depth, 0x7f) << 35 | self.age << 42
+        keys[target] = key
+
+    def hashfull(self):
+        """
+        Returns:
+            int: Permille of the first 1000 slots holding an entry of the current search.
+        """
+        sample = min(1000, len(self.data))
+        used = sum(1 for data in self.data[:sample] if data and data >> 42 == self.age)
+        return used * 1000 // sample
@@ -1,30 +1,27 @@
 from exceptions import PositionOutofBoundsException, MoveException
+from gamefile import readGame
 
 BOARD_SIZE = 5
+PLAYERS = ('lower', 'UPPER')
+PIECE_NAMES = ('d', 'n', 'g', 's', 'r', 'p')
 def parseTestCase(path):
     """
     Utility function to help parse test cases.
+    The file is read through gamefile.readGame and closed once the moves are read.
     :param path: Path to test case file.
     """
-    f = open(path)
-    line = f.readline()
-    initialBoardState = []
-    while line != '\n':
-        piece, position = line.strip().split(' ')
-        initialBoardState.append(dict(piece=piece, position=position))
-        line = f.readline()
-    line = f.readline().strip()
-    upperCaptures = [x for x in line[1:-1].split(' ') if x != '']
-    line = f.readline().strip()
-    lowerCaptures = [x for x in line[1:-1].split(' ') if x != '']
-    line = f.readline()
-    line = f.readline()
-    moves = []
-    while line != '':
-        moves.append(line.strip())
-        line = f.readline()
-
-    return dict(initialPieces=initialBoardState, upperCaptures=upperCaptures, lowerCaptures=lowerCaptures, moves=moves)
+    file_input = readGame(path)
+    file_input['moves'] = list(file_input['moves'])
+    return file_input
+
+
+def _locationIndices():
+    indices = {}
+    for col in range(BOARD_SIZE):
+        for row in range(BOARD_SIZE):
+            for letter in (chr(ord('a') + col), chr(ord('A') + col)):
+                indices[letter + str(row + 1)] = col, row
+    return indices
 
 
 def location_to_index(location):
@@ -47,6 +44,10 @@ def location_to_index(location):
         raise PositionOutofBoundsException("Invalid location, square {} does not exist".format(location))
     return col, row - 1
 
+# LOCATION_INDICES maps every valid location string, either column case, to its index tuple.
+LOCATION_INDICES = _locationIndices()
+
+
 def index_to_location(index):
     """
     Util method to convert a index tuple to its square on the board.
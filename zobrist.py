@@ -0,0 +1,41 @@
+import random
+from utils import BOARD_SIZE, PIECE_NAMES, PLAYERS
+
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+
+# The keys come from a fixed seed, so a position has the same key in every process and on every run.
+_random = random.Random(0xB0C5)
+# Most pieces of one type a position may hold, on the board and in both hands together, see Board._initFilePieces.
+# Pieces only change hands, so no hand can hold more than that.
+MAX_HAND = NUM_SQUARES
+
+
+def _keys(count):
+    return tuple(_random.getrandbits(64) for _ in range(count))
+
+
+# PIECE_KEYS[(player, piece name, isPromote)][sq] is the key of that piece standing on square sq.
+PIECE_KEYS = {(player, name, is_promote): _keys(NUM_SQUARES)
+              for player in PLAYERS for name in PIECE_NAMES for is_promote in (False, True)}
+# HAND_KEYS[(player, piece name)][count] is the key of player holding count pieces of that type. An empty hand has key 0.
+HAND_KEYS = {(player, name): (0,) + _keys(MAX_HAND) for player in PLAYERS for name in PIECE_NAMES}
+# SIDE_KEY is part of the key when UPPER is to move.
+SIDE_KEY = _keys(1)[0]
+
+
+def hand_key(player, hand):
+    """
+    Util method to compute the key of a whole hand from scratch.
+
+    Args:
+        player (str): Player holding the hand.
+        hand (iterable): Captured piece names, like ['S', '+N'] or a player's Hand.
+
+    Returns:
+        int: XOR of the hand keys of every piece type count.
+    """
+    key = 0
+    for name in PIECE_NAMES:
+        count = sum(1 for entry in hand if entry[-1].lower() == name)
+        key ^= HAND_KEYS[(player, name)][count]
+    return key